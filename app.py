@@ -1,27 +1,67 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from strategies.manager import StrategyManager
 from strategies.portfolio_manager import PortfolioManager
-from nse_tickers import NSE_TICKERS
+from strategies.watchlist import WatchlistService, WatchlistVerifier, add_to_watchlist, load_watchlist_pending
+from strategies.scan_jobs import ScanScheduler
+from strategies.warmup import Warmup
+from strategies.dashboard import DashboardService
+from strategies.nav import NavEngine
+from utils.symbol_master import get_symbol_index
+from utils.ticker_validation import resolve_ticker
 import pandas as pd
 import os
 import threading
 
 from utils.logger import setup_logger
 from utils.db import get_db
+from utils import http_cache, metrics
 
 app = Flask(__name__)
+# Route latency histograms (first, so the time of the hooks below is included)
+metrics.instrument_flask(app)
 logger = setup_logger('app')
 manager = StrategyManager()
 portfolio_mgr = PortfolioManager()
+watchlist_service = WatchlistService(manager)
+watchlist_verifier = WatchlistVerifier()
+# Background scans; each successful analysis also refreshes the portfolio summary cache
+scan_scheduler = ScanScheduler(manager, on_result=portfolio_mgr.save_analysis)
+# Landing page document, rebuilt in the background when holdings/analyses change
+dashboard = DashboardService(portfolio_mgr)
+portfolio_mgr.listeners.append(dashboard.invalidate)
+# Daily NAV history per portfolio (appended as bars arrive)
+nav_engine = NavEngine()
+# Cache priming after start; wsgi.py runs it before serving, the dev server in the background
+warmup = Warmup(manager, watchlist_service, dashboard=dashboard, nav_engine=nav_engine)
 
 # --- ROUTES ---
 
+@app.after_request
+def compress_response(response):
+    # gzip/br per Accept-Encoding (streams and small bodies pass through untouched)
+    return http_cache.compress(request, response)
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process serves requests
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: 503 until the warm-up has run, so no traffic hits cold caches
+    state = warmup.status()
+    return jsonify(state), (200 if warmup.ready else 503)
+
+@app.route('/metrics')
+def metrics_view():
+    # Prometheus scrape target (every worker's values when METRICS_DIR is set)
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def home():
-    # Landing page - Dashboard
-    summaries = portfolio_mgr.get_all_portfolios_summary()
-    metrics = portfolio_mgr.get_dashboard_metrics()
-    return render_template('dashboard.html', portfolios=summaries, metrics=metrics)
+    # Landing page - Dashboard (precomputed snapshot, strategies/dashboard.py)
+    snap = dashboard.get()
+    return render_template('dashboard.html', portfolios=snap.portfolios, metrics=snap.metrics)
 
 @app.route('/portfolio')
 def portfolio_view():
@@ -38,19 +78,8 @@ def portfolio_view():
     if request.args.get('pid') == 'all':
         pid = None
 
-    stocks = portfolio_mgr.load_portfolio(portfolio_id=pid)
-    # Summary calculation also needs update if we want summary per portfolio?
-    # For now, summary logic inside mgr uses view which is global. 
-    # We might need to recalc summary in python if pid is specific.
-    # The current `get_portfolio_summary` uses `portfolio_view` which aggregates EVERYTHING.
-    # TODO: Update summary logic for filtering.
-    summary = {
-        "total_invested": sum(s['invested_value'] for s in stocks),
-        "current_value": sum(s['current_value'] for s in stocks),
-        "stock_count": len(stocks)
-    }
-    summary["total_pnl"] = summary["current_value"] - summary["total_invested"]
-    summary["total_pnl_pct"] = (summary["total_pnl"] / summary["total_invested"] * 100) if summary["total_invested"] > 0 else 0 
+    # Totals are aggregated in SQL; the rows themselves are paged in by the page from /api/holdings
+    summary = portfolio_mgr.holdings_totals(portfolio_id=pid)
     
     portfolios = portfolio_mgr.get_portfolios()
     
@@ -61,7 +90,61 @@ def portfolio_view():
                 current_portfolio_name = p.name
                 break
     
-    return render_template('portfolio.html', stocks=stocks, summary=summary, portfolios=portfolios, current_pid=pid if pid else 'all', current_ptf_name=current_portfolio_name)
+    return render_template('portfolio.html', summary=summary, portfolios=portfolios, current_pid=pid if pid else 'all', current_ptf_name=current_portfolio_name)
+
+@app.route('/api/holdings', methods=['GET'])
+def holdings_api():
+    """
+    Holdings, one page at a time: ?pid= (id or 'all'), ?sort= value|pnl|pnl_pct|invested|ticker,
+    ?order= asc|desc, ?limit= (max 500), ?cursor= (next_cursor of the previous page),
+    filters ?sector=, ?signal= bullish|bearish|mixed|none, ?pnl= gain|loss, ?q= ticker prefix.
+    The first page (no cursor) also carries the filtered totals.
+    """
+    pid = request.args.get('pid', 'all')
+    pid = None if pid == 'all' else request.args.get('pid', type=int)
+    filters = {
+        "sector": request.args.get('sector') or None,
+        "signal": request.args.get('signal') or None,
+        "pnl": request.args.get('pnl') or None,
+        "search": request.args.get('q') or None,
+    }
+    cursor = request.args.get('cursor') or None
+    try:
+        page = portfolio_mgr.holdings_page(
+            portfolio_id=pid,
+            sort=request.args.get('sort', 'value'),
+            order=request.args.get('order', 'desc'),
+            limit=request.args.get('limit', 100, type=int),
+            cursor=cursor,
+            **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)})
+    if not cursor:
+        page["totals"] = portfolio_mgr.holdings_totals(portfolio_id=pid, **filters)
+    return jsonify(page)
+
+def _chart_options_from_request():
+    """`range=` (e.g. 6mo, 2024-01-01:2024-06-30), `points=` (viewport width) and `charts=0` query params."""
+    if request.args.get('charts') == '0':
+        # Caller only wants verdicts - skip charts and load just the strategies' lookback window
+        return {"disabled": True}
+    opts = {}
+    if request.args.get('range'):
+        opts['date_range'] = request.args.get('range')
+    points = request.args.get('points', type=int)
+    if points is not None:
+        opts['max_points'] = max(0, min(points, 5000))
+    return opts
+
+@app.route('/suggest', methods=['GET'])
+def suggest():
+    """Autocomplete: ?q= symbol/company/ISIN prefix (fuzzy on names), ?limit= (max 50).
+    Returns tickers, or symbol records with ?detail=1."""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    matches = get_symbol_index().search(request.args.get('q', ''), limit=limit)
+    if request.args.get('detail') == '1':
+        return jsonify([m._asdict() for m in matches])
+    return jsonify([m.ticker for m in matches])
 
 @app.route('/analyze_ticker', methods=['GET'])
 def analyze_ticker_api():
@@ -74,15 +157,296 @@ def analyze_ticker_api():
     if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
         ticker += ".NS"
         
-    result = manager.analyze_ticker(ticker)
+    # mode=screen: verdict only, stops at the first failed condition (bulk scans)
+    mode = 'screen' if request.args.get('mode') == 'screen' else 'full'
+    chart_options = _chart_options_from_request()
+
+    # Same ticker, bar, strategy versions and options => same response: answer from validators
+    tag = manager.result_tag(ticker, chart_options=chart_options, mode=mode)
+    if tag:
+        cached = http_cache.not_modified(request, *tag) or http_cache.cached_response(request, *tag)
+        if cached is not None:
+            return cached
+
+    # result_tag already synced the bars; reuse its bar date instead of syncing again
+    result = manager.analyze_ticker(ticker, chart_options=chart_options, mode=mode,
+                                    bar_date=tag[1] if tag else None)
     
-    # NEW: Cache the result for portfolio view persistence
+    # NEW: Cache the result for portfolio view persistence (screen verdicts are too thin to cache)
+    if mode == 'full':
+        try:
+            portfolio_mgr.save_analysis(ticker, result)
+        except Exception as e:
+            print(f"Failed to cache analysis for {ticker}: {e}")
+
+    resp = jsonify(result)
+    if tag and not result.get('error'):
+        http_cache.set_validators(resp, *tag)
+    return resp
+
+def _normalize_ticker(ticker):
+    ticker = (ticker or '').strip().upper()
+    if ticker and not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
+        ticker += ".NS"
+    return ticker
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+@app.route('/api/stream/analyze', methods=['GET'])
+def stream_analyze():
+    """
+    Server-Sent Events: analyzes ?tickers=A,B,C (or ?portfolio_id=N|all) concurrently and pushes
+    each result as soon as it is ready (event "result"), then "done". Verdicts only (no charts);
+    results also refresh the portfolio summary cache like /analyze_ticker does.
+    A closed EventSource stops the remaining work.
+    """
+    requested = [t for t in request.args.get('tickers', '').split(',') if t.strip()]
+    if not requested and request.args.get('portfolio_id'):
+        everything = request.args.get('portfolio_id') == 'all'
+        pid = None if everything else request.args.get('portfolio_id', type=int)
+        if pid is None and not everything:
+            return jsonify({"error": "portfolio_id must be a number or 'all'"}), 400
+        from strategies.scan_jobs import resolve_tickers
+        requested = resolve_tickers("portfolio", {"portfolio_id": pid})
+    # Results carry the normalized ticker; "query" echoes what the client asked for
+    queries = {}
+    for t in requested:
+        queries.setdefault(_normalize_ticker(t), t.strip())
+
+    def generate():
+        yield _sse("start", {"total": len(queries)})
+        batch = manager.iter_batch(list(queries), backend="thread", chart_options={"disabled": True})
+        processed = 0
+        try:
+            for ticker, result in batch:
+                if not result.get('error'):
+                    try:
+                        portfolio_mgr.save_analysis(ticker, result)
+                    except Exception as e:
+                        print(f"Failed to cache analysis for {ticker}: {e}")
+                processed += 1
+                yield _sse("result", {**result, "query": queries[ticker]})
+            yield _sse("done", {"processed": processed})
+        finally:
+            batch.close()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Upper bound on tickers per /api/analyze request
+MAX_BATCH_TICKERS = 5000
+
+def _select_fields(result, fields):
+    """Keeps only the requested (dotted) paths of a result, e.g. "summary.bullish"; ticker always kept."""
+    if not fields:
+        return result
+    out = {"ticker": result.get("ticker")}
+    if result.get("error"):
+        out["error"] = result["error"]
+    for path in fields:
+        keys = path.split('.')
+        src = result
+        for key in keys[:-1]:
+            src = src.get(key) if isinstance(src, dict) else None
+        if not isinstance(src, dict) or keys[-1] not in src:
+            continue # missing in this result (e.g. errors have no summary)
+        dst = out
+        for key in keys[:-1]:
+            dst = dst.setdefault(key, {})
+        dst[keys[-1]] = src[keys[-1]]
+    return out
+
+@app.route('/api/analyze', methods=['POST'])
+def batch_analyze_api():
+    """
+    Batch analysis, streamed as NDJSON (one result per line, in completion order).
+    Body: {"tickers": [...], "strategies": [names] (default all), "fields": ["price", "summary.bullish",
+           "strategies.Minervini Trend Template.status", ...] (default everything),
+           "mode": "full|screen", "charts": false (default), "workers": N}
+    A failing ticker yields a line with "error"; the batch continues.
+    """
+    data = request.json or {}
+    tickers = data.get('tickers') or []
+    if not isinstance(tickers, list) or not tickers:
+        return jsonify({"error": "No tickers provided"})
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"Too many tickers ({len(tickers)} > {MAX_BATCH_TICKERS})"})
+
+    mgr = manager
+    if data.get('strategies'):
+        try:
+            mgr = manager.subset(data['strategies'])
+        except ValueError as e:
+            return jsonify({"error": str(e)})
+    mode = 'screen' if data.get('mode') == 'screen' else 'full'
+    chart_options = None if data.get('charts') else {"disabled": True}
+    workers = data.get('workers')
+    workers = max(1, min(int(workers), 32)) if isinstance(workers, int) else None
+    fields = data.get('fields')
+
+    queries = {}
+    for t in tickers:
+        if isinstance(t, str) and t.strip():
+            queries.setdefault(_normalize_ticker(t), t.strip())
+
+    def generate():
+        batch = mgr.iter_batch(list(queries), backend="thread", max_workers=workers,
+                               chart_options=chart_options, mode=mode)
+        try:
+            for ticker, result in batch:
+                try:
+                    line = app.json.dumps(_select_fields(result, fields))
+                except Exception as e:
+                    line = app.json.dumps({"ticker": ticker, "error": f"Serialization failed: {e}"})
+                yield line + "\n"
+        finally:
+            batch.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/screen_stats', methods=['GET'])
+def screen_stats_api():
+    """Screening-mode counters: per strategy and condition, evaluated / rejected / avg time."""
+    return jsonify(manager.screen_stats())
+
+@app.route('/chart_data', methods=['GET'])
+def chart_data_api():
+    """Re-render a single chart for a zoom window: ?ticker=&chart=minervini|dual&range=&points="""
+    ticker = request.args.get('ticker', '').strip().upper()
+    chart = request.args.get('chart', 'minervini')
+    if not ticker:
+        return jsonify({"error": "No ticker provided"})
+    if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
+        ticker += ".NS"
+
+    from utils.data_loader import fetch_stock_data, latest_bar_date
+    from utils.benchmark_service import get_benchmark_service
+    import utils.visualization as visualization
+    from strategies.base import module_digest
+    opts = _chart_options_from_request()
+    bench = get_benchmark_service().get() if chart == 'dual' else None
+
+    bar_date = latest_bar_date(ticker)
+    etag = None
+    if bar_date is not None:
+        etag = http_cache.make_etag(ticker, bar_date, chart, sorted(opts.items()), module_digest(visualization),
+                                    bench.as_of if bench is not None else None)
+        cached = http_cache.not_modified(request, etag, bar_date) or http_cache.cached_response(request, etag, bar_date)
+        if cached is not None:
+            return cached
+
+    df = fetch_stock_data(ticker, period="5y")
+    if df is None or df.empty:
+        return jsonify({"error": "Data Not Found"})
+
+    if chart == 'dual':
+        if bench is None or len(bench) == 0:
+            return jsonify({"error": "Benchmark Data Unavailable"})
+        fig = visualization.create_relative_strength_figure(ticker, df, bench, **opts)
+    else:
+        fig = visualization.create_minervini_figure(ticker, df.copy(), **opts)
+    resp = jsonify({"ticker": ticker, "chart": chart, "chart_json": fig.to_json()})
+    if etag:
+        http_cache.set_validators(resp, etag, bar_date)
+    return resp
+
+@app.route('/api/screener/rs', methods=['GET'])
+def rs_screener_api():
+    """Universe RS Rating screen: ?min=70&limit=100 (latest stored day, strongest first)"""
+    from strategies.rs_rating import top_rated
+    min_rating = request.args.get('min', 70, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify(top_rated(min_rating=min_rating, limit=limit))
+
+@app.route('/api/rs_history', methods=['GET'])
+def rs_history_api():
+    """Daily RS Rating history for one ticker: ?ticker=&start=YYYY-MM-DD"""
+    from strategies.rs_rating import get_rs_history
+    ticker = request.args.get('ticker', '').strip().upper()
+    if not ticker:
+        return jsonify({"error": "No ticker provided"})
+    if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
+        ticker += ".NS"
+    hist = get_rs_history(ticker, start=request.args.get('start'))
+    return jsonify({
+        "ticker": ticker,
+        "dates": [d.strftime("%Y-%m-%d") for d in hist.index],
+        "rs_rating": [int(v) for v in hist.values]
+    })
+
+@app.route('/api/screener/vcp', methods=['GET'])
+def vcp_screener_api():
+    """Bases from the latest nightly scan: ?all=1 includes bases that are not (yet) VCPs"""
+    from strategies.vcp import get_latest_bases
+    bases = get_latest_bases(vcp_only=request.args.get('all') != '1')
+    rows = [{"ticker": t, **b} for t, b in bases.items()]
+    rows.sort(key=lambda r: r["final_depth"] if r["final_depth"] is not None else 1)
+    return jsonify(rows)
+
+# --- Background scans (strategies/scan_jobs.py) ---
+
+@app.route('/api/scans', methods=['GET', 'POST'])
+def scans_api():
+    """
+    POST {"kind": "universe|portfolio|watchlist|tickers", "tickers": [...], "portfolio_id": 1,
+          "mode": "full|screen"} queues a scan; GET ?kind= lists recent scans.
+    """
+    if request.method == 'GET':
+        return jsonify(scan_scheduler.recent(kind=request.args.get('kind')))
+    data = request.json or {}
+    try:
+        job = scan_scheduler.submit(data.get('kind', 'tickers'), tickers=data.get('tickers'),
+                                    mode=data.get('mode', 'full'), portfolio_id=data.get('portfolio_id'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)})
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to submit scan: {e}"})
+    return jsonify({"success": True, **job})
+
+@app.route('/api/scans/<job_id>', methods=['GET'])
+def scan_job_api(job_id):
+    job = scan_scheduler.get(job_id)
+    return jsonify(job if job else {"error": "Scan not found"})
+
+@app.route('/api/scans/<job_id>/results', methods=['GET'])
+def scan_results_api(job_id):
+    """Stored per-ticker results: ?bullish=1|0&offset=&limit= (max 1000)"""
+    bullish = request.args.get('bullish')
+    return jsonify(scan_scheduler.results(
+        job_id,
+        bullish=None if bullish is None else bullish == '1',
+        offset=max(0, request.args.get('offset', 0, type=int)),
+        limit=max(1, min(request.args.get('limit', 100, type=int), 1000)),
+    ))
+
+@app.route('/api/scans/<job_id>/cancel', methods=['POST'])
+def cancel_scan(job_id):
+    return jsonify({"success": scan_scheduler.cancel(job_id)})
+
+@app.route('/api/scans/<job_id>/resume', methods=['POST'])
+def resume_scan(job_id):
+    return jsonify({"success": scan_scheduler.resume(job_id)})
+
+@app.route('/scan_market', methods=['POST'])
+def scan_market():
+    """Full market scan of all stored tickers (index.html); joins the scan already running."""
     try:
-        portfolio_mgr.save_analysis(ticker, result)
+        job = scan_scheduler.active(kind='universe') or scan_scheduler.submit('universe')
     except Exception as e:
-        print(f"Failed to cache analysis for {ticker}: {e}")
+        return jsonify({"status": "error", "msg": f"Failed to start scan: {e}"})
+    return jsonify({"status": "started", "id": job["id"]})
 
-    return jsonify(result)
+@app.route('/scan_status', methods=['GET'])
+def scan_status():
+    """Progress of the current (or last) market scan, in the shape index.html polls for."""
+    job = scan_scheduler.active(kind='universe')
+    if job is None:
+        recent = scan_scheduler.recent(kind='universe', limit=1)
+        job = recent[0] if recent else None
+    if job is None:
+        return jsonify({"running": False, "progress": 0, "processed": 0, "total": 0, "current": ""})
+    return jsonify({**job, "running": job["status"] in ("queued", "running")})
 
 @app.route('/api/portfolios', methods=['GET', 'POST'])
 def handle_portfolios():
@@ -122,6 +486,66 @@ def add_stock_route():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/nav', methods=['GET'])
+def nav_api():
+    """
+    Equity curve of ?pid= (id or 'all'), column-wise for charting: dates, nav, cash_flow,
+    twr and drawdown (% from the start / running peak), plus a summary of the last day.
+    """
+    pid = request.args.get('pid', 'all')
+    pid = None if pid == 'all' else request.args.get('pid', type=int)
+    try:
+        series = nav_engine.series(pid)
+    except Exception as e:
+        print(f"NAV error for portfolio {pid}: {e}")
+        return jsonify({"error": str(e)})
+    summary = {}
+    if not series.empty:
+        last = series.iloc[-1]
+        summary = {
+            "nav": round(float(last["nav"]), 2),
+            "twr": round(float(last["twr"]) * 100, 2),
+            "max_drawdown": round(float(series["drawdown"].min()) * 100, 2),
+            "net_invested": round(float(series["cash_flow"].sum()), 2),
+        }
+    return jsonify({
+        "dates": series.index.strftime("%Y-%m-%d").tolist(),
+        "nav": series["nav"].round(2).tolist(),
+        "cash_flow": series["cash_flow"].round(2).tolist(),
+        "twr": (series["twr"] * 100).round(2).tolist(),
+        "drawdown": (series["drawdown"] * 100).round(2).tolist(),
+        "summary": summary,
+    })
+
+@app.route('/sell_stock', methods=['POST'])
+def sell_stock_route():
+    try:
+        data = request.json
+        ticker = data.get('ticker')
+        qty = float(data.get('quantity'))
+        price = float(data.get('price'))
+        pid = data.get('portfolio_id', 1)
+        s_date = data.get('date') # ISO string YYYY-MM-DD or empty (today)
+        
+        success, msg = portfolio_mgr.sell_stock(ticker, qty, price, pid, sell_date=s_date)
+        
+        if success:
+            return jsonify({"status": "success", "message": msg})
+        else:
+            return jsonify({"status": "error", "message": msg}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/ledger', methods=['GET'])
+def ledger_api():
+    """Ledger positions of ?pid= (FIFO lots, realized/unrealized P&L); ?rebuild=1 replays from scratch."""
+    pid = request.args.get('pid', 1, type=int)
+    try:
+        return jsonify(portfolio_mgr.get_ledger(pid, rebuild=request.args.get('rebuild') == '1'))
+    except Exception as e:
+        print(f"Ledger error for portfolio {pid}: {e}")
+        return jsonify({"error": str(e)})
+
 @app.route('/edit_stock_date', methods=['POST'])
 def edit_stock_date_route():
     try:
@@ -147,173 +571,40 @@ def remove_stock():
     return jsonify({"success": success})
 @app.route('/watchlist')
 def watchlist_view():
-    db = get_db()
-    session = db.get_db_session()
-    
-    watchlist_data = []
+    # Rows are precomputed (strategies/watchlist.py); the page only reads the snapshot
     try:
-        from models import Watchlist
-        # Fetch all tickers
-        tickers = [r.ticker for r in session.query(Watchlist).all()]
-        
-        # Analyze each
-        for t in tickers:
-            try:
-                res = manager.analyze_ticker(t)
-                
-                # Extract Key Metrics
-                price = res.get('price', 0)
-                summary = res.get('summary', {})
-                strategies = res.get('strategies', {})
-                
-                min_res = strategies.get('Minervini Trend Template', {})
-                min_status = min_res.get('status', 'FAIL')
-                
-                # Action & Momentum Health
-                if min_status == 'PASS':
-                    comp_health = "Strong Buy"
-                    action = "BUY"
-                    health_class = "text-green-400"
-                    action_class = "bg-green-600 text-white"
-                else:
-                    # Check if it's mixed or weak (reusing logic or simple check)
-                    # For now simplifed:
-                    comp_health = "Weak"
-                    action = "AVOID"
-                    health_class = "text-red-400"
-                    action_class = "bg-red-600 text-white"
-                    
-                # Upside Calculation
-                upside_txt = "N/A"
-                upside_class = "text-gray-500"
-                target_type = "-"
-                
-                # Only calc upside if decent health (or strict rule?)
-                # User said: "If Momentum Health is PASS ... Otherwise N/A or Avoid" (Initial)
-                # Updated Plan: Always show selection rule?
-                # "Selection Rule: If price within 5% of 52W High..."
-                
-                # Let's get data for 52W High
-                # Minervini details usually have it, or metrics
-                metrics = min_res.get('metrics', {})
-                # We need raw data if metrics don't have 52W High. 
-                # Minervini metrics in `minervini.py` currently returns Price, RSI, SMA_50, Pivot.
-                # It does NOT return 52W High explicitly in metrics dict.
-                # However, we can re-analyze or fetch. 
-                # Optimization: `manager.analyze_ticker` fetches data. We could modify Minervini to return it, 
-                # or just fetch here if efficiency isn't huge issue (it is cached by manager?). 
-                # Actually manager implementation creates fresh `fetch_stock_data`.
-                
-                # Hack: Parse 52W High from details string if present? No, unreliable.
-                # Better: Access the `data` used in strategy? Strategy doesn't expose it.
-                # Quick Fix: Fetch single point data or leverage the fact we can calculate it?
-                # Let's trust `min_res['chart_json']`? No.
-                
-                # We will fetch basics again or update Minervini strategy.
-                # Updating Strategy is cleaner but requires editing another file.
-                # For now, let's just fetch history for 1y to get 52W High quickly.
-                # (Or since we just analyzed it, maybe we update Minervini.py to include 52W High/Low in metrics)
-                
-                # Let's assume we update Minervini.py in next step or use separate fetch.
-                # I'll stick to separate fetch for minimal invasion now (or update strategy which is better).
-                # Actually, I will update Minervini.py to return 52W High in metrics. 
-                # But I can't do that effectively in this single tool call if I didn't plan it.
-                # I'll use `utils.data_loader` here to get 52W High.
-                from utils.data_loader import fetch_stock_data
-                df = fetch_stock_data(t, period="1y")
-                
-                if df is not None and not df.empty:
-                    high_52 = df['High'].max()
-                    current = df['Close'].iloc[-1]
-                    pivot = df['High'].iloc[-20:].max()
-                    
-                    # Logic
-                    # Secondary Target (Minervini)
-                    min_target = pivot * 1.20
-                    
-                    # Selection Rule
-                    # If current price is within 5% of (or above) 52-Week High
-                    is_near_high = current >= (high_52 * 0.95)
-                    
-                    if min_status == 'PASS':
-                        if is_near_high:
-                             target = min_target
-                             target_label = "Momentum (Pivot+20%)"
-                        else:
-                             target = high_52
-                             target_label = "Resistance (52W High)"
-                             
-                        # Calculate Upside
-                        if target > current:
-                            pot = ((target - current) / current) * 100
-                            upside_txt = f"+{pot:.1f}%"
-                            upside_class = "text-green-400"
-                        elif target == current:
-                             upside_txt = "0%"
-                        else:
-                             upside_txt = "Blue Sky"
-                             upside_class = "text-blue-400"
-                        
-                        # Formatting
-                        upside_txt = f"{upside_txt} <span class='text-xs text-gray-500 block'>{target_label}</span>"
-                    else:
-                        upside_txt = "-"
-                        upside_class = "text-gray-600"
-
-                watchlist_data.append({
-                    "ticker": t,
-                    "price": price,
-                    "health": comp_health,
-                    "health_class": health_class,
-                    "action": action,
-                    "action_class": action_class,
-                    "upside": upside_txt,
-                    "upside_class": upside_class
-                })
-
-            except Exception as e:
-                print(f"Error processing {t}: {e}")
-                
-    finally:
-        db.close_session()
-
-    return render_template('watchlist.html', stocks=watchlist_data)
+        stocks = list(watchlist_service.get().rows)
+        pending = load_watchlist_pending()
+        # Resumes verification of rows left pending (e.g. by a restart); no-op while queued/recently tried
+        watchlist_verifier.enqueue([t for t, status in pending.items() if status == 'pending'])
+    except Exception as e:
+        print(f"Watchlist Error: {e}")
+        stocks, pending = [], {}
+    return render_template('watchlist.html', stocks=stocks, pending=pending)
 
 @app.route('/api/watchlist/add', methods=['POST'])
 def add_watchlist():
-    data = request.json
-    ticker = data.get('ticker', '').strip().upper()
-    if not ticker: return jsonify({"success": False, "error": "No ticker"})
-    
-    # Correction
-    if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
-        ticker += ".NS"
-
-    # VALIDATION STEP
-    try:
-        import yfinance as yf
-        # Check if we can fetch recent data
-        # 'period="1mo"' is light enough. If empty, it's likely invalid/delisted.
-        df = yf.download(ticker, period="5d", progress=False)
-        if df is None or df.empty:
-             return jsonify({"success": False, "error": f"Invalid or delisted ticker: {ticker}"})
-    except Exception as e:
-        return jsonify({"success": False, "error": f"Failed to validate ticker: {str(e)}"})
+    """
+    Add {"ticker": "TRENT"} or {"tickers": [...]} (ticker, NSE symbol or ISIN).
+    Validated locally - symbol master, stored bars, negative cache - so no download blocks the
+    request; tickers without data yet are added as pending and fetched in the background.
+    """
+    data = request.json or {}
+    raw = data.get('tickers') if isinstance(data.get('tickers'), list) else [data.get('ticker', '')]
+    tickers = list(dict.fromkeys(t for t in (resolve_ticker(str(r)) for r in raw) if t))
+    if not tickers: return jsonify({"success": False, "error": "No ticker"})
 
-    db = get_db()
-    session = db.get_db_session()
     try:
-        from models import Watchlist
-        # Check exist
-        if not session.query(Watchlist).filter_by(ticker=ticker).first():
-            new_item = Watchlist(ticker=ticker)
-            session.add(new_item)
-            session.commit()
-        return jsonify({"success": True})
+        result = add_to_watchlist(tickers)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
-    finally:
-        db.close_session()
+    watchlist_verifier.enqueue(result["pending"])
+
+    out = {"success": bool(result["added"] or result["existing"]), **result}
+    if not out["success"]:
+        rejected = list(result["rejected"].values())
+        out["error"] = rejected[0] if len(rejected) == 1 else "No valid tickers"
+    return jsonify(out)
 
 @app.route('/api/watchlist/remove', methods=['POST'])
 def remove_watchlist():
@@ -337,4 +628,8 @@ def remove_watchlist():
 
 if __name__ == '__main__':
     print("Starting WealthLab App...")
+    # The reloader runs this block in two processes; resume interrupted scans only in the server
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scan_scheduler.resume_interrupted()
+        warmup.start()
     app.run(debug=True, port=5000)
\ No newline at end of file
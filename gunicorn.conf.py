@@ -0,0 +1,26 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threads per worker: streaming endpoints (SSE/NDJSON) hold a thread for the whole scan
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))
+timeout = 120
+graceful_timeout = 30
+
+# Import + warm the app once in the master (wsgi.py); workers fork with it in memory
+preload_app = True
+
+# Per-process metric snapshots merged by /metrics (utils/metrics.py); fresh on every start
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'wealthlab-metrics'))
+shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+def post_worker_init(worker):
+    # Background threads don't survive fork: start them per worker. Job claims are atomic,
+    # so only one worker picks up each interrupted scan.
+    from app import scan_scheduler
+    scan_scheduler.resume_interrupted()
@@ -5,6 +5,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
 import datetime
+from strategies.minervini import MinerviniStrategy
 
 # ==========================================
 # CONFIGURATION
@@ -62,6 +63,19 @@ def get_execution_history():
 # ==========================================
 # CORE ANALYSIS ENGINE
 # ==========================================
+# Reason wording of the CSV report: {rule name: (passed, failed)} over MinerviniStrategy.REASON_VALUES
+REPORT_REASONS = {
+    "price_above_150_200": ("Price ({close:.2f}) > 150/200 SMAs", "Price ({close:.2f}) below SMAs"),
+    "sma150_above_sma200": ("150 SMA ({sma150:.2f}) > 200 SMA ({sma200:.2f})",
+                            "Long-term trend down (150 SMA < 200 SMA)"),
+    "sma200_rising": ("200 SMA is Trending UP", "200 SMA is flattening or falling"),
+    "sma50_above_150_200": ("50 SMA ({sma50:.2f}) > 150/200 SMAs", "Medium trend weak (50 SMA misaligned)"),
+    "price_above_sma50": ("Price ({close:.2f}) > 50 SMA", "Price lost 50 SMA support"),
+    "above_52w_low": ("Above Lows: +{pct_above_low:.2f}% (Min 30%)", "Too close to lows ({low:.2f})"),
+    "near_52w_high": ("Near Highs: -{pct_below_high:.2f}% (Max 25%)", "Deep in correction (High was {high:.2f})"),
+    "rsi_bullish": ("RSI Bullish ({rsi:.2f})", "RSI Bearish ({rsi:.2f})"),
+}
+
 def analyze_stock(ticker):
     df = fetch_stock_data(ticker)
     
@@ -77,71 +91,14 @@ def analyze_stock(ticker):
     df['MACD'] = macd['MACD_12_26_9']
     df['MACD_Signal'] = macd['MACDs_12_26_9']
     
-    df['52_Week_Low'] = df['Close'].rolling(window=260).min()
-    df['52_Week_High'] = df['Close'].rolling(window=260).max()
-    df['SMA_200_Trending'] = df['SMA_200'] > df['SMA_200'].shift(20)
-
     # 2. Logic & Reason Logging
     curr = df.iloc[-1]
     price = curr['Close']
     
-    pass_reasons = [] # Log of PASSED criteria with values
-    fail_reasons = [] # Log of FAILED criteria with values
-
-    # Helper for formatting numbers
-    def fmt(val): return f"{val:.2f}"
-
-    # Rule 1: Price > 150 & 200 SMA
-    if price > curr['SMA_150'] and price > curr['SMA_200']:
-        pass_reasons.append(f"Price ({fmt(price)}) > 150/200 SMAs")
-    else:
-        fail_reasons.append(f"Price ({fmt(price)}) below SMAs")
-
-    # Rule 2: 150 SMA > 200 SMA
-    if curr['SMA_150'] > curr['SMA_200']:
-        pass_reasons.append(f"150 SMA ({fmt(curr['SMA_150'])}) > 200 SMA ({fmt(curr['SMA_200'])})")
-    else:
-        fail_reasons.append("Long-term trend down (150 SMA < 200 SMA)")
-
-    # Rule 3: 200 SMA Trending Up
-    if curr['SMA_200_Trending']:
-        pass_reasons.append("200 SMA is Trending UP")
-    else:
-        fail_reasons.append("200 SMA is flattening or falling")
-
-    # Rule 4: 50 SMA > 150 & 200
-    if curr['SMA_50'] > curr['SMA_150'] and curr['SMA_50'] > curr['SMA_200']:
-        pass_reasons.append(f"50 SMA ({fmt(curr['SMA_50'])}) > 150/200 SMAs")
-    else:
-        fail_reasons.append("Medium trend weak (50 SMA misaligned)")
-
-    # Rule 5: Price > 50 SMA
-    if price > curr['SMA_50']:
-        pass_reasons.append(f"Price ({fmt(price)}) > 50 SMA")
-    else:
-        fail_reasons.append("Price lost 50 SMA support")
-
-    # Rule 6: 30% above 52-Week Low
-    low_threshold = 1.3 * curr['52_Week_Low']
-    if price >= low_threshold:
-        pct_above = ((price - curr['52_Week_Low']) / curr['52_Week_Low']) * 100
-        pass_reasons.append(f"Above Lows: +{fmt(pct_above)}% (Min 30%)")
-    else:
-        fail_reasons.append(f"Too close to lows ({fmt(curr['52_Week_Low'])})")
-
-    # Rule 7: Near 52-Week High (Within 25%)
-    high_threshold = 0.75 * curr['52_Week_High']
-    if price >= high_threshold:
-        pct_below = ((curr['52_Week_High'] - price) / curr['52_Week_High']) * 100
-        pass_reasons.append(f"Near Highs: -{fmt(pct_below)}% (Max 25%)")
-    else:
-        fail_reasons.append(f"Deep in correction (High was {fmt(curr['52_Week_High'])})")
-
-    # Rule 8: RSI
-    if curr['RSI'] >= 50:
-        pass_reasons.append(f"RSI Bullish ({fmt(curr['RSI'])})")
-    else:
-        fail_reasons.append(f"RSI Bearish ({fmt(curr['RSI'])})")
+    # Same Trend Template rules as the app (strategies/minervini.py), with this report's wording
+    verdicts = MinerviniStrategy.RULES.explain(df, formats=REPORT_REASONS)
+    pass_reasons = [v["reason"] for v in verdicts if v["passed"]] # Log of PASSED criteria with values
+    fail_reasons = [v["reason"] for v in verdicts if not v["passed"]] # Log of FAILED criteria with values
 
     # 3. Decision
     status = "PASS" if not fail_reasons else "FAIL"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, BigInteger, JSON, DateTime, Numeric
+from sqlalchemy import Column, Integer, String, Float, Date, BigInteger, JSON, DateTime, Numeric, Index, Boolean
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import func
 
@@ -38,6 +38,38 @@ class PortfolioTransaction(Base):
     price = Column(Numeric(15, 4), nullable=False)
     date = Column(Date, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    
+    # Ledger order (strategies/ledger.py): replays and "transactions since" read this range
+    __table_args__ = (Index('idx_txn_ledger', 'portfolio_id', 'date', 'id'),)
+
+class LedgerCheckpoint(Base):
+    __tablename__ = 'ledger_checkpoints'
+    
+    portfolio_id = Column(Integer, primary_key=True)
+    as_of = Column(Date)                        # (as_of, last_txn_id): last transaction applied
+    last_txn_id = Column(Integer)
+    txn_count = Column(Integer)                 # transactions covered and the sum of their ids -
+    id_sum = Column(BigInteger)                 # a backdated or deleted one invalidates the checkpoint
+    state = Column(JSON)                        # {"lots": [...open FIFO lots], "realized": {ticker: [pnl, sold, unmatched]}}
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class NavHistory(Base):
+    __tablename__ = 'nav_history'
+    
+    portfolio_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    nav = Column(Float)                         # sum(quantity * close) at the day's close
+    cash_flow = Column(Float)                   # buys - sells settled that day
+    ret = Column(Float)                         # daily return net of the day's cash flow
+
+class NavCheckpoint(Base):
+    __tablename__ = 'nav_checkpoints'
+    
+    portfolio_id = Column(Integer, primary_key=True)
+    signature = Column(String(40))              # hash of the flows the rows were computed from
+    last_date = Column(Date)                    # last nav_history row
+    state = Column(JSON)                        # {"quantities": {...}, "prices": {...}, "nav": x} at last_date
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class MarketData(Base):
     __tablename__ = 'market_data'
@@ -67,8 +99,12 @@ class AnalysisCache(Base):
     __tablename__ = 'analysis_cache'
     
     ticker = Column(String(20), primary_key=True)
-    strategy_name = Column(String(50), primary_key=True)
+    strategy_name = Column(String(50), primary_key=True) # a strategy's name, or 'combined' (summary)
     result_json = Column(JSON)
+    # Per-strategy rows: valid while the last bar and the strategy's cache_version are unchanged
+    bar_date = Column(Date)
+    version = Column(String(32))
+    price = Column(Float)
     last_updated = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class Watchlist(Base):
@@ -76,3 +112,60 @@ class Watchlist(Base):
     
     ticker = Column(String(20), primary_key=True)
     created_at = Column(DateTime, server_default=func.now())
+    status = Column(String(10), default='active', server_default='active') # active | pending (no data yet) | invalid
+
+class RSHistory(Base):
+    __tablename__ = 'rs_history'
+    
+    ticker = Column(String(20), primary_key=True)
+    date = Column(Date, primary_key=True)
+    raw_score = Column(Float)   # weighted 3/6/9/12-month ROC
+    rs_rating = Column(Integer) # 1-99 percentile across the universe that day
+    
+    __table_args__ = (Index('idx_rs_date', 'date'),)
+
+class VCPBase(Base):
+    __tablename__ = 'vcp_bases'
+    
+    ticker = Column(String(20), primary_key=True)
+    as_of = Column(Date, primary_key=True)      # scan day (last bar)
+    base_start = Column(Date)                   # highest swing high of the base
+    base_high = Column(Float)
+    pivot_date = Column(Date)                   # swing high of the last contraction
+    pivot_price = Column(Float)                 # buy point
+    contractions = Column(Integer)
+    depths = Column(String(100))                # pullback depths in %, e.g. "24.1,11.3,4.8"
+    final_depth = Column(Float)
+    volume_ratio = Column(Float)                # short/long average volume (dry-up < 1)
+    tightness = Column(Float)                   # last N bars' range / close
+    is_vcp = Column(Boolean, default=False)
+    
+    __table_args__ = (Index('idx_vcp_as_of', 'as_of', 'is_vcp'),)
+
+class ScanJob(Base):
+    __tablename__ = 'scan_jobs'
+    
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(20))                   # universe | portfolio | watchlist | tickers
+    params = Column(JSON)                       # {"tickers": [...] frozen at submit, "mode": ...}
+    status = Column(String(20))                 # queued | running | completed | cancelled | failed
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    passed = Column(Integer, default=0)         # bullish (all strategies passed)
+    current = Column(String(20))                # last ticker finished
+    error = Column(String(255))
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat = Column(DateTime)                # last progress write by the running worker
+    
+    __table_args__ = (Index('idx_scan_jobs_status', 'status', 'created_at'),)
+
+class ScanResult(Base):
+    __tablename__ = 'scan_results'
+    
+    job_id = Column(String(32), primary_key=True)
+    ticker = Column(String(20), primary_key=True)
+    ok = Column(Boolean, default=True)          # False: analysis error (see result_json["error"])
+    bullish = Column(Boolean, default=False)
+    result_json = Column(JSON)
@@ -0,0 +1,27 @@
+import argparse
+import time
+from strategies.backtest import run_backtest
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the Minervini Trend Template on stored market_data")
+    parser.add_argument("--tickers", nargs="*", help="Tickers to test (default: every ticker in market_data)")
+    parser.add_argument("--start", help="First date allowed to trade (YYYY-MM-DD)")
+    parser.add_argument("--stop", type=float, default=0.08, help="Stop loss fraction (default 0.08)")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    res = run_backtest(args.tickers, start=args.start, stop_pct=args.stop)
+    elapsed = time.time() - t0
+
+    stats = res["stats"]
+    print(f"Backtest finished in {elapsed:.1f}s")
+    for k, v in stats.items():
+        print(f"  {k:>14}: {v:.2f}" if isinstance(v, float) else f"  {k:>14}: {v}")
+
+    trades = res["trades"]
+    if not trades.empty:
+        print("\nLast 10 trades:")
+        print(trades.tail(10).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import time
+from strategies.manager import StrategyManager
+from nse_tickers import NSE_TICKERS
+
+def run(manager, tickers, backend, workers):
+    t0 = time.time()
+    first = None
+    n = 0
+    for _ in manager.iter_batch(tickers, backend=backend, max_workers=workers):
+        n += 1
+        if first is None:
+            first = time.time() - t0
+    return time.time() - t0, first, n
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare thread vs process backends of StrategyManager.analyze_batch")
+    parser.add_argument("--tickers", nargs="*", help="Default: nse_tickers.NSE_TICKERS")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    tickers = args.tickers or NSE_TICKERS
+    if args.limit:
+        tickers = tickers[:args.limit]
+
+    manager = StrategyManager()
+    # Warm the DB so both runs read market_data rather than racing yfinance
+    print(f"Warming data for {len(tickers)} tickers...")
+    run(manager, tickers, "thread", args.threads)
+
+    print(f"{'backend':<10}{'workers':>8}{'wall(s)':>10}{'first(s)':>10}{'tickers/s':>11}")
+    timings = {}
+    for backend, workers in (("thread", args.threads), ("process", args.processes)):
+        wall, first, n = run(manager, tickers, backend, workers)
+        timings[backend] = wall
+        print(f"{backend:<10}{workers:>8}{wall:>10.2f}{(first or 0):>10.2f}{n / wall:>11.1f}")
+
+    if timings.get("process"):
+        print(f"\nSpeedup (process vs thread): {timings['thread'] / timings['process']:.2f}x")
+
+if __name__ == "__main__":
+    main()
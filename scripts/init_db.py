@@ -50,11 +50,75 @@ TABLES['analysis_cache'] = (
     "  ticker VARCHAR(20) NOT NULL,"
     "  strategy_name VARCHAR(50) NOT NULL,"
     "  result_json JSON,"
+    "  bar_date DATE,"
+    "  version VARCHAR(32),"
+    "  price FLOAT,"
     "  last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,"
     "  PRIMARY KEY (ticker, strategy_name)"
     ") ENGINE=InnoDB"
 )
 
+TABLES['rs_history'] = (
+    "CREATE TABLE IF NOT EXISTS rs_history ("
+    "  ticker VARCHAR(20) NOT NULL,"
+    "  date DATE NOT NULL,"
+    "  raw_score DOUBLE,"
+    "  rs_rating INT,"
+    "  PRIMARY KEY (ticker, date),"
+    "  INDEX idx_rs_date (date)"
+    ") ENGINE=InnoDB"
+)
+
+TABLES['vcp_bases'] = (
+    "CREATE TABLE IF NOT EXISTS vcp_bases ("
+    "  ticker VARCHAR(20) NOT NULL,"
+    "  as_of DATE NOT NULL,"
+    "  base_start DATE,"
+    "  base_high DOUBLE,"
+    "  pivot_date DATE,"
+    "  pivot_price DOUBLE,"
+    "  contractions INT,"
+    "  depths VARCHAR(100),"
+    "  final_depth DOUBLE,"
+    "  volume_ratio DOUBLE,"
+    "  tightness DOUBLE,"
+    "  is_vcp BOOLEAN DEFAULT FALSE,"
+    "  PRIMARY KEY (ticker, as_of),"
+    "  INDEX idx_vcp_as_of (as_of, is_vcp)"
+    ") ENGINE=InnoDB"
+)
+
+TABLES['scan_jobs'] = (
+    "CREATE TABLE IF NOT EXISTS scan_jobs ("
+    "  id VARCHAR(32) NOT NULL,"
+    "  kind VARCHAR(20),"
+    "  params JSON,"
+    "  status VARCHAR(20),"
+    "  total INT DEFAULT 0,"
+    "  processed INT DEFAULT 0,"
+    "  passed INT DEFAULT 0,"
+    "  current VARCHAR(20),"
+    "  error VARCHAR(255),"
+    "  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+    "  started_at DATETIME,"
+    "  finished_at DATETIME,"
+    "  heartbeat DATETIME,"
+    "  PRIMARY KEY (id),"
+    "  INDEX idx_scan_jobs_status (status, created_at)"
+    ") ENGINE=InnoDB"
+)
+
+TABLES['scan_results'] = (
+    "CREATE TABLE IF NOT EXISTS scan_results ("
+    "  job_id VARCHAR(32) NOT NULL,"
+    "  ticker VARCHAR(20) NOT NULL,"
+    "  ok BOOLEAN DEFAULT TRUE,"
+    "  bullish BOOLEAN DEFAULT FALSE,"
+    "  result_json JSON,"
+    "  PRIMARY KEY (job_id, ticker)"
+    ") ENGINE=InnoDB"
+)
+
 VIEWS = {}
 VIEWS['portfolio_view'] = (
     "CREATE OR REPLACE VIEW portfolio_view AS "
@@ -0,0 +1,43 @@
+from utils.db import get_db
+from sqlalchemy import text
+from models import Portfolio, PortfolioTransaction
+from strategies.ledger import Ledger, EPS
+
+def migrate():
+    print("Migrating portfolio_transactions for the ledger...")
+    db = get_db()
+    session = db.get_db_session()
+    try:
+        found = session.execute(text(
+            "SHOW INDEX FROM portfolio_transactions WHERE Key_name = 'idx_txn_ledger'")).fetchall()
+        if not found:
+            print("Adding idx_txn_ledger index to portfolio_transactions table...")
+            session.execute(text("CREATE INDEX idx_txn_ledger ON portfolio_transactions (portfolio_id, date, id)"))
+            session.commit()
+
+        # Holdings entered before transactions were logged (or edited in place) get an opening
+        # BUY for the quantity the ledger does not account for, at the holding's average price
+        ledger = Ledger()
+        holdings = session.query(Portfolio).all()
+        opened = 0
+        for pid in sorted({h.portfolio_id for h in holdings}):
+            lots = ledger.state(pid).lots
+            held = lots.groupby("ticker")["quantity"].sum()
+            for h in (h for h in holdings if h.portfolio_id == pid):
+                missing = float(h.quantity or 0) - float(held.get(h.ticker, 0.0))
+                if missing > EPS:
+                    session.add(PortfolioTransaction(
+                        portfolio_id=pid, ticker=h.ticker, transaction_type='BUY', quantity=missing,
+                        price=h.avg_price or 0, date=h.purchase_date or h.created_at.date()))
+                    opened += 1
+        session.commit()
+        print(f"Opening balances added: {opened}")
+        print("portfolio_transactions is up to date.")
+    except Exception as e:
+        print(f"Migration Error: {e}")
+        session.rollback()
+    finally:
+        db.close_session()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,32 @@
+from utils.db import get_db
+from sqlalchemy import text
+
+# Columns the result cache (strategies/result_cache.py) keys per-strategy rows on
+COLUMNS = {
+    "bar_date": "DATE",
+    "version": "VARCHAR(32)",
+    "price": "FLOAT",
+}
+
+def migrate():
+    print("Migrating analysis_cache for result memoization...")
+    db = get_db()
+    session = db.get_db_session()
+    try:
+        for name, ddl in COLUMNS.items():
+            try:
+                session.execute(text(f"SELECT {name} FROM analysis_cache LIMIT 1"))
+            except Exception:
+                session.rollback()
+                print(f"Adding {name} column to analysis_cache table...")
+                session.execute(text(f"ALTER TABLE analysis_cache ADD COLUMN {name} {ddl}"))
+                session.commit()
+        print("analysis_cache is up to date.")
+    except Exception as e:
+        print(f"Migration Error: {e}")
+        session.rollback()
+    finally:
+        db.close_session()
+
+if __name__ == "__main__":
+    migrate()
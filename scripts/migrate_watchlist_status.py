@@ -0,0 +1,25 @@
+from utils.db import get_db
+from sqlalchemy import text
+
+def migrate():
+    print("Migrating watchlist for local ticker validation...")
+    db = get_db()
+    session = db.get_db_session()
+    try:
+        try:
+            session.execute(text("SELECT status FROM watchlist LIMIT 1"))
+        except Exception:
+            session.rollback()
+            # Existing rows were validated by a download when added: they are active
+            print("Adding status column to watchlist table...")
+            session.execute(text("ALTER TABLE watchlist ADD COLUMN status VARCHAR(10) NOT NULL DEFAULT 'active'"))
+            session.commit()
+        print("watchlist is up to date.")
+    except Exception as e:
+        print(f"Migration Error: {e}")
+        session.rollback()
+    finally:
+        db.close_session()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,40 @@
+import argparse
+import time
+from strategies.sweep import run_sweep, grid, random_configs, DEFAULT_SPACE
+from utils.data_loader import load_price_panel, BENCHMARK_TICKER
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Trend Template thresholds with walk-forward ranking")
+    parser.add_argument("--tickers", nargs="*", help="Universe (default: every ticker in market_data)")
+    parser.add_argument("--random", type=int, default=0, help="Sample N random configs instead of the full grid")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--objective", default="sharpe", choices=["sharpe", "return", "hit_rate"])
+    parser.add_argument("--workers", type=int, default=None, help="Default: all cores")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    panel = load_price_panel(args.tickers, fields=["Open", "High", "Low", "Close"])
+    if not panel:
+        print("No market_data available.")
+        return
+
+    benchmark = None
+    if BENCHMARK_TICKER in panel["Close"].columns:
+        benchmark = panel["Close"][BENCHMARK_TICKER]
+        panel = {k: v.drop(columns=[BENCHMARK_TICKER]) for k, v in panel.items()}
+
+    configs = random_configs(DEFAULT_SPACE, args.random) if args.random else grid(DEFAULT_SPACE)
+    print(f"Sweeping {len(configs)} configs over {panel['Close'].shape[1]} tickers x {len(panel['Close'])} days")
+
+    t0 = time.time()
+    res = run_sweep(panel, configs, folds=args.folds, objective=args.objective, benchmark=benchmark,
+                    max_workers=args.workers,
+                    progress=lambda i, n: print(f"  {i}/{n}", end="\r"))
+    print(f"\nDone in {time.time() - t0:.1f}s\n")
+
+    print(res["ranking"].head(args.top).to_string())
+    print("\nWalk-forward picks (out-of-sample):")
+    print(res["walk_forward"].to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import argparse
+import time
+from strategies.rs_rating import update_rs_history, top_rated
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute universe RS Ratings from market_data into rs_history")
+    parser.add_argument("--full", action="store_true", help="Recompute the whole history instead of only new days")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    n = update_rs_history(full=args.full)
+    print(f"Wrote {n} RS rows in {time.time() - t0:.1f}s")
+
+    print("\nTop 20:")
+    for r in top_rated(min_rating=0, limit=20):
+        print(f"  {r['ticker']:<16} {r['rating']:>3}  ({r['raw_score']:+.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+import time
+from strategies.vcp import update_bases, get_latest_bases
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect bases / VCPs across the stored universe into vcp_bases")
+    parser.add_argument("--tickers", nargs="*", help="Limit to these tickers (default: everything in market_data)")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    n = update_bases(args.tickers or None)
+    print(f"Wrote {n} bases in {time.time() - t0:.1f}s")
+
+    vcps = get_latest_bases(vcp_only=True)
+    print(f"\nVCP setups: {len(vcps)}")
+    for t, b in sorted(vcps.items(), key=lambda kv: kv[1]["final_depth"]):
+        depths = " > ".join(f"{d:g}%" for d in b["depths"])
+        print(f"  {t:<16} pivot {b['pivot_price']:>10.2f}  {b['contractions']}T  {depths}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import utils.technical_indicators as ta
+from .minervini import MinerviniStrategy
+
+# Same thresholds as the live strategy
+TREND_TEMPLATE_DEFAULTS = MinerviniStrategy.DEFAULT_PARAMS
+
+BACKTEST_DEFAULTS = {
+    "pivot_window": 20,      # breakout above prior N-day high
+    "stop_pct": 0.08,        # 8% stop loss from entry
+    "dual_lookback": None,   # optional Dual Momentum filter (e.g. 252)
+    "rs_min": None,          # optional RS Rating floor (e.g. 70), ranked within the panel
+}
+
+# Rule names, in Trend Template order
+CONDITION_NAMES = MinerviniStrategy.RULES.names
+
+
+def trend_template_conditions(close: pd.DataFrame, **params) -> dict:
+    """
+    All eight Trend Template conditions for EVERY bar - the same rules MinerviniStrategy
+    checks on the last bar (MinerviniStrategy.RULES).
+    close can be a Series (one ticker) or a dates x tickers frame (whole universe at once).
+    Returns {condition_name: boolean frame}. Warm-up bars (NaN indicators) are False.
+    """
+    return MinerviniStrategy.RULES.evaluate({"Close": close}, **params)
+
+
+def trend_template_mask(close: pd.DataFrame, **params) -> pd.DataFrame:
+    """True where all eight conditions hold."""
+    return MinerviniStrategy.RULES.mask({"Close": close}, **params)
+
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """For each position i, the first j >= i where mask[j] is True (len(mask) if none)."""
+    n = len(mask)
+    pos = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(pos[::-1])[::-1]
+
+
+def extract_trades(ticker: str, dates, open_, high, low, close, entry_signal, sma50,
+                   stop_pct: float = BACKTEST_DEFAULTS["stop_pct"]) -> list:
+    """
+    Turns per-bar signals for one ticker into trades.
+    Entry at the close of a signal bar. Exit at the first later bar where either
+    the low breaches the stop (filled at the stop, or the open if it gapped through)
+    or the close is below the 50 SMA (filled at the close).
+    Loops once per TRADE (not per bar); the searches are numpy lookups.
+    """
+    n = len(close)
+    next_entry = _next_true(entry_signal)
+    next_sma_exit = _next_true(close < sma50)
+
+    trades = []
+    i = next_entry[0] if n else 0
+    while i < n:
+        entry_px = close[i]
+        stop_px = entry_px * (1 - stop_pct)
+
+        # Stop search depends on entry price, so it is per trade
+        hits = np.flatnonzero(low[i + 1:] <= stop_px)
+        stop_at = i + 1 + hits[0] if len(hits) else n
+        sma_at = next_sma_exit[i + 1] if i + 1 < n else n
+
+        if stop_at <= sma_at and stop_at < n:
+            exit_at, exit_px, reason = stop_at, min(open_[stop_at], stop_px), "STOP"
+        elif sma_at < n:
+            exit_at, exit_px, reason = sma_at, close[sma_at], "SMA50"
+        else:
+            exit_at, exit_px, reason = n - 1, close[n - 1], "OPEN"
+
+        trades.append({
+            "ticker": ticker,
+            "entry_date": dates[i],
+            "entry_price": float(entry_px),
+            "exit_date": dates[exit_at],
+            "exit_price": float(exit_px),
+            "exit_reason": reason,
+            "bars_held": int(exit_at - i),
+            "return_pct": float((exit_px / entry_px - 1) * 100),
+            "_entry_pos": int(i),
+            "_exit_pos": int(exit_at),
+        })
+
+        if exit_at + 1 >= n:
+            break
+        i = next_entry[exit_at + 1]
+
+    return trades
+
+
+def dual_momentum_mask(close: pd.DataFrame, lookback: int, benchmark: pd.Series = None) -> pd.DataFrame:
+    """
+    DualMomentumStrategy for every bar: N-bar return > 0 (absolute) and > benchmark's (relative).
+    Without a benchmark only the absolute leg is applied.
+    """
+    ret = close / close.shift(lookback) - 1
+    mask = ret > 0
+    if benchmark is not None:
+        bench = benchmark.reindex(close.index)
+        bench_ret = bench / bench.shift(lookback) - 1
+        mask &= ret.gt(bench_ret, axis=0)
+    return mask
+
+
+def backtest_trend_template(panel: dict, start=None, template_params: dict = None,
+                            benchmark: pd.Series = None, **params) -> dict:
+    """
+    Vectorized Trend Template backtest over a price panel
+    ({'Open','High','Low','Close'}: dates x tickers, see utils.data_loader.load_price_panel).
+
+    Entry: template passes AND close breaks above the prior `pivot_window`-day high
+    (AND Dual Momentum passes, if `dual_lookback` is set; AND RS Rating >= `rs_min`, if set).
+    Exit: `stop_pct` stop loss or close below the 50 SMA.
+    The equity curve is equal-weight across open positions (cash when flat).
+    start: first date allowed to trade (history before it is still used for indicators).
+    """
+    p = {**BACKTEST_DEFAULTS, **params}
+    close = panel["Close"]
+    high = panel.get("High", close)
+    low = panel.get("Low", close)
+    open_ = panel.get("Open", close)
+
+    template = trend_template_mask(close, **(template_params or {}))
+    pivot = high.rolling(window=p["pivot_window"]).max().shift(1)
+    entry_signal = template & (close > pivot)
+    if p["dual_lookback"]:
+        entry_signal &= dual_momentum_mask(close, int(p["dual_lookback"]), benchmark)
+    if p["rs_min"]:
+        from .rs_rating import rs_rating_panel
+        _, rating = rs_rating_panel(close)
+        entry_signal &= rating >= p["rs_min"]
+    if start is not None:
+        entry_signal.loc[entry_signal.index < pd.Timestamp(start)] = False
+
+    sma50 = ta.sma(close, 50)
+    dates = close.index
+
+    # Daily returns; a held position earns close-to-close, the exit bar uses the fill price
+    rets = close.pct_change().to_numpy(copy=True)
+    held = np.zeros(close.shape, dtype=bool)
+
+    trades = []
+    for j, ticker in enumerate(close.columns):
+        c = close.iloc[:, j].to_numpy(dtype=float)
+        valid = ~np.isnan(c)
+        if not valid.any():
+            continue
+        t_trades = extract_trades(
+            ticker, dates,
+            open_.iloc[:, j].to_numpy(dtype=float),
+            high.iloc[:, j].to_numpy(dtype=float),
+            low.iloc[:, j].to_numpy(dtype=float),
+            c,
+            entry_signal.iloc[:, j].to_numpy(dtype=bool),
+            sma50.iloc[:, j].to_numpy(dtype=float),
+            stop_pct=p["stop_pct"],
+        )
+        for t in t_trades:
+            e, x = t["_entry_pos"], t["_exit_pos"]
+            held[e + 1:x + 1, j] = True
+            if x > e and x > 0 and c[x - 1] > 0:
+                rets[x, j] = t["exit_price"] / c[x - 1] - 1
+        trades.extend(t_trades)
+
+    equity = equity_curve(rets, held, dates)
+    trades_df = pd.DataFrame(trades).drop(columns=["_entry_pos", "_exit_pos"], errors="ignore")
+    return {
+        "trades": trades_df,
+        "equity": equity,
+        "stats": summarize(trades_df, equity),
+    }
+
+
+def equity_curve(rets: np.ndarray, held: np.ndarray, dates) -> pd.Series:
+    """Equal-weight daily return of held positions compounded into an equity curve (starts at 1.0)."""
+    r = np.where(held, np.nan_to_num(rets), 0.0)
+    n_held = held.sum(axis=1)
+    daily = np.divide(r.sum(axis=1), n_held, out=np.zeros(len(n_held)), where=n_held > 0)
+    return pd.Series(np.cumprod(1 + daily), index=dates, name="equity")
+
+
+def max_drawdown(equity: pd.Series) -> float:
+    """Largest peak-to-trough fall, as a negative percent."""
+    if equity is None or equity.empty:
+        return 0.0
+    peak = equity.cummax()
+    return float(((equity / peak) - 1).min() * 100)
+
+
+def summarize(trades: pd.DataFrame, equity: pd.Series) -> dict:
+    if trades is None or trades.empty:
+        return {"trades": 0, "hit_rate": 0.0, "avg_return": 0.0, "avg_win": 0.0, "avg_loss": 0.0,
+                "total_return": 0.0, "cagr": 0.0, "max_drawdown": 0.0}
+
+    wins = trades[trades["return_pct"] > 0]["return_pct"]
+    losses = trades[trades["return_pct"] <= 0]["return_pct"]
+    total = float(equity.iloc[-1] - 1) * 100 if len(equity) else 0.0
+    years = (equity.index[-1] - equity.index[0]).days / 365.25 if len(equity) > 1 else 0
+    cagr = ((equity.iloc[-1]) ** (1 / years) - 1) * 100 if years > 0 and equity.iloc[-1] > 0 else 0.0
+
+    return {
+        "trades": int(len(trades)),
+        "hit_rate": float(len(wins) / len(trades) * 100),
+        "avg_return": float(trades["return_pct"].mean()),
+        "avg_win": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss": float(losses.mean()) if len(losses) else 0.0,
+        "total_return": total,
+        "cagr": float(cagr),
+        "max_drawdown": max_drawdown(equity),
+    }
+
+
+def run_backtest(tickers: list = None, start=None, history_start=None, **params) -> dict:
+    """Backtest the stored universe (market_data) - no network calls."""
+    from utils.data_loader import load_price_panel
+    panel = load_price_panel(tickers, start=history_start, fields=["Open", "High", "Low", "Close"])
+    if not panel:
+        return {"trades": pd.DataFrame(), "equity": pd.Series(dtype=float), "stats": summarize(None, None)}
+    return backtest_trend_template(panel, start=start, **params)
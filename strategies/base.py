@@ -1,11 +1,106 @@
 from abc import ABC, abstractmethod
+import hashlib
+import importlib
+import inspect
+import json
+import sys
 import pandas as pd
 
+_SOURCE_DIGESTS = {}
+
+def module_digest(module) -> str:
+    """Hash of a module's source (code changes => new digest); cached per module."""
+    digest = _SOURCE_DIGESTS.get(module)
+    if digest is None:
+        try:
+            source = inspect.getsource(module)
+        except (OSError, TypeError):
+            source = module.__name__
+        digest = _SOURCE_DIGESTS[module] = hashlib.sha1(source.encode()).hexdigest()
+    return digest
+
+def _source_digest(cls) -> str:
+    """Hash of the modules defining cls and its bases, and of the modules they declare in `dependencies`."""
+    h = hashlib.sha1()
+    for klass in cls.__mro__:
+        module = sys.modules.get(klass.__module__)
+        if module is None or klass.__module__ in ("builtins", "abc"):
+            continue
+        h.update(module_digest(module).encode())
+        for name in sorted(vars(klass).get("dependencies", ())):
+            h.update(module_digest(importlib.import_module(name)).encode())
+    return h.hexdigest()
+
 class MomentumStrategy(ABC):
     """
     Abstract Base Class for Momentum Strategies.
     """
+
+    @property
+    def data_requirements(self) -> dict:
+        """
+        What analyze() needs, so the manager can load only that window:
+        {
+            "lookback_bars": int,   # most recent bars required (incl. indicator warm-up)
+            "columns": [ "Close" ], # OHLCV columns read
+            "benchmark": bool       # needs the benchmark series
+        }
+        """
+        return {"lookback_bars": 260, "columns": ["Close"], "benchmark": False}
+
+    # Results depend only on the price bars (and the code/parameters, plus whatever cache_token
+    # names), so they can be memoized per last bar (strategies/result_cache.py).
+    # False for strategies whose other inputs can't be summarized by a token.
+    cacheable = True
+
+    # Bars of history the strategy's chart needs before its first visible bar (its longest
+    # moving average); the manager loads the chart window plus the largest of these.
+    chart_warmup_bars = 0
+
+    # Other modules whose code shapes a result (rule engines, indicators, chart builders), by
+    # name; hashed into cache_version along with the strategy's own module.
+    dependencies = ()
+
+    @property
+    def cache_version(self) -> str:
+        """
+        Identifies the code and parameters behind a result: a digest of the strategy's source
+        plus its simple (JSON-able) instance attributes. Changing either invalidates cached results.
+        """
+        params = {}
+        for key, val in sorted(vars(self).items()):
+            try:
+                params[key] = json.dumps(val, sort_keys=True)
+            except (TypeError, ValueError):
+                continue # callables, clients, ... aren't parameters
+        h = hashlib.sha1(_source_digest(type(self)).encode())
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h.hexdigest()[:16]
+
+    def cache_token(self, ticker: str):
+        """
+        Inputs other than the bars that a result depends on (e.g. a precomputed rating's date),
+        as a short string; part of result cache keys and HTTP validators.
+        None when bars + cache_version say it all.
+        """
+        return None
+
+    @staticmethod
+    def chart_kwargs(chart_options: dict = None):
+        """Figure builder kwargs from chart_options, or None when charts are disabled."""
+        opts = dict(chart_options or {})
+        if opts.pop("disabled", False):
+            return None
+        return opts
     
+    def screen(self, ticker: str, data: pd.DataFrame, stats=None) -> dict:
+        """
+        Screening mode: only the verdict matters, so strategies may stop at the first failed
+        condition and skip details/charts. stats: a rules.ScreenStats for rejection counters.
+        Default: a chart-less analyze().
+        """
+        return self.analyze(ticker, data, chart_options={"disabled": True})
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -13,9 +108,11 @@ class MomentumStrategy(ABC):
         pass
 
     @abstractmethod
-    def analyze(self, ticker: str, data: pd.DataFrame) -> dict:
+    def analyze(self, ticker: str, data: pd.DataFrame, chart_options: dict = None) -> dict:
         """
         Analyze the stock data and return a result dictionary.
+        chart_options: passed through to the figure builder ({"date_range": ..., "max_points": ...}).
+                       {"disabled": True} skips the chart (chart_json is None).
         
         Expected Return Format:
         {
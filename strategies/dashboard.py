@@ -0,0 +1,92 @@
+"""
+Dashboard snapshot: the landing page as a ready-to-render document.
+
+The portfolio aggregates, the benchmark trend (a Minervini verdict on ^NSEI) and the breadth
+count are computed off the request path by DashboardService and published as an immutable
+DashboardSnapshot; home() only reads the current reference.
+Rebuilt in the background (readers keep the previous snapshot meanwhile):
+  - after data-change events (PortfolioManager.listeners: holdings edited, analyses saved),
+    coalesced - a scan saving thousands of analyses causes one rebuild per MIN_INTERVAL;
+  - every REFRESH_EVERY otherwise, which picks up new bars and prices.
+"""
+import datetime
+import threading
+import time
+from utils.market_calendar import IST
+
+REFRESH_EVERY = datetime.timedelta(minutes=10)
+MIN_INTERVAL = datetime.timedelta(seconds=30)
+
+
+class DashboardSnapshot:
+    """Immutable dashboard document; shared by readers without locks."""
+    __slots__ = ("portfolios", "metrics", "built_at")
+
+    def __init__(self, portfolios, metrics, built_at=None):
+        object.__setattr__(self, "portfolios", tuple(portfolios))
+        object.__setattr__(self, "metrics", metrics)
+        object.__setattr__(self, "built_at", built_at or datetime.datetime.now(IST))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("DashboardSnapshot is immutable")
+
+
+class DashboardService:
+    """
+    get(): current snapshot (built synchronously only the first time).
+    invalidate(): marks it outdated; the refresher thread rebuilds it.
+    """
+
+    def __init__(self, portfolio_mgr, refresh_every: datetime.timedelta = REFRESH_EVERY,
+                 min_interval: datetime.timedelta = MIN_INTERVAL):
+        self.portfolio_mgr = portfolio_mgr
+        self.refresh_every = refresh_every
+        self.min_interval = min_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def get(self) -> DashboardSnapshot:
+        snap = self._snapshot
+        if snap is None:
+            snap = self.refresh()
+        self._ensure_refresher()
+        return snap
+
+    def refresh(self) -> DashboardSnapshot:
+        with self._lock:
+            snap = DashboardSnapshot(self.portfolio_mgr.get_all_portfolios_summary(),
+                                     self.portfolio_mgr.get_dashboard_metrics())
+            self._snapshot = snap
+            return snap
+
+    def invalidate(self, *event):
+        """Data changed (signature fits PortfolioManager.listeners)."""
+        self._dirty.set()
+        self._ensure_refresher()
+
+    def _ensure_refresher(self):
+        # Started lazily: a thread started before a fork (preloaded server) would not exist in workers
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="dashboard-refresh", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            changed = self._dirty.wait(timeout=self.refresh_every.total_seconds())
+            snap = self._snapshot
+            if changed and snap is not None:
+                # Let a burst of events settle into one rebuild
+                age = datetime.datetime.now(IST) - snap.built_at
+                if age < self.min_interval:
+                    time.sleep((self.min_interval - age).total_seconds())
+            self._dirty.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Dashboard refresh failed: {e}")
@@ -1,28 +1,41 @@
 from .base import MomentumStrategy
 import pandas as pd
-from utils.visualization import plot_relative_strength
-from utils.data_loader import fetch_benchmark_data
+from utils.visualization import plot_relative_strength, RS_SMA_WINDOW
+from utils.benchmark_service import get_benchmark_service, BenchmarkSnapshot
 
 class DualMomentumStrategy(MomentumStrategy):
+    dependencies = ("utils.benchmark_service", "utils.visualization", "utils.chart_encoding")
+    # RS line SMA, with the same alignment slack as data_requirements
+    chart_warmup_bars = int(RS_SMA_WINDOW * 1.05)
+
     def __init__(self, benchmark_ticker: str = "^NSEI", lookback_days: int = 252):
         self.benchmark_ticker = benchmark_ticker
         self.lookback_days = lookback_days
-        # Cache benchmark data separately if needed, or fetch per call?
-        # Fetching per call is safer for now to ensure alignment, cached by lru_cache in data_loader if we added it.
-        # For now, explicit fetch.
-        self.benchmark_data = None
 
     @property
     def name(self) -> str:
         return "Dual Momentum (Antonacci)"
 
+    @property
+    def data_requirements(self) -> dict:
+        # +5% slack for days the stock traded but the benchmark didn't (lost in alignment)
+        bars = int((self.lookback_days + 1) * 1.05)
+        return {"lookback_bars": bars, "columns": ["Close"], "benchmark": True}
+
     def _get_benchmark(self):
-        if self.benchmark_data is None:
-            self.benchmark_data = fetch_benchmark_data()
-        return self.benchmark_data
+        # Shared across strategies/threads; refreshed by the service once per session
+        return get_benchmark_service().get(self.benchmark_ticker)
+
+    def cache_token(self, ticker: str):
+        # The verdict also depends on the benchmark: a new ^NSEI bar makes cached results stale
+        benchmark = self._get_benchmark()
+        as_of = getattr(benchmark, "as_of", None)
+        return None if as_of is None else pd.Timestamp(as_of).strftime("%Y-%m-%d")
 
-    def analyze(self, ticker: str, data: pd.DataFrame) -> dict:
+    def analyze(self, ticker: str, data: pd.DataFrame, chart_options: dict = None) -> dict:
         benchmark = self._get_benchmark()
+        if benchmark is not None and not isinstance(benchmark, BenchmarkSnapshot):
+            benchmark = BenchmarkSnapshot.from_frame(self.benchmark_ticker, benchmark)
         
         if data is None or len(data) < self.lookback_days:
              print(f"Dual Mom Fail {ticker}: len={len(data) if data is not None else 'None'}")
@@ -36,8 +49,9 @@ class DualMomentumStrategy(MomentumStrategy):
              }
         
         if benchmark is None or len(benchmark) < self.lookback_days:
+             # Nothing to judge the stock against (yet) - not a verdict, so never cached
              return {
-                 "status": "FAIL", 
+                 "status": "N/A", 
                  "signal": "NEUTRAL", 
                  "details": ["Benchmark Data Unavailable"], 
                  "metrics": {}, 
@@ -45,9 +59,9 @@ class DualMomentumStrategy(MomentumStrategy):
                  "chart_path": None
              }
 
-        # Align Data
-        common_idx = data.index.intersection(benchmark.index)
-        if len(common_idx) < self.lookback_days:
+        # Align Data (range lookup when the calendars match)
+        stock_series, bench_series = benchmark.aligned_close(data)
+        if len(stock_series) < self.lookback_days:
             return {
                 "status": "FAIL", 
                 "signal": "NEUTRAL", 
@@ -56,9 +70,7 @@ class DualMomentumStrategy(MomentumStrategy):
                 "score": "0/2", 
                 "chart_path": None
             }
-            
-        stock_series = data.loc[common_idx]['Close']
-        bench_series = benchmark.loc[common_idx]['Close']
+
 
         # 1. Absolute Momentum: 12-Month Return > Risk Free (0 for simplicity)
         curr_price = stock_series.iloc[-1]
@@ -91,8 +103,10 @@ class DualMomentumStrategy(MomentumStrategy):
         # Chart
         # OLD: chart_path = plot_relative_strength(ticker, data, benchmark)
         from utils.visualization import create_relative_strength_figure
-        fig = create_relative_strength_figure(ticker, data, benchmark)
-        chart_json = fig.to_json()
+        chart_kwargs = self.chart_kwargs(chart_options)
+        chart_json = None
+        if chart_kwargs is not None:
+            chart_json = create_relative_strength_figure(ticker, data, benchmark, **chart_kwargs).to_json()
 
         return {
             "strategy": self.name,
@@ -0,0 +1,295 @@
+"""
+Transaction ledger: positions derived from portfolio_transactions.
+
+The `portfolio` table is a mutable snapshot (weighted average on buy); the ledger replays the
+BUY/SELL log instead and yields, per ticker, the open FIFO lots, their average cost, the
+realized P&L of the sells and the unrealized P&L at the latest close.
+
+FIFO matching runs for all tickers at once, without a per-trade loop: each ticker's buys and
+sells are laid on a cumulative-quantity axis, and the cost of what a sell consumes is the
+difference of the cumulative buy cost at both ends of its interval (one np.interp over the
+tickers' concatenated axes). Sells beyond the open quantity are ignored and reported as unmatched.
+
+State is maintained incrementally: Ledger.state() applies only the transactions after the last
+one applied, in ledger order (date, id). Every CHECKPOINT_EVERY applied transactions the state
+(open lots + realized totals) is saved to ledger_checkpoints, so a new process replays only what
+came after it. A checkpoint records the count and id sum of the transactions it covers; a
+backdated or deleted transaction changes them and the portfolio is replayed from the start.
+"""
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from utils.db import get_db
+
+CHECKPOINT_EVERY = 200  # transactions applied since the last checkpoint
+EPS = 1e-9
+
+LOT_COLUMNS = ["ticker", "date", "quantity", "price", "txn_id"]
+REALIZED_COLUMNS = ["realized", "sold", "unmatched"]
+
+
+def _empty_lots() -> pd.DataFrame:
+    return pd.DataFrame({"ticker": pd.Series(dtype=object), "date": pd.Series(dtype=object),
+                         "quantity": pd.Series(dtype=float), "price": pd.Series(dtype=float),
+                         "txn_id": pd.Series(dtype="int64")})
+
+
+def _empty_realized() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in REALIZED_COLUMNS},
+                        index=pd.Index([], name="ticker", dtype=object))
+
+
+def apply_transactions(lots: pd.DataFrame, txns: pd.DataFrame):
+    """
+    FIFO-matches txns (id, ticker, transaction_type, quantity, price, date - in ledger order)
+    against the open lots (LOT_COLUMNS, oldest first per ticker).
+    Returns (open lots, per-ticker [realized, sold, unmatched] of these txns).
+    """
+    side = txns["transaction_type"].str.upper()
+    events = pd.concat([
+        pd.DataFrame({"ticker": lots["ticker"], "date": lots["date"], "price": lots["price"],
+                      "txn_id": lots["txn_id"], "buy": lots["quantity"], "sell": 0.0}),
+        pd.DataFrame({"ticker": txns["ticker"], "date": txns["date"], "price": txns["price"],
+                      "txn_id": txns["id"],
+                      "buy": txns["quantity"].where(side == "BUY", 0.0),
+                      "sell": txns["quantity"].where(side == "SELL", 0.0)}),
+    ], ignore_index=True)
+    # Tickers become contiguous segments; a stable sort keeps the ledger order inside each
+    events = events.sort_values("ticker", kind="stable").reset_index(drop=True)
+    by_ticker = events.groupby("ticker", sort=False)
+    bought = by_ticker["buy"].cumsum()
+    sold = by_ticker["sell"].cumsum()
+
+    # Cumulative quantity matched so far: sells clipped to what was open at the time,
+    # e_k = min(e_{k-1} + sell_k, bought_k) == sold_k + min(0, min_{j<=k}(bought_j - sold_j))
+    headroom = (bought - sold).groupby(events["ticker"], sort=False).cummin()
+    matched_to = sold + np.minimum(0.0, headroom)
+    matched_from = matched_to.groupby(events["ticker"], sort=False).shift(fill_value=0.0)
+
+    # Cumulative buy cost over all tickers' buy quantity axes laid end to end
+    axis_end = events["buy"].cumsum()
+    offset = axis_end - bought  # where this ticker's axis starts
+    is_buy = events["buy"] > EPS
+    xp = np.concatenate([[0.0], axis_end[is_buy].to_numpy()])
+    fp = np.concatenate([[0.0], (events["buy"] * events["price"]).cumsum()[is_buy].to_numpy()])
+    cost = np.interp(offset + matched_to, xp, fp) - np.interp(offset + matched_from, xp, fp)
+
+    matched = matched_to - matched_from
+    per_event = pd.DataFrame({
+        "ticker": events["ticker"],
+        "realized": matched * events["price"] - cost,
+        "sold": matched,
+        "unmatched": events["sell"] - matched,
+    })
+    realized = per_event[events["sell"] > 0].groupby("ticker")[REALIZED_COLUMNS].sum()
+
+    # Open remainder of each buy lot: the part of [bought - buy, bought] past the final matched qty
+    consumed = matched_to.groupby(events["ticker"], sort=False).transform("last")
+    start = bought - events["buy"]
+    remaining = (bought - np.maximum(start, consumed)).clip(lower=0.0)
+    keep = is_buy & (remaining > EPS)
+    open_lots = events.loc[keep, ["ticker", "date", "price", "txn_id"]].assign(quantity=remaining[keep])
+    return open_lots[LOT_COLUMNS].reset_index(drop=True), realized
+
+
+def available(txns: pd.DataFrame, on_date) -> float:
+    """
+    Shares a SELL dated on_date can take from one ticker's txns (in ledger order) without
+    overselling: what is held after that day's transactions, and no more than is held at any
+    later point (a backdated sell also shrinks every position after it).
+    """
+    if txns.empty:
+        return 0.0
+    signed = txns["quantity"].where(txns["transaction_type"].str.upper() == "BUY", -txns["quantity"])
+    raw = signed.cumsum()
+    held = raw - np.minimum(0.0, raw.cummin())  # sells beyond the open quantity are ignored
+    before = (txns["date"] <= on_date).to_numpy()
+    at = float(held[before].iloc[-1]) if before.any() else 0.0
+    later = held[~before]
+    return min(at, float(later.min())) if not later.empty else at
+
+
+class LedgerState:
+    """Open lots and cumulative realized totals of one portfolio, as of a ledger position."""
+
+    def __init__(self, lots=None, realized=None, as_of=None, last_id=0, count=0, id_sum=0, checkpointed=0):
+        self.lots = _empty_lots() if lots is None else lots
+        self.realized = _empty_realized() if realized is None else realized
+        self.as_of = as_of          # (as_of, last_id): last transaction applied, in ledger order
+        self.last_id = last_id
+        self.count = count          # transactions applied, and the sum of their ids
+        self.id_sum = id_sum
+        self.checkpointed = checkpointed  # count at the last saved checkpoint
+
+    def apply(self, txns: pd.DataFrame) -> "LedgerState":
+        """New state with txns (after this one, in ledger order) applied."""
+        lots, realized = apply_transactions(self.lots, txns)
+        realized = self.realized.add(realized, fill_value=0.0)
+        last = txns.iloc[-1]
+        return LedgerState(lots, realized, last["date"], int(last["id"]),
+                           self.count + len(txns), self.id_sum + int(txns["id"].sum()), self.checkpointed)
+
+    def to_json(self) -> dict:
+        lots = self.lots.assign(date=self.lots["date"].map(lambda d: d.isoformat() if d else None))
+        return {
+            "lots": lots.to_dict(orient="records"),
+            "realized": {t: list(map(float, row)) for t, row in zip(self.realized.index, self.realized.to_numpy())},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict, **position) -> "LedgerState":
+        lots = pd.DataFrame(data.get("lots") or [], columns=LOT_COLUMNS)
+        if lots.empty:
+            lots = _empty_lots()
+        else:
+            lots["date"] = lots["date"].map(lambda d: datetime.date.fromisoformat(d) if d else None)
+            lots = lots.astype({"quantity": float, "price": float, "txn_id": "int64"})
+        realized = _empty_realized()
+        if data.get("realized"):
+            realized = pd.DataFrame.from_dict(data["realized"], orient="index", columns=REALIZED_COLUMNS)
+            realized.index.name = "ticker"
+        return cls(lots, realized, **position)
+
+
+class Ledger:
+    """
+    state(pid): LedgerState brought up to date (only new transactions are applied).
+    positions(pid): per-ticker quantity, FIFO cost, average cost, realized and unrealized P&L.
+    rebuild(pid): full replay, ignoring checkpoints.
+    """
+
+    def __init__(self, checkpoint_every: int = CHECKPOINT_EVERY):
+        self.checkpoint_every = checkpoint_every
+        self._states = {}  # portfolio_id -> newest LedgerState in this process
+        # Reentrant: writers hold it across check-then-insert (PortfolioManager.sell_stock)
+        self.lock = threading.RLock()
+
+    def state(self, portfolio_id) -> LedgerState:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            with self.lock:
+                st = self._states.get(portfolio_id) or self._load_checkpoint(session, portfolio_id) or LedgerState()
+                if st.count and not self._covers(session, portfolio_id, st):
+                    print(f"Ledger {portfolio_id}: transactions changed before {st.as_of}, replaying")
+                    st = LedgerState()
+                txns = self._fetch(session, portfolio_id, st)
+                if not txns.empty:
+                    st = st.apply(txns)
+                    if st.count - st.checkpointed >= self.checkpoint_every:
+                        self._save_checkpoint(session, portfolio_id, st)
+                self._states[portfolio_id] = st
+                return st
+        finally:
+            db.close_session()
+
+    def rebuild(self, portfolio_id) -> LedgerState:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            with self.lock:
+                st = LedgerState()
+                txns = self._fetch(session, portfolio_id, st)
+                if not txns.empty:
+                    st = st.apply(txns)
+                self._save_checkpoint(session, portfolio_id, st)
+                self._states[portfolio_id] = st
+                return st
+        finally:
+            db.close_session()
+
+    def positions(self, portfolio_id, prices=None) -> pd.DataFrame:
+        """
+        Indexed by ticker (closed positions included while they carry realized P&L).
+        prices: {ticker: price}; defaults to the latest close (cost basis if none, like load_portfolio).
+        """
+        st = self.state(portfolio_id)
+        lots = st.lots.assign(cost=st.lots["quantity"] * st.lots["price"])
+        pos = lots.groupby("ticker").agg(quantity=("quantity", "sum"), cost=("cost", "sum"),
+                                         first_date=("date", "min"), lots=("txn_id", "count"))
+        pos = pos.join(st.realized, how="outer")
+        pos[["quantity", "cost"] + REALIZED_COLUMNS] = pos[["quantity", "cost"] + REALIZED_COLUMNS].fillna(0.0)
+        pos["lots"] = pos["lots"].fillna(0).astype(int)
+        pos["avg_cost"] = (pos["cost"] / pos["quantity"].where(pos["quantity"] > EPS)).fillna(0.0)
+
+        if prices is None:
+            prices = self._latest_closes(list(pos.index[pos["quantity"] > EPS]))
+        pos["price"] = pd.Series(prices, dtype=float).reindex(pos.index).fillna(pos["avg_cost"])
+        pos["market_value"] = pos["quantity"] * pos["price"]
+        pos["unrealized"] = pos["market_value"] - pos["cost"]
+        pos.index.name = "ticker"
+        return pos
+
+    def transactions(self, portfolio_id, ticker) -> pd.DataFrame:
+        """One ticker's transactions, in ledger order."""
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            return self._fetch(session, portfolio_id, LedgerState(), ticker=ticker)
+        finally:
+            db.close_session()
+
+    @staticmethod
+    def _covers(session, portfolio_id, st) -> bool:
+        """True while the transactions up to st's position are still exactly the ones it applied."""
+        from models import PortfolioTransaction as T
+        from sqlalchemy import func, or_
+        count, id_sum = session.query(func.count(T.id), func.coalesce(func.sum(T.id), 0)).filter(
+            T.portfolio_id == portfolio_id,
+            or_(T.date < st.as_of, (T.date == st.as_of) & (T.id <= st.last_id))).one()
+        return (count, int(id_sum)) == (st.count, st.id_sum)
+
+    @staticmethod
+    def _fetch(session, portfolio_id, st, ticker=None) -> pd.DataFrame:
+        """Transactions after st's position (of one ticker, if given), in ledger order."""
+        from models import PortfolioTransaction as T
+        from sqlalchemy import or_
+        q = session.query(T.id, T.ticker, T.transaction_type, T.quantity, T.price, T.date).filter(
+            T.portfolio_id == portfolio_id)
+        if ticker is not None:
+            q = q.filter(T.ticker == ticker)
+        if st.count:
+            q = q.filter(or_(T.date > st.as_of, (T.date == st.as_of) & (T.id > st.last_id)))
+        rows = q.order_by(T.date, T.id).all()
+        txns = pd.DataFrame(rows, columns=["id", "ticker", "transaction_type", "quantity", "price", "date"])
+        return txns.astype({"quantity": float, "price": float}) if not txns.empty else txns
+
+    @staticmethod
+    def _load_checkpoint(session, portfolio_id):
+        from models import LedgerCheckpoint
+        cp = session.get(LedgerCheckpoint, portfolio_id)
+        if cp is None:
+            return None
+        return LedgerState.from_json(cp.state or {}, as_of=cp.as_of, last_id=cp.last_txn_id or 0,
+                                     count=cp.txn_count or 0, id_sum=cp.id_sum or 0,
+                                     checkpointed=cp.txn_count or 0)
+
+    @staticmethod
+    def _save_checkpoint(session, portfolio_id, st):
+        from models import LedgerCheckpoint
+        try:
+            session.merge(LedgerCheckpoint(portfolio_id=portfolio_id, as_of=st.as_of, last_txn_id=st.last_id,
+                                           txn_count=st.count, id_sum=st.id_sum, state=st.to_json()))
+            session.commit()
+            st.checkpointed = st.count
+        except Exception as e:
+            session.rollback()
+            print(f"Ledger checkpoint failed for portfolio {portfolio_id}: {e}")
+
+    @staticmethod
+    def _latest_closes(tickers) -> dict:
+        if not tickers:
+            return {}
+        from models import MarketData
+        from sqlalchemy import func
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            latest = session.query(MarketData.ticker, func.max(MarketData.date).label("date")).filter(
+                MarketData.ticker.in_(tickers)).group_by(MarketData.ticker).subquery()
+            rows = session.query(MarketData.ticker, MarketData.close_price).join(
+                latest, (MarketData.ticker == latest.c.ticker) & (MarketData.date == latest.c.date)).all()
+            return {t: float(p) for t, p in rows if p is not None}
+        finally:
+            db.close_session()
@@ -1,45 +1,171 @@
 from .minervini import MinerviniStrategy
 from .dual_momentum import DualMomentumStrategy
-from utils.data_loader import fetch_stock_data
-from concurrent.futures import ThreadPoolExecutor
+from .rs_rating import RSRatingStrategy
+from .rules import ScreenStats
+from . import result_cache
+from .result_cache import ResultCache
+from utils.data_loader import fetch_stock_data, latest_bar_date
+from utils.http_cache import make_etag
+from utils import metrics
+from .base import module_digest
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import copy
+import math
+import os
+import pandas as pd
+
+# Thread backend default (I/O-bound: DB + yfinance)
+THREAD_WORKERS = 5
+
+# Submitted-but-unconsumed work per worker: bounds memory when the consumer is slow (streaming)
+IN_FLIGHT_PER_WORKER = 4
+
+TRADING_DAYS_PER_YEAR = 252
 
 class StrategyManager:
     def __init__(self):
         self.strategies = [
             MinerviniStrategy(),
-            DualMomentumStrategy() # Default args
+            DualMomentumStrategy(), # Default args
+            RSRatingStrategy()
         ]
+        # Screening-mode rejection counters per strategy (see screen_stats())
+        self._screen_stats = {s.name: ScreenStats() for s in self.strategies}
+        # Results memoized per (ticker, last bar, strategy version) - see result_cache.py
+        self.results = ResultCache()
     
-    def analyze_ticker(self, ticker: str):
+    def data_requirements(self, chart_options: dict = None, strategies: list = None) -> dict:
+        """
+        Union of the strategies' declared requirements, widened for charts if they are enabled.
+        strategies: subset to consider (default: all). lookback_bars=None means "everything stored"
+        (full-history chart).
+        """
+        strategies = self.strategies if strategies is None else strategies
+        reqs = [s.data_requirements for s in strategies]
+        bars = max((r["lookback_bars"] for r in reqs), default=0)
+        columns = set(['Close'])
+        for r in reqs:
+            columns.update(r["columns"])
+
+        opts = chart_options or {}
+        if not opts.get("disabled"):
+            warmup = max((s.chart_warmup_bars for s in strategies), default=0)
+            chart_bars = self._chart_bars(opts.get("date_range"), warmup)
+            bars = None if chart_bars is None else max(bars, chart_bars)
+
+        return {
+            "lookback_bars": bars,
+            "columns": [c for c in ['Open', 'High', 'Low', 'Close', 'Volume'] if c in columns],
+            "benchmark": any(r["benchmark"] for r in reqs),
+        }
+
+    @staticmethod
+    def _chart_bars(date_range, warmup):
+        """Bars a chart window needs, plus `warmup` bars for its indicators (None = full history)."""
+        from utils.chart_encoding import RANGE_OFFSETS
+        if not isinstance(date_range, str) or date_range not in RANGE_OFFSETS:
+            return None
+        days = (pd.Timestamp(0) + RANGE_OFFSETS[date_range] - pd.Timestamp(0)).days
+        return int(days * TRADING_DAYS_PER_YEAR / 365) + warmup
+
+    def subset(self, names) -> "StrategyManager":
+        """Manager over the named strategies only, sharing the result cache and screening counters."""
+        unknown = set(names) - {s.name for s in self.strategies}
+        if unknown:
+            raise ValueError(f"Unknown strategies: {', '.join(sorted(unknown))}")
+        sub = copy.copy(self)
+        sub.strategies = [s for s in self.strategies if s.name in names]
+        return sub
+
+    def result_tag(self, ticker: str, chart_options: dict = None, mode: str = "full"):
+        """
+        (etag, bar_date) identifying what analyze_ticker would return - without running it -
+        or None when the last bar is unknown. Changes with a new bar, a strategy's code or
+        parameters (cache_version), its other inputs (cache_token, e.g. Dual Momentum's
+        benchmark bar) and the request variant - the same inputs the result cache keys on.
+        """
+        bar_date = latest_bar_date(ticker)
+        if bar_date is None:
+            return None
+        if mode == "screen":
+            chart_options = {"disabled": True}
+        parts = [ticker, bar_date, result_cache.variant(mode, chart_options)]
+        for s in self.strategies:
+            parts.append(f"{s.name}={result_cache.result_version(s, ticker)}")
+        if not (chart_options or {}).get("disabled"):
+            import utils.visualization as visualization
+            parts.append(module_digest(visualization))
+        return make_etag(*parts), bar_date
+
+    def screen_stats(self) -> dict:
+        """Per-strategy, per-condition evaluation/rejection counters from screening mode."""
+        return {name: stats.snapshot() for name, stats in self._screen_stats.items()}
+
+    def analyze_ticker(self, ticker: str, chart_options: dict = None, mode: str = "full", bar_date=None):
         """
         Runs all strategies for a single ticker.
+        chart_options: {"date_range": ..., "max_points": ...} forwarded to each strategy's chart;
+        {"disabled": True} skips charts, so only the strategies' lookback window is loaded.
+        mode="screen": verdicts only - strategies stop at their first failed condition
+        (strategy.screen), no charts or rejection details.
+        Results are memoized per last bar: when every strategy hits, no history is loaded.
+        bar_date: the last bar as returned by result_tag for this request (skips a second sync).
         """
-        data = fetch_stock_data(ticker, period="5y")
+        if mode == "screen":
+            chart_options = {"disabled": True}
+        variant = result_cache.variant(mode, chart_options)
+        if bar_date is None:
+            bar_date = latest_bar_date(ticker)
+        cached = self._cached_results(ticker, bar_date, variant)
+        pending = [s for s in self.strategies if s.name not in cached]
+        current_price = next((p for p, _ in cached.values() if p is not None), None)
+
+        # Strategies that need no history (precomputed lookups) get an empty frame
+        data = pd.DataFrame()
+        if current_price is None or any(s.data_requirements["lookback_bars"] != 0 for s in pending):
+            req = self.data_requirements(chart_options, pending)
+            bars = req["lookback_bars"]
+            # Synced by latest_bar_date above (or result_tag) - just read the stored bars
+            data = fetch_stock_data(ticker, period="5y", bars=None if bars is None else max(bars, 1),
+                                    columns=req["columns"], sync=bar_date is None)
         
-        if data is None or data.empty:
-             return {
-                "ticker": ticker,
-                "error": "Data Not Found",
-                "results": {}
-            }
+            if data is None or data.empty:
+                 return {
+                    "ticker": ticker,
+                    "error": "Data Not Found",
+                    "results": {}
+                }
+            current_price = data['Close'].iloc[-1]
 
         results = {}
         overall_score = 0
         total_strategies = len(self.strategies)
         passed_strategies = 0
-        
-        current_price = data['Close'].iloc[-1]
+        computed = []
         
         for strategy in self.strategies:
             try:
-                res = strategy.analyze(ticker, data)
+                if strategy.name in cached:
+                    res = cached[strategy.name][1]
+                else:
+                    with metrics.STRATEGY_SECONDS.time(strategy=strategy.name, mode=mode):
+                        if mode == "screen":
+                            res = strategy.screen(ticker, data, stats=self._screen_stats.get(strategy.name))
+                        else:
+                            res = strategy.analyze(ticker, data, chart_options=chart_options)
+                    computed.append((strategy, res))
                 results[strategy.name] = res
                 if res['status'] == 'PASS':
                     passed_strategies += 1
+                elif res['status'] == 'N/A':
+                    # Nothing to evaluate (e.g. RS not computed yet) - don't count it against the stock
+                    total_strategies -= 1
             except Exception as e:
                 print(f"Strategy {strategy.name} failed for {ticker}: {e}")
                 results[strategy.name] = {"status": "ERROR", "details": [str(e)]}
 
+        self._store_results(ticker, bar_date, variant, mode, float(current_price), computed)
+
         return {
             "ticker": ticker,
             "price": round(current_price, 2),
@@ -51,10 +177,147 @@ class StrategyManager:
             "strategies": results
         }
 
-    def analyze_batch(self, tickers: list):
-        """Parallel analysis for a list of tickers."""
-        results = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            full_results = list(executor.map(self.analyze_ticker, tickers))
-            results.extend(full_results)
-        return results
+    def _cached_results(self, ticker, bar_date, variant) -> dict:
+        """{strategy name: (price, result)} valid for this bar: in-process first, then analysis_cache."""
+        if bar_date is None:
+            return {}
+        strategies = [s for s in self.strategies if s.cacheable]
+        out = {}
+        for s in strategies:
+            hit = self.results.get(ticker, bar_date, s, variant)
+            if hit is not None:
+                out[s.name] = hit
+        # Persisted rows are chart-less, so they only serve chart-less requests
+        missing = [s for s in strategies if s.name not in out]
+        if missing and variant in ("screen", result_cache.NO_CHART):
+            persisted = result_cache.load_persisted(ticker, bar_date, missing)
+            metrics.CACHE_LOOKUPS.inc(len(persisted), cache="result_db", result="hit")
+            metrics.CACHE_LOOKUPS.inc(len(missing) - len(persisted), cache="result_db", result="miss")
+            for s in missing:
+                if s.name in persisted:
+                    price, res = persisted[s.name]
+                    self.results.put(ticker, bar_date, s, result_cache.NO_CHART, price, res)
+                    out[s.name] = persisted[s.name]
+        return out
+
+    def _store_results(self, ticker, bar_date, variant, mode, price, computed):
+        """Memoizes freshly computed results; full-mode verdicts are also persisted (chart-less)."""
+        if bar_date is None:
+            return
+        computed = [(s, r) for s, r in computed if s.cacheable]
+        for s, res in computed:
+            self.results.put(ticker, bar_date, s, variant, price, res)
+            if mode != "screen" and variant != result_cache.NO_CHART:
+                self.results.put(ticker, bar_date, s, result_cache.NO_CHART, price, result_cache.strip_chart(res))
+        if mode != "screen":
+            result_cache.save_persisted(ticker, bar_date, price, computed)
+
+    def analyze_batch(self, tickers: list, backend: str = "thread", max_workers: int = None,
+                      chunksize: int = None, chart_options: dict = None, mode: str = "full"):
+        """
+        Parallel analysis for a list of tickers (results in input order).
+        backend="thread": shared manager, good for I/O-bound batches.
+        backend="process": one manager per worker process, so pandas/plotly work runs on all cores
+        (screening counters then stay in the workers).
+        """
+        results = {}
+        for ticker, res in self.iter_batch(tickers, backend, max_workers, chunksize, chart_options, mode):
+            results[ticker] = res
+        return [results.get(t) for t in tickers]
+
+    def iter_batch(self, tickers: list, backend: str = "thread", max_workers: int = None,
+                   chunksize: int = None, chart_options: dict = None, mode: str = "full"):
+        """
+        Yields (ticker, result) as each one completes (streamed, not in input order).
+        Closing the generator early (cancelled scan, client gone) drops the work not yet started.
+        """
+        tickers = list(tickers)
+        if not tickers:
+            return
+
+        if backend == "process":
+            workers = max_workers or os.cpu_count() or 1
+            # ~4 chunks per worker: amortizes pickling without starving the tail
+            chunksize = chunksize or max(1, math.ceil(len(tickers) / (workers * 4)))
+            chunks = [tickers[i:i + chunksize] for i in range(0, len(tickers), chunksize)]
+            workers = min(workers, len(chunks))
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker)
+
+            def run(chunk):
+                try:
+                    return executor.submit(_analyze_chunk, chunk, chart_options, mode)
+                except Exception as e:  # pool already broken: fail the chunk like a crashed one
+                    fut = Future()
+                    fut.set_exception(e)
+                    return fut
+            try:
+                for fut, chunk in _bounded(run, chunks, workers * IN_FLIGHT_PER_WORKER):
+                    try:
+                        items = fut.result()
+                    except Exception as e:
+                        # Worker died (BrokenProcessPool) or the results didn't pickle: the
+                        # chunk's tickers fail, the rest of the batch goes on
+                        print(f"Batch chunk failed ({len(chunk)} tickers): {e}")
+                        items = [(t, {"ticker": t, "error": str(e), "results": {}}) for t in chunk]
+                    for item in items:
+                        yield item
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            workers = max_workers or THREAD_WORKERS
+            executor = ThreadPoolExecutor(max_workers=workers)
+            try:
+                run = lambda t: executor.submit(self.analyze_ticker, t, chart_options, mode)
+                for fut, t in _bounded(run, tickers, workers * IN_FLIGHT_PER_WORKER):
+                    try:
+                        yield t, fut.result()
+                    except Exception as e:
+                        yield t, {"ticker": t, "error": str(e), "results": {}}
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _bounded(submit, items, limit):
+    """
+    Yields (future, item) as they complete, keeping at most `limit` submitted at a time,
+    so results never pile up faster than the consumer takes them.
+    """
+    items = iter(items)
+    pending = {}
+    for item in items:
+        pending[submit(item)] = item
+        if len(pending) >= limit:
+            break
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            item = pending.pop(fut)
+            nxt = next(items, _END)
+            if nxt is not _END:
+                pending[submit(nxt)] = nxt
+            yield fut, item
+
+_END = object()
+
+# --- Process backend ---
+# Each worker builds its strategies and DB engine once, then reuses them for every chunk.
+
+_PROCESS_MANAGER = None
+
+def _init_process_worker():
+    global _PROCESS_MANAGER
+    from utils.db import mysql_engine
+    try:
+        mysql_engine()
+    except Exception as e:
+        print(f"Worker DB init failed: {e}")
+    _PROCESS_MANAGER = StrategyManager()
+
+def _analyze_chunk(tickers: list, chart_options: dict = None, mode: str = "full") -> list:
+    out = []
+    for t in tickers:
+        try:
+            out.append((t, _PROCESS_MANAGER.analyze_ticker(t, chart_options, mode)))
+        except Exception as e:
+            out.append((t, {"ticker": t, "error": str(e), "results": {}}))
+    return out
@@ -1,38 +1,112 @@
 from .base import MomentumStrategy
-import utils.technical_indicators as ta
+from .rules import Rule, RuleSet
+from .vcp import detect_base, base_to_json, describe_base
 import pandas as pd
 from utils.visualization import plot_minervini_chart
 
 class MinerviniStrategy(MomentumStrategy):
+    dependencies = ("strategies.rules", "strategies.vcp", "utils.technical_indicators",
+                    "utils.visualization", "utils.chart_encoding")
+
+    chart_warmup_bars = 200  # SMA-200
+
+    # Trend Template thresholds (tunable via strategies.sweep)
+    DEFAULT_PARAMS = {
+        "low_mult": 1.30,        # 6. >= 30% above 52W low
+        "high_mult": 0.75,       # 7. within 25% of 52W high
+        "rsi_min": 50,           # 8. RSI bullish
+        "slope_lookback": 20,    # 3. SMA-200 higher than N bars ago
+        "year_window": 260,      # 52-week window
+    }
+
+    # Values the reasons quote (rule language expressions)
+    REASON_VALUES = {
+        "sma50": "sma(50)", "sma150": "sma(150)", "sma200": "sma(200)", "rsi": "rsi(14)",
+        "low": "lowest(year_window)", "high": "highest(year_window)",
+        "pct_above_low": "(close - lowest(year_window)) / lowest(year_window) * 100",
+        "pct_below_high": "(highest(year_window) - close) / highest(year_window) * 100",
+    }
+
+    # The Trend Template, in the rule language (strategies/rules.py)
+    RULES = RuleSet([
+        Rule("price_above_150_200", "close > sma(150) and close > sma(200)", "Price vs 150/200 SMA",
+             "Price ({close:.2f}) > 150 & 200 SMA", "Price ({close:.2f}) below 150/200 SMA", REASON_VALUES),
+        Rule("sma150_above_sma200", "sma(150) > sma(200)", "Long-term trend",
+             "150 SMA > 200 SMA (Long Term Uptrend)", "150 SMA < 200 SMA", REASON_VALUES),
+        Rule("sma200_rising", "sma(200) > ref(sma(200), slope_lookback)", "200 SMA slope",
+             "200 SMA Trending Up", "200 SMA Flattening/Falling", REASON_VALUES),
+        Rule("sma50_above_150_200", "sma(50) > sma(150) and sma(50) > sma(200)", "Medium-term trend",
+             "50 SMA > 150 & 200 SMA (Medium Trend Strong)", "50 SMA below 150/200 SMA", REASON_VALUES),
+        Rule("price_above_sma50", "close > sma(50)", "Price vs 50 SMA",
+             "Price > 50 SMA", "Price < 50 SMA", REASON_VALUES),
+        Rule("above_52w_low", "close >= low_mult * lowest(year_window)", "52W low",
+             "Above 52W Low (+{pct_above_low:.2f}%)", "Too close to 52W Low ({low:.2f})", REASON_VALUES),
+        Rule("near_52w_high", "close >= high_mult * highest(year_window)", "52W high",
+             "Near 52W High (-{pct_below_high:.2f}%)", "Too far from 52W High ({high:.2f})", REASON_VALUES),
+        Rule("rsi_bullish", "rsi(14) >= rsi_min", "RSI",
+             "RSI Bullish ({rsi:.2f})", "RSI Weak ({rsi:.2f})", REASON_VALUES),
+    ], DEFAULT_PARAMS)
+
+    # Extra bars so Wilder-smoothed RSI has converged by the last bar
+    RSI_WARMUP = 100
+
+    def __init__(self, **params):
+        self.params = {**self.DEFAULT_PARAMS, **params}
+
+    @property
+    def data_requirements(self) -> dict:
+        p = self.params
+        # 52W window, or SMA-200 plus its slope lookback, whichever is longer
+        bars = max(p["year_window"], 200 + p["slope_lookback"] + 1) + self.RSI_WARMUP
+        # Volume for the VCP dry-up check
+        return {"lookback_bars": bars, "columns": ["Open", "High", "Low", "Close", "Volume"], "benchmark": False}
+
     @property
     def name(self) -> str:
         return "Minervini Trend Template"
 
-    def analyze(self, ticker: str, data: pd.DataFrame) -> dict:
-        if data is None or len(data) < 260: # Need 52 weeks
+    def screen(self, ticker: str, data: pd.DataFrame, stats=None) -> dict:
+        """
+        Last bar only, cheapest/most selective condition first, stop at the first failure.
+        Rejections get no details; survivors (few) get the full chart-less analysis.
+        """
+        p = self.params
+        if data is None or len(data) < p["year_window"]:
+            return {"strategy": self.name, "status": "FAIL", "signal": "NEUTRAL", "score": "-",
+                    "details": ["Insufficient Data"], "metrics": {}, "screen": {"failed": None, "checked": 0}}
+
+        passed, failed, checked = self.RULES.screen(data, stats=stats, **p)
+        if passed:
+            res = self.analyze(ticker, data, chart_options={"disabled": True})
+            res["screen"] = {"failed": None, "checked": checked}
+            return res
+        return {
+            "strategy": self.name,
+            "status": "FAIL",
+            "signal": "NEUTRAL",
+            "score": "-",
+            "details": [f"Rejected: {failed}"],
+            "metrics": {"Price": float(data['Close'].iloc[-1])},
+            "screen": {"failed": failed, "checked": checked},
+        }
+
+    def analyze(self, ticker: str, data: pd.DataFrame, chart_options: dict = None) -> dict:
+        p = self.params
+        if data is None or len(data) < p["year_window"]: # Need 52 weeks
             print(f"Minervini Fail {ticker}: len={len(data) if data is not None else 'None'}")
             return {
                 "status": "FAIL",
                 "signal": "NEUTRAL",
                 "score": 0,
-                "details": [f"Insufficient Data ({len(data) if data is not None else 0} < 260 days)"],
+                "details": [f"Insufficient Data ({len(data) if data is not None else 0} < {p['year_window']} days)"],
                 "metrics": {},
                 "chart_path": None
             }
 
-        # Indicators
-        # Ensure we have data for calc
-        df = data.copy()
-        df['SMA_50'] = ta.sma(df['Close'], length=50)
-        df['SMA_150'] = ta.sma(df['Close'], length=150)
-        df['SMA_200'] = ta.sma(df['Close'], length=200)
-        df['RSI'] = ta.rsi(df['Close'], length=14)
-        df['52_Week_Low'] = df['Close'].rolling(window=260).min()
-        df['52_Week_High'] = df['Close'].rolling(window=260).max()
-        
-        # Check if indicators are valid (not all NaN)
-        curr = df.iloc[-1]
-        if pd.isna(curr['SMA_200']):
+        # Every rule over every bar; shared indicators (sma(200) etc.) computed once
+        ev = self.RULES.evaluator(data, **p)
+        sma200 = ev.series("sma(200)")
+        if pd.isna(sma200.iloc[-1]):
              return {
                 "status": "FAIL",
                 "signal": "NEUTRAL",
@@ -42,75 +116,14 @@ class MinerviniStrategy(MomentumStrategy):
                 "chart_path": None
             }
 
-        price = curr['Close']
-        pass_reasons = []
-        fail_reasons = []
-        passed_conditions = 0
-        total_conditions = 8
-
-        # Helper
-        def fmt(val): return f"{val:.2f}"
-
-        # 1. Price > 150 & 200 SMA
-        if price > curr['SMA_150'] and price > curr['SMA_200']:
-            pass_reasons.append(f"Price ({fmt(price)}) > 150 & 200 SMA")
-            passed_conditions += 1
-        else:
-            fail_reasons.append(f"Price ({fmt(price)}) below 150/200 SMA")
-
-        # 2. 150 SMA > 200 SMA
-        if curr['SMA_150'] > curr['SMA_200']:
-            pass_reasons.append("150 SMA > 200 SMA (Long Term Uptrend)")
-            passed_conditions += 1
-        else:
-            fail_reasons.append("150 SMA < 200 SMA")
-
-        # 3. 200 SMA Trending Up (Lookback 20 days)
-        prev_200 = df['SMA_200'].iloc[-21]
-        if curr['SMA_200'] > prev_200:
-            pass_reasons.append("200 SMA Trending Up")
-            passed_conditions += 1
-        else:
-            fail_reasons.append("200 SMA Flattening/Falling")
-
-        # 4. 50 SMA > 150 & 200
-        if curr['SMA_50'] > curr['SMA_150'] and curr['SMA_50'] > curr['SMA_200']:
-            pass_reasons.append("50 SMA > 150 & 200 SMA (Medium Trend Strong)")
-            passed_conditions += 1
-        else:
-            fail_reasons.append("50 SMA below 150/200 SMA")
-
-        # 5. Price > 50 SMA
-        if price > curr['SMA_50']:
-            pass_reasons.append("Price > 50 SMA")
-            passed_conditions += 1
-        else:
-            fail_reasons.append("Price < 50 SMA")
-
-        # 6. 30% above 52-Week Low
-        low_threshold = 1.3 * curr['52_Week_Low']
-        if price >= low_threshold:
-            pct_above = ((price - curr['52_Week_Low']) / curr['52_Week_Low']) * 100
-            pass_reasons.append(f"Above 52W Low (+{fmt(pct_above)}%)")
-            passed_conditions += 1
-        else:
-            fail_reasons.append(f"Too close to 52W Low ({fmt(curr['52_Week_Low'])})")
-
-        # 7. Within 25% of 52-Week High
-        high_threshold = 0.75 * curr['52_Week_High']
-        if price >= high_threshold:
-            pct_below = ((curr['52_Week_High'] - price) / curr['52_Week_High']) * 100
-            pass_reasons.append(f"Near 52W High (-{fmt(pct_below)}%)")
-            passed_conditions += 1
-        else:
-            fail_reasons.append(f"Too far from 52W High ({fmt(curr['52_Week_High'])})")
-
-        # 8. RSI >= 50 (Bonus/Trend Strength)
-        if curr['RSI'] >= 50:
-            pass_reasons.append(f"RSI Bullish ({fmt(curr['RSI'])})")
-            passed_conditions += 1
-        else:
-            fail_reasons.append(f"RSI Weak ({fmt(curr['RSI'])})")
+        verdicts = self.RULES.explain(data, evaluator=ev)
+        pass_reasons = [v["reason"] for v in verdicts if v["passed"]]
+        fail_reasons = [v["reason"] for v in verdicts if not v["passed"]]
+        passed_conditions = len(pass_reasons)
+        total_conditions = len(verdicts)
+        price = data['Close'].iloc[-1]
+        rsi = ev.series("rsi(14)")
+        sma50 = ev.series("sma(50)")
 
         # DECISION
         # Strict Minervini requires almost all, but let's say 7/8 is a pass, or 8/8 strict?
@@ -121,25 +134,40 @@ class MinerviniStrategy(MomentumStrategy):
         status = "PASS" if len(fail_reasons) == 0 else "FAIL"
         signal = "BUY" if status == "PASS" else "NEUTRAL"
 
+        # Base / VCP on the same data (informational - not one of the eight conditions)
+        base = detect_base(data)
+        details = pass_reasons if status == "PASS" else fail_reasons
+        if base is not None and base["is_vcp"]:
+            details = details + [f"VCP: {describe_base(base)}"]
+
         # Chart Generation
         # OLD: chart_path = plot_minervini_chart(ticker, df)
         # NEW: Return JSON
         from utils.visualization import create_minervini_figure
-        fig = create_minervini_figure(ticker, df)
-        chart_json = fig.to_json()
+        chart_kwargs = self.chart_kwargs(chart_options)
+        chart_json = None
+        if chart_kwargs is not None:
+            # Hand the already-computed indicators to the chart
+            df = data.copy()
+            df['SMA_50'], df['SMA_150'], df['SMA_200'], df['RSI'] = sma50, ev.series("sma(150)"), sma200, rsi
+            chart_json = create_minervini_figure(ticker, df, **chart_kwargs).to_json()
 
         return {
             "strategy": self.name,
             "status": status,
             "signal": signal,
             "score": f"{passed_conditions}/{total_conditions}",
-            "details": pass_reasons if status == "PASS" else fail_reasons, 
+            "details": details,
             "all_details": {"pass": pass_reasons, "fail": fail_reasons},
+            # Names of the rules not met (RULES.labels has their display names)
+            "failed_rules": [v["name"] for v in verdicts if not v["passed"]],
             "metrics": {
                 "Price": price,
-                "RSI": curr['RSI'],
-                "SMA_50": curr['SMA_50'],
-                "Pivot": df['High'].iloc[-20:].max()
+                "RSI": rsi.iloc[-1],
+                "SMA_50": sma50.iloc[-1],
+                "Pivot": data['High'].iloc[-20:].max(),
+                "Base_Pivot": base["pivot_price"] if base else None,
             },
+            "base": base_to_json(base),
             "chart_json": chart_json
         }
@@ -0,0 +1,256 @@
+"""
+Portfolio NAV history: a daily equity curve per portfolio and for all of them together.
+
+Quantities come from portfolio_transactions (holdings never logged as transactions count from
+their purchase_date, at their average price). They are laid out as a date x ticker matrix and
+multiplied by the aligned close panel from market_data - forward-filled over missing bars,
+valued at the trade price until a ticker's first bar:
+  NAV_t       = sum(quantity_t * close_t)
+  cash flow_t = buys - sells (at the trade price) settled that day; a flow on a non-trading
+                day settles on the next bar, and an oversell counts only the shares held
+  return_t    = (NAV_t - cash flow_t) / NAV_{t-1} - 1   (flows at the close)
+The time-weighted return compounds the daily returns; drawdown is its distance from the running peak.
+
+Daily rows are stored in nav_history, with a checkpoint (nav_checkpoints) of the last day's
+quantities, prices and NAV and a signature of the flows. While the flows are unchanged a new bar
+only appends its rows; any change to them (a new, edited or backdated trade) recomputes the portfolio.
+"""
+import datetime
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from utils.db import get_db
+
+EPS = 1e-9
+COLUMNS = ["nav", "cash_flow", "ret"]
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in COLUMNS}, index=pd.DatetimeIndex([], name="date"))
+
+
+class NavState:
+    """End-of-day quantities, prices and NAV the next bar continues from."""
+
+    def __init__(self, last_date, quantities: dict, prices: dict, nav: float):
+        self.last_date = last_date
+        self.quantities = quantities
+        self.prices = prices
+        self.nav = nav
+
+    def to_json(self) -> dict:
+        return {"quantities": self.quantities, "prices": self.prices, "nav": self.nav}
+
+    @classmethod
+    def from_json(cls, last_date, data: dict) -> "NavState":
+        return cls(last_date, data.get("quantities") or {}, data.get("prices") or {}, float(data.get("nav") or 0.0))
+
+
+def flows_signature(flows: pd.DataFrame) -> str:
+    return hashlib.sha1(flows.to_csv(index=False).encode()).hexdigest()
+
+
+def compute_nav(flows: pd.DataFrame, closes: pd.DataFrame, state: NavState = None):
+    """
+    flows: ticker, date, quantity (signed: sells negative), price.
+    closes: date x ticker close panel (NaN where no bar) for the days to compute - after
+    state.last_date when continuing from a state.
+    Returns (rows indexed by date [nav, cash_flow, ret], state after the last day).
+    """
+    if closes.empty:
+        return _empty_frame(), state
+    dates = pd.DatetimeIndex(closes.index)
+    if state is not None:
+        flows = flows[flows["date"] > state.last_date]
+
+    # Settle each flow on the first bar on/after its date; later ones wait for their bar
+    slot = dates.searchsorted(pd.to_datetime(flows["date"]), side="left")
+    flows = flows.assign(slot=slot)[slot < len(dates)]
+    tickers = sorted(set(closes.columns) | set(flows["ticker"]) | set(state.quantities if state else ()))
+
+    delta = flows.pivot_table(index="slot", columns="ticker", values="quantity", aggfunc="sum")
+    delta = delta.reindex(index=range(len(dates)), columns=tickers, fill_value=0.0).fillna(0.0)
+    start_qty = pd.Series(state.quantities if state else {}, dtype=float).reindex(tickers, fill_value=0.0)
+    # Running quantity; a sell beyond what is held is ignored past zero, as in the ledger:
+    # q_k = max(0, q_{k-1} + d_k) == raw_k - min(0, min_{j<=k} raw_j)
+    raw = delta.cumsum() + start_qty.to_numpy()
+    qty = raw - np.minimum(0.0, raw.cummin())
+
+    # Flows follow the clipped quantity change: the traded value, unless part of a sell was
+    # ignored - then the shares actually sold at the slot's average trade price
+    traded = flows.assign(value=flows["quantity"] * flows["price"]).pivot_table(
+        index="slot", columns="ticker", values="value", aggfunc="sum")
+    traded = traded.reindex(index=range(len(dates)), columns=tickers, fill_value=0.0).fillna(0.0)
+    change = qty.diff()
+    change.iloc[0] = qty.iloc[0] - start_qty
+    clipped = (change - delta).abs() > EPS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cash = np.where(clipped, change * (traded / delta), traded)
+    cash_flow = np.nan_to_num(cash).sum(axis=1)
+
+    # Carried prices seed the fill; a ticker without a bar yet is valued at its first trade price
+    seed = flows.groupby("ticker")["price"].first().to_dict()
+    seed.update(state.prices if state else {})
+    panel = closes.reindex(columns=tickers).to_numpy(dtype=float)
+    panel = pd.DataFrame(np.vstack([pd.Series(seed, dtype=float).reindex(tickers).to_numpy(), panel]))
+    prices = panel.ffill().to_numpy()[1:]
+    prices = np.nan_to_num(prices, nan=0.0)
+
+    nav = (qty.to_numpy() * prices).sum(axis=1)
+    prev = np.concatenate([[state.nav if state else 0.0], nav[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(prev > EPS, (nav - cash_flow) / prev - 1.0, 0.0)
+
+    rows = pd.DataFrame({"nav": nav, "cash_flow": cash_flow, "ret": ret}, index=dates.rename("date"))
+    last_qty = qty.iloc[-1]
+    held = last_qty[last_qty > EPS].index
+    new_state = NavState(dates[-1].date(),
+                         {t: float(last_qty[t]) for t in held},
+                         {t: float(p) for t, p in zip(tickers, prices[-1]) if t in held},
+                         float(nav[-1]))
+    return rows, new_state
+
+
+def with_returns(frame: pd.DataFrame) -> pd.DataFrame:
+    """Adds twr (cumulative time-weighted return) and drawdown (both as fractions)."""
+    growth = (1.0 + frame["ret"]).cumprod()
+    return frame.assign(twr=growth - 1.0, drawdown=growth / growth.cummax() - 1.0)
+
+
+class NavEngine:
+    """
+    series(pid): daily nav, cash_flow, ret, twr, drawdown of one portfolio (None: all of them).
+    The stored rows are brought up to date on each call; the frame is kept in memory until they change.
+    """
+
+    def __init__(self):
+        self._frames = {}  # portfolio_id -> (flows signature, stored rows)
+        self._lock = threading.Lock()
+
+    def series(self, portfolio_id=None) -> pd.DataFrame:
+        if portfolio_id is not None:
+            return with_returns(self.update(portfolio_id))
+        frames = [self.update(pid) for pid in self._portfolio_ids()]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return with_returns(_empty_frame())
+        dates = frames[0].index
+        for f in frames[1:]:
+            dates = dates.union(f.index)
+        # Before its first row a portfolio holds nothing; past its last bar it keeps its NAV
+        nav = sum(f["nav"].reindex(dates).ffill().fillna(0.0) for f in frames)
+        cash_flow = sum(f["cash_flow"].reindex(dates, fill_value=0.0) for f in frames)
+        prev = nav.shift(1, fill_value=0.0)
+        ret = ((nav - cash_flow) / prev.where(prev > EPS) - 1.0).fillna(0.0)
+        return with_returns(pd.DataFrame({"nav": nav, "cash_flow": cash_flow, "ret": ret}))
+
+    def update(self, portfolio_id) -> pd.DataFrame:
+        """Stored daily rows of one portfolio, after appending the bars since the checkpoint."""
+        from models import NavCheckpoint, NavHistory
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            with self._lock:
+                flows = self._flows(session, portfolio_id)
+                signature = flows_signature(flows)
+                cp = session.get(NavCheckpoint, portfolio_id)
+                state = None
+                if cp is not None and cp.signature == signature and cp.last_date:
+                    state = NavState.from_json(cp.last_date, cp.state or {})
+
+                cached = self._frames.get(portfolio_id)
+                if state is None:
+                    # Flows changed (or first build): recompute from the first trade
+                    cached = None
+                    session.query(NavHistory).filter(NavHistory.portfolio_id == portfolio_id).delete()
+                    if flows.empty:
+                        if cp is not None:
+                            session.delete(cp)
+                        session.commit()
+                        self._frames.pop(portfolio_id, None)
+                        return _empty_frame()
+                    start, tickers = flows["date"].min(), set(flows["ticker"])
+                else:
+                    start, tickers = state.last_date, set(flows["ticker"]) | set(state.quantities)
+
+                closes = self._closes(session, sorted(tickers), start, after=state is not None)
+                rows, new_state = compute_nav(flows, closes, state)
+                if not rows.empty:
+                    try:
+                        session.add_all([NavHistory(portfolio_id=portfolio_id, date=d.date(), nav=float(r.nav),
+                                                    cash_flow=float(r.cash_flow), ret=float(r.ret))
+                                         for d, r in zip(rows.index, rows.itertuples())])
+                        session.merge(NavCheckpoint(portfolio_id=portfolio_id, signature=signature,
+                                                    last_date=new_state.last_date, state=new_state.to_json()))
+                        session.commit()
+                    except Exception as e:
+                        # e.g. another worker appended the same day; its rows are read next time
+                        session.rollback()
+                        print(f"NAV history write failed for portfolio {portfolio_id}: {e}")
+                        self._frames.pop(portfolio_id, None)
+                        return self._stored(session, portfolio_id)
+
+                # The cached frame continues only if it ends where the checkpoint did (another worker may have appended)
+                if cached is not None and cached[0] == signature and not cached[1].empty \
+                        and cached[1].index[-1].date() == state.last_date:
+                    frame = pd.concat([cached[1], rows]) if not rows.empty else cached[1]
+                else:
+                    frame = self._stored(session, portfolio_id)
+                self._frames[portfolio_id] = (signature, frame)
+                return frame
+        finally:
+            db.close_session()
+
+    @staticmethod
+    def _flows(session, portfolio_id) -> pd.DataFrame:
+        """Signed quantity changes in date order: logged transactions, plus holdings that have none."""
+        from models import Portfolio, PortfolioTransaction as T
+        txns = session.query(T.ticker, T.transaction_type, T.quantity, T.price, T.date).filter(
+            T.portfolio_id == portfolio_id).order_by(T.date, T.id).all()
+        rows = [(t, d, float(q) * (-1.0 if (k or "").upper() == "SELL" else 1.0), float(p))
+                for t, k, q, p, d in txns if (k or "").upper() in ("BUY", "SELL")]
+        logged = {r[0] for r in rows}
+        for h in session.query(Portfolio).filter(Portfolio.portfolio_id == portfolio_id).all():
+            if h.ticker not in logged and float(h.quantity or 0) > 0:
+                opened = h.purchase_date or (h.created_at.date() if h.created_at else datetime.date.today())
+                rows.append((h.ticker, opened, float(h.quantity), float(h.avg_price or 0)))
+        flows = pd.DataFrame(rows, columns=["ticker", "date", "quantity", "price"])
+        return flows.sort_values(["date", "ticker"], kind="stable").reset_index(drop=True)
+
+    @staticmethod
+    def _closes(session, tickers, start, after=False) -> pd.DataFrame:
+        """date x ticker closes from start (exclusive with after=True) to the last bar."""
+        from models import MarketData
+        if not tickers:
+            return pd.DataFrame()
+        since = MarketData.date > start if after else MarketData.date >= start
+        rows = session.query(MarketData.date, MarketData.ticker, MarketData.close_price).filter(
+            MarketData.ticker.in_(tickers), since).all()
+        if not rows:
+            return pd.DataFrame()
+        bars = pd.DataFrame(rows, columns=["date", "ticker", "close"])
+        bars["date"] = pd.to_datetime(bars["date"])
+        bars["close"] = bars["close"].astype(float)
+        return bars.pivot_table(index="date", columns="ticker", values="close", aggfunc="last").sort_index()
+
+    @staticmethod
+    def _stored(session, portfolio_id) -> pd.DataFrame:
+        from models import NavHistory
+        rows = session.query(NavHistory.date, NavHistory.nav, NavHistory.cash_flow, NavHistory.ret).filter(
+            NavHistory.portfolio_id == portfolio_id).order_by(NavHistory.date).all()
+        if not rows:
+            return _empty_frame()
+        frame = pd.DataFrame(rows, columns=["date"] + COLUMNS)
+        frame["date"] = pd.to_datetime(frame["date"])
+        return frame.set_index("date").astype(float)
+
+    @staticmethod
+    def _portfolio_ids():
+        from models import Portfolios
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            return [pid for (pid,) in session.query(Portfolios.id).order_by(Portfolios.id).all()]
+        finally:
+            db.close_session()
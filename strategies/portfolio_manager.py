@@ -1,13 +1,45 @@
+import base64
+import datetime
+import decimal
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy import text
 from utils.db import get_db
 from models import Portfolio, AnalysisCache 
+from strategies.ledger import Ledger, LedgerState, apply_transactions, available, EPS
 import json
 
+# Holdings API: sort keys, signal filter values, page size cap
+HOLDING_SORTS = ("value", "pnl", "pnl_pct", "invested", "ticker")
+HOLDING_SIGNALS = ("bullish", "bearish", "mixed", "none")
+MAX_HOLDINGS_PAGE = 500
+
+def _encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    """[sort, order, sort value, ticker, portfolio id] from a cursor; ValueError if malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 5:
+        raise ValueError("Invalid cursor")
+    return values
+
 class PortfolioManager:
     def __init__(self):
-        pass
+        # Called as fn(event, ticker) after a committed change (holdings, portfolios, analyses)
+        self.listeners = []
+        # Positions and realized P&L derived from portfolio_transactions
+        self.ledger = Ledger()
+
+    def _changed(self, event, ticker=None):
+        for fn in self.listeners:
+            try:
+                fn(event, ticker)
+            except Exception as e:
+                print(f"Portfolio listener failed: {e}")
 
 
 
@@ -28,6 +60,7 @@ class PortfolioManager:
             new_p = Portfolios(name=name)
             session.add(new_p)
             session.commit()
+            self._changed("portfolio")
             return new_p.id
         except:
             session.rollback()
@@ -44,92 +77,203 @@ class PortfolioManager:
             if p:
                 p.name = name
                 session.commit()
+                self._changed("portfolio")
                 return True
             return False
         finally:
             db.close_session()
 
+    @staticmethod
+    def _holdings_query(session, portfolio_id=None):
+        """
+        Holdings with their latest close and summary analysis - one query sized by the holdings:
+        the latest close is a correlated max(date) (market_data primary key seek) and the summary
+        row an analysis_cache primary key lookup, its fields extracted from the JSON server-side.
+        """
+        from models import Portfolio, MarketData
+        from sqlalchemy import func as sa_func
+
+        latest_date = session.query(sa_func.max(MarketData.date)).filter(
+            MarketData.ticker == Portfolio.ticker).correlate(Portfolio).scalar_subquery()
+        summary = AnalysisCache.result_json
+
+        q = session.query(
+            Portfolio.ticker,
+            Portfolio.quantity,
+            Portfolio.avg_price,
+            Portfolio.purchase_date, # Phase 13
+            Portfolio.portfolio_id,
+            MarketData.close_price,
+            AnalysisCache.ticker.label('analyzed'),
+            summary['passed'].as_string().label('passed'),
+            summary['bullish'].as_boolean().label('bullish'),
+            summary['bearish'].as_boolean().label('bearish'),
+            summary['timestamp'].as_string().label('analyzed_at'),
+        ).outerjoin(
+            MarketData, (MarketData.ticker == Portfolio.ticker) & (MarketData.date == latest_date)
+        ).outerjoin(
+            AnalysisCache, (AnalysisCache.ticker == Portfolio.ticker) & (AnalysisCache.strategy_name == 'combined')
+        )
+        if portfolio_id:
+            q = q.filter(Portfolio.portfolio_id == portfolio_id)
+        return q
+
+    @staticmethod
+    def _holding_row(r) -> dict:
+        qty = float(r.quantity)
+        avg = float(r.avg_price)
+        curr_price = float(r.close_price) if r.close_price else avg # Fallback
+        
+        invested = qty * avg
+        curr_val = qty * curr_price
+        pnl = curr_val - invested
+        pnl_pct = (pnl / invested * 100) if invested > 0 else 0
+        
+        row = {
+            "ticker": r.ticker,
+            "quantity": qty,
+            "avg_price": avg,
+            "current_price": curr_price,
+            "invested_value": invested,
+            "current_value": curr_val,
+            "pnl": pnl,
+            "pnl_pct": pnl_pct,
+            "original_name": r.ticker, # Placeholder
+            "portfolio_id": r.portfolio_id,
+            "purchase_date": r.purchase_date.strftime("%Y-%m-%d") if r.purchase_date else None
+        }
+        # Summary written by save_analysis
+        if r.analyzed:
+            row['analysis'] = {
+                "passed": r.passed if r.passed is not None else 'N/A',
+                "bullish": bool(r.bullish),
+                "bearish": bool(r.bearish),
+                "timestamp": r.analyzed_at,
+            }
+        return row
+
+    @classmethod
+    def _holdings_table(cls, session, portfolio_id=None, sector=None, signal=None, pnl=None, search=None):
+        """
+        The holdings query as a filterable subquery, with the derived values computed in SQL:
+        invested, current (latest close, cost basis if none), pnl, pnl_pct, sector and signal
+        (bullish | bearish | mixed from the stored summary, none if never analyzed).
+        """
+        from models import MarketData, StockDetails
+        from sqlalchemy import func as sa_func, case, literal
+
+        price = sa_func.coalesce(MarketData.close_price, Portfolio.avg_price)
+        invested = Portfolio.quantity * Portfolio.avg_price
+        current = Portfolio.quantity * price
+        summary = AnalysisCache.result_json
+        signal_expr = case(
+            (AnalysisCache.ticker.is_(None), literal('none')),
+            (summary['bullish'].as_boolean(), literal('bullish')),
+            (summary['bearish'].as_boolean(), literal('bearish')),
+            else_=literal('mixed'))
+        q = cls._holdings_query(session, portfolio_id).add_columns(
+            invested.label('invested'),
+            current.label('value'),
+            (current - invested).label('pnl'),
+            sa_func.coalesce((current - invested) * 100 / sa_func.nullif(invested, 0), 0).label('pnl_pct'),
+            sa_func.coalesce(sa_func.nullif(StockDetails.sector, ''), 'Unknown').label('sector'),
+            signal_expr.label('signal'),
+        ).outerjoin(StockDetails, StockDetails.ticker == Portfolio.ticker)
+        t = q.subquery()
+
+        conds = []
+        if sector:
+            conds.append(t.c.sector == sector)
+        if signal:
+            conds.append(t.c.signal == signal)
+        if pnl == 'gain':
+            conds.append(t.c.pnl >= 0)
+        elif pnl == 'loss':
+            conds.append(t.c.pnl < 0)
+        if search:
+            conds.append(t.c.ticker.like(search.strip().upper().replace('%', '') + '%'))
+        return t, conds
+
+    def holdings_page(self, portfolio_id=None, sort="value", order="desc", limit=100, cursor=None, **filters):
+        """
+        One page of holdings, sorted and filtered server-side, with keyset pagination:
+        {"rows": [...], "next_cursor": str | None}. The cursor carries the last row's
+        (sort value, ticker, portfolio id), so a page costs the same at any depth.
+        filters: sector, signal, pnl ('gain' | 'loss'), search (ticker prefix).
+        Raises ValueError for unknown sort/order/signal or a malformed cursor.
+        """
+        from sqlalchemy import tuple_, literal, select, Numeric
+
+        if sort not in HOLDING_SORTS or order not in ("asc", "desc"):
+            raise ValueError(f"Unknown sort: {sort} {order}")
+        if filters.get("signal") and filters["signal"] not in HOLDING_SIGNALS:
+            raise ValueError(f"Unknown signal: {filters['signal']}")
+        limit = max(1, min(int(limit), MAX_HOLDINGS_PAGE))
+
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            t, conds = self._holdings_table(session, portfolio_id, **filters)
+            sort_col = t.c.ticker if sort == "ticker" else t.c[sort]
+            key = tuple_(sort_col, t.c.ticker, t.c.portfolio_id)
+            if cursor:
+                c_sort, c_order, c_value, c_ticker, c_pid = _decode_cursor(cursor)
+                if (c_sort, c_order) != (sort, order):
+                    raise ValueError("Cursor does not match the requested sort")
+                # Decimal keeps the boundary exact against DECIMAL arithmetic (MySQL)
+                value = literal(c_value) if sort == "ticker" else literal(decimal.Decimal(c_value), Numeric(30, 10))
+                after = tuple_(value, literal(c_ticker), literal(c_pid))
+                conds.append(key < after if order == "desc" else key > after)
+            cols = [sort_col.desc(), t.c.ticker.desc(), t.c.portfolio_id.desc()] if order == "desc" \
+                else [sort_col.asc(), t.c.ticker.asc(), t.c.portfolio_id.asc()]
+            results = session.execute(select(t).where(*conds).order_by(*cols).limit(limit + 1)).all()
+
+            rows = [self._holding_row(r) | {"sector": r.sector, "signal": r.signal} for r in results[:limit]]
+            next_cursor = None
+            if len(results) > limit:
+                last = results[limit - 1]
+                last_value = last.ticker if sort == "ticker" else str(getattr(last, sort))
+                next_cursor = _encode_cursor([sort, order, last_value, last.ticker, last.portfolio_id])
+            return {"rows": rows, "next_cursor": next_cursor}
+        finally:
+            db.close_session()
+
+    def holdings_totals(self, portfolio_id=None, **filters) -> dict:
+        """Totals over the (filtered) holdings, aggregated in SQL, plus the sector breakdown."""
+        from sqlalchemy import func as sa_func, select
+
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            t, conds = self._holdings_table(session, portfolio_id, **filters)
+            count, invested, current = session.execute(
+                select(sa_func.count(), sa_func.sum(t.c.invested), sa_func.sum(t.c.value)).where(*conds)).one()
+            sectors = session.execute(
+                select(t.c.sector, sa_func.count(), sa_func.sum(t.c.value)).where(*conds)
+                .group_by(t.c.sector).order_by(sa_func.sum(t.c.value).desc())).all()
+        finally:
+            db.close_session()
+        invested, current = float(invested or 0), float(current or 0)
+        pnl = current - invested
+        return {
+            "stock_count": count,
+            "total_invested": invested,
+            "current_value": current,
+            "total_pnl": pnl,
+            "total_pnl_pct": (pnl / invested * 100) if invested > 0 else 0,
+            "sectors": [{"label": s, "count": n, "value": float(v or 0)} for s, n, v in sectors],
+        }
+
     def load_portfolio(self, portfolio_id=None):
         """Loads portfolio. if portfolio_id is None, loads ALL (aggregated)."""
         db = get_db()
         session = db.get_db_session()
         try:
-            # We need to compute values manually since VIEW might not be updated yet.
-            # Or assume we just list stocks.
-            # Let's perform a query joining Portfolio + MarketData
-            from models import Portfolio, MarketData
-            from sqlalchemy import func as sa_func
-            
-            # Subquery: Latest date per ticker
-            subq = session.query(
-                MarketData.ticker,
-                sa_func.max(MarketData.date).label('max_date')
-            ).group_by(MarketData.ticker).subquery()
-            
-            # Subquery: Latest Close Price
-            latest_prices = session.query(
-                MarketData.ticker,
-                MarketData.close_price
-            ).join(
-                subq,
-                (MarketData.ticker == subq.c.ticker) & (MarketData.date == subq.c.max_date)
-            ).subquery()
-            
-            q = session.query(
-                Portfolio.ticker, 
-                Portfolio.quantity, 
-                Portfolio.avg_price, 
-                Portfolio.purchase_date, # Phase 13
-                Portfolio.portfolio_id,
-                latest_prices.c.close_price
-            ).outerjoin(latest_prices, Portfolio.ticker == latest_prices.c.ticker)
-            
-            if portfolio_id:
-                q = q.filter(Portfolio.portfolio_id == portfolio_id)
-            
-            results = q.all()
+            results = self._holdings_query(session, portfolio_id).all()
             
             # Also fetch names for ID mapping (if needed)
             
-            rows = []
-            for r in results:
-                qty = float(r.quantity)
-                avg = float(r.avg_price)
-                curr_price = float(r.close_price) if r.close_price else avg # Fallback
-                
-                invested = qty * avg
-                curr_val = qty * curr_price
-                pnl = curr_val - invested
-                pnl_pct = (pnl / invested * 100) if invested > 0 else 0
-                
-                rows.append({
-                    "ticker": r.ticker,
-                    "quantity": qty,
-                    "avg_price": avg,
-                    "current_price": curr_price,
-                    "invested_value": invested,
-                    "current_value": curr_val,
-                    "pnl": pnl,
-                    "pnl_pct": pnl_pct,
-                    "original_name": r.ticker, # Placeholder
-                    "portfolio_id": r.portfolio_id,
-                    "purchase_date": r.purchase_date.strftime("%Y-%m-%d") if r.purchase_date else None
-                })
-            
-            # Attach Analysis (same logic as before)
-            caches = session.query(AnalysisCache).all()
-            cache_map = {}
-            for c in caches:
-                if c.result_json:
-                    val = c.result_json
-                    if isinstance(val, str): 
-                        try: val = json.loads(val)
-                        except: pass
-                    cache_map[c.ticker] = val
-            
-            for row in rows:
-                if row['ticker'] in cache_map:
-                    row['analysis'] = cache_map[row['ticker']]
+            rows = [self._holding_row(r) for r in results]
 
             self.stocks = rows
             return self.stocks
@@ -201,6 +345,7 @@ class PortfolioManager:
                 session.add(new_stock)
             
             session.commit()
+            self._changed("holding", ticker)
             return True, "Stock Added"
         except Exception as e:
             session.rollback()
@@ -211,6 +356,111 @@ class PortfolioManager:
         finally:
             db.close_session()
 
+    def sell_stock(self, ticker, qty, price, portfolio_id=1, sell_date=None):
+        """
+        Logs a SELL and shrinks the holding: the quantity left and its cost are the FIFO lots
+        still open after this sell (the row is removed once nothing is left).
+        Refused if the ledger holds fewer shares than qty - on sell_date, and at every later
+        transaction when the sell is backdated.
+        """
+        ticker = ticker.strip().upper()
+        if not (ticker.endswith(".NS") or ticker.endswith(".BO")): ticker += ".NS"
+        if qty <= 0:
+            return False, "Quantity must be positive"
+        if not sell_date:
+            txn_date = datetime.date.today()
+        elif isinstance(sell_date, str):
+            txn_date = datetime.datetime.strptime(sell_date, "%Y-%m-%d").date()
+        else:
+            txn_date = sell_date
+
+        # Check and insert together: a concurrent sell must see this one
+        with self.ledger.lock:
+            state = self.ledger.state(portfolio_id)
+            backdated = state.as_of is not None and txn_date < state.as_of
+            history = lots = None
+            if backdated:
+                history = self.ledger.transactions(portfolio_id, ticker)
+                held = available(history, txn_date)
+            else:
+                lots = state.lots[state.lots["ticker"] == ticker]
+                held = float(lots["quantity"].sum())
+            if qty > held + EPS:
+                on = f" on {txn_date}" if backdated else ""
+                return False, f"Only {held:g} shares of {ticker} in the ledger{on}"
+            return self._log_sell(ticker, qty, price, portfolio_id, txn_date, history, lots)
+
+    def _log_sell(self, ticker, qty, price, portfolio_id, txn_date, history, lots):
+        """Inserts a validated SELL; lots: the ticker's open lots, or history: its transactions (backdated)."""
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            from models import PortfolioTransaction
+            txn = PortfolioTransaction(
+                portfolio_id=portfolio_id,
+                ticker=ticker,
+                transaction_type='SELL',
+                quantity=qty,
+                price=price,
+                date=txn_date
+            )
+            session.add(txn)
+            session.flush()
+
+            sell = pd.DataFrame([{"id": txn.id, "ticker": ticker, "transaction_type": "SELL",
+                                  "quantity": float(qty), "price": float(price), "date": txn_date}])
+            if history is None:
+                left, realized = apply_transactions(lots, sell)
+                realized = float(realized["realized"].sum())
+            else:
+                # Backdated: replay the ticker with the sell in its place (FIFO order changes after it)
+                before = apply_transactions(LedgerState().lots, history)[1]
+                replay = pd.concat([history, sell], ignore_index=True).sort_values(["date", "id"], kind="stable")
+                left, after = apply_transactions(LedgerState().lots, replay)
+                realized = float(after["realized"].sum()) - float(before["realized"].sum())
+            remaining = float(left["quantity"].sum())
+
+            stock = session.query(Portfolio).filter_by(ticker=ticker, portfolio_id=portfolio_id).first()
+            if stock:
+                if remaining > EPS:
+                    stock.quantity = remaining
+                    stock.avg_price = float((left["quantity"] * left["price"]).sum()) / remaining
+                else:
+                    session.delete(stock)
+            session.commit()
+            self._changed("holding", ticker)
+            return True, f"Sold, realized P&L {realized:+,.2f}"
+        except Exception as e:
+            session.rollback()
+            print(f"Error selling stock: {e}")
+            return False, str(e)
+        finally:
+            db.close_session()
+
+    def get_ledger(self, portfolio_id, rebuild=False):
+        """Ledger positions of one portfolio as row dicts, plus realized/unrealized totals."""
+        if rebuild:
+            self.ledger.rebuild(portfolio_id)
+        pos = self.ledger.positions(portfolio_id)
+        rows = []
+        for ticker, p in pos.iterrows():
+            rows.append({
+                "ticker": ticker,
+                "quantity": float(p["quantity"]),
+                "avg_cost": float(p["avg_cost"]),
+                "cost": float(p["cost"]),
+                "lots": int(p["lots"]),
+                "first_date": p["first_date"].strftime("%Y-%m-%d") if isinstance(p["first_date"], datetime.date) else None,
+                "current_price": float(p["price"]),
+                "market_value": float(p["market_value"]),
+                "unrealized": float(p["unrealized"]),
+                "realized": float(p["realized"]),
+                "sold": float(p["sold"]),
+                "unmatched": float(p["unmatched"]),
+            })
+        totals = {k: float(pos[k].sum()) for k in ("cost", "market_value", "unrealized", "realized")}
+        return {"positions": rows, "totals": totals}
+
     def edit_stock_date(self, ticker, portfolio_id, new_date):
         """Update the initial purchase date of a holding."""
         db = get_db()
@@ -224,6 +474,7 @@ class PortfolioManager:
                 else:
                     existing.purchase_date = new_date
                 session.commit()
+                self._changed("holding", ticker)
                 return True
             return False
         except Exception as e:
@@ -234,8 +485,16 @@ class PortfolioManager:
             db.close_session()
 
     def update_stock(self, ticker, qty, avg_price, portfolio_id=1):
+        """
+        Overwrites a holding's quantity and average price - only for holdings the ledger does
+        not track (entered before transactions were logged). Ledger-backed holdings change
+        through add_stock / sell_stock, so their transactions stay the source of truth.
+        """
         if qty <= 0: return self.remove_stock(ticker, portfolio_id)
-        
+        if not self.ledger.transactions(portfolio_id, ticker).empty:
+            print(f"Update refused: {ticker} is tracked by the ledger, use a BUY or SELL instead")
+            return False
+
         db = get_db()
         session = db.get_db_session()
         try:
@@ -244,6 +503,7 @@ class PortfolioManager:
                 stock.quantity = qty
                 stock.avg_price = avg_price
                 session.commit()
+                self._changed("holding", ticker)
                 return True
             return False
         except Exception:
@@ -253,20 +513,31 @@ class PortfolioManager:
             db.close_session()
 
     def remove_stock(self, ticker, portfolio_id=1):
-        db = get_db()
-        session = db.get_db_session()
-        try:
-            stock = session.query(Portfolio).filter_by(ticker=ticker, portfolio_id=portfolio_id).first()
-            if stock:
-                session.delete(stock)
-                session.commit()
-                return True
-            return False
-        except Exception:
-            session.rollback()
-            return False
-        finally:
-            db.close_session()
+        """
+        Deletes a holding together with its transactions in this portfolio, as if it had never
+        been entered - the ledger and NAV history replay without it. No trade is recorded;
+        selling goes through sell_stock.
+        """
+        with self.ledger.lock:
+            db = get_db()
+            session = db.get_db_session()
+            try:
+                from models import PortfolioTransaction
+                stock = session.query(Portfolio).filter_by(ticker=ticker, portfolio_id=portfolio_id).first()
+                if stock:
+                    session.query(PortfolioTransaction).filter_by(ticker=ticker, portfolio_id=portfolio_id) \
+                        .delete(synchronize_session=False)
+                    session.delete(stock)
+                    session.commit()
+                    self._changed("holding", ticker)
+                    return True
+                return False
+            except Exception as e:
+                session.rollback()
+                print(f"Remove Error: {e}")
+                return False
+            finally:
+                db.close_session()
 
     def get_all_portfolios_summary(self):
         """Returns list of summaries with sector breakdown."""
@@ -425,6 +696,7 @@ class PortfolioManager:
             )
             session.merge(cache_entry)
             session.commit()
+            self._changed("analysis", ticker)
         except Exception as e:
             print(f"Save Analysis Error: {e}")
             session.rollback()
@@ -440,9 +712,10 @@ class PortfolioManager:
         
         # 1. Benchmark Data (Nifty 50)
         try:
-            from utils.data_loader import fetch_benchmark_data
-            # Fetch 2y to ensure valid 200 DMA
-            df = fetch_benchmark_data(period="2y")
+            from utils.benchmark_service import get_benchmark_service
+            # Shared snapshot (5y, refreshed once per session) - plenty for the 200 DMA
+            snap = get_benchmark_service().get()
+            df = snap.frame if snap is not None else None
             
             if df is not None and not df.empty:
                 # Latest Price & 1Y Change
@@ -457,10 +730,12 @@ class PortfolioManager:
                     from strategies.minervini import MinerviniStrategy
                     strat = MinerviniStrategy()
                     # Minervini requires ~260 days. We fetched '2y' so we are good.
-                    analysis = strat.analyze("^NSEI", df)
+                    # Verdict only - no chart
+                    analysis = strat.analyze("^NSEI", df, chart_options={"disabled": True})
                     
                     status_raw = analysis.get('status', 'FAIL')
                     details = analysis.get('details', [])
+                    failed_rules = analysis.get('failed_rules', [])
                     
                     if status_raw == "PASS":
                         status = "Strong Buy"
@@ -481,10 +756,10 @@ class PortfolioManager:
                             trend = "Consolidation"
                             
                         # Append main failure reason to trend label for clarity
-                        if details:
-                            # simplify detail text
-                            reason = details[0].split('(')[0].strip()
-                            trend = f"{trend}: {reason}"
+                        if failed_rules:
+                            trend = f"{trend}: {strat.RULES.labels[failed_rules[0]]}"
+                        elif details:
+                            trend = f"{trend}: {details[0]}"
 
                 except Exception as me:
                     print(f"Minervini Strat Error: {me}")
@@ -517,8 +792,9 @@ class PortfolioManager:
             # Get list of tickers currently in portfolio to filter cache
             portfolio_tickers = [t[0] for t in session.query(Portfolio.ticker).distinct().all()]
             
-            # Query cache only for these tickers
-            caches = session.query(AnalysisCache).filter(AnalysisCache.ticker.in_(portfolio_tickers)).all()
+            # Query cache only for these tickers (the summary JSON only, not whole rows)
+            caches = session.query(AnalysisCache.result_json).filter(AnalysisCache.ticker.in_(portfolio_tickers),
+                                                                     AnalysisCache.strategy_name == 'combined').all()
             
             total = 0
             bull = 0
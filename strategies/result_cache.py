@@ -0,0 +1,170 @@
+"""
+Strategy result memoization.
+
+A strategy's result is a pure function of (ticker, last bar, strategy code + parameters, other
+inputs), so results are keyed on exactly that: (ticker, bar_date, strategy name, result_version)
+where result_version combines strategy.cache_version with strategy.cache_token(ticker) (e.g. the
+benchmark's last bar). A new bar changes bar_date, a code/parameter change or a new benchmark bar
+changes the version, so stale entries are never looked up again - nothing has to be invalidated
+explicitly.
+
+Two tiers:
+  - in-process LRU (ResultCache), keyed additionally by variant (mode + chart options), so
+    chart-bearing results are reused by identical chart requests;
+  - persisted per-strategy rows in analysis_cache (load_persisted/save_persisted), chart-less
+    only, shared across workers and restarts.
+"""
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from models import AnalysisCache
+from utils.db import get_db
+from utils.metrics import CACHE_LOOKUPS
+
+# Variant every chart-less request can be served from (screen verdicts included)
+NO_CHART = "full:nochart"
+
+def variant(mode: str = "full", chart_options: dict = None) -> str:
+    """Cache variant for a request: results differ by mode and by chart options."""
+    if mode == "screen":
+        return "screen"
+    opts = dict(chart_options or {})
+    if opts.get("disabled"):
+        return NO_CHART
+    return "full:" + json.dumps(opts, sort_keys=True, default=str)
+
+def strip_chart(result: dict) -> dict:
+    """Chart-less copy of a strategy result (what gets persisted)."""
+    res = dict(result)
+    if res.get("chart_json") is not None:
+        res["chart_json"] = None
+    return res
+
+def jsonable(obj):
+    """numpy scalars etc. as plain JSON types (the JSON column can't serialize them)."""
+    return json.loads(json.dumps(obj, default=lambda o: o.item() if hasattr(o, "item") else str(o)))
+
+def result_version(strategy, ticker: str) -> str:
+    """cache_version, combined with cache_token(ticker) when the strategy has other inputs."""
+    version = strategy.cache_version
+    token = strategy.cache_token(ticker)
+    if token is None:
+        return version
+    return hashlib.sha1(f"{version}:{token}".encode()).hexdigest()[:16]
+
+def is_cacheable(result: dict) -> bool:
+    """Only real verdicts - N/A and ERROR results are retried next time."""
+    return isinstance(result, dict) and result.get("status") in ("PASS", "FAIL")
+
+
+class ResultCache:
+    """Thread-safe LRU of strategy results: key -> (price, result)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(ticker, bar_date, strategy, variant_, version=None):
+        return (ticker, str(bar_date), strategy.name, version or result_version(strategy, ticker), variant_)
+
+    def get(self, ticker, bar_date, strategy, variant_):
+        """(price, result) or None. Chart-less variants fall back to the chart-less full result."""
+        candidates = [variant_]
+        if variant_ == "screen":
+            candidates.append(NO_CHART)
+        version = result_version(strategy, ticker)
+        with self._lock:
+            for v in candidates:
+                k = self.key(ticker, bar_date, strategy, v, version)
+                hit = self._entries.get(k)
+                if hit is not None:
+                    self._entries.move_to_end(k)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache="result", result="hit")
+                    return hit[0], copy.deepcopy(hit[1])
+            self.misses += 1
+        CACHE_LOOKUPS.inc(cache="result", result="miss")
+        return None
+
+    def put(self, ticker, bar_date, strategy, variant_, price, result):
+        if not is_cacheable(result):
+            return
+        entry = (price, copy.deepcopy(result))
+        version = result_version(strategy, ticker)
+        with self._lock:
+            k = self.key(ticker, bar_date, strategy, variant_, version)
+            self._entries[k] = entry
+            self._entries.move_to_end(k)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# --- Persisted tier (analysis_cache rows, one per ticker + strategy) ---
+
+def load_persisted(ticker: str, bar_date, strategies: list) -> dict:
+    """{strategy name: (price, result)} for rows still valid for bar_date and each strategy's result_version."""
+    if bar_date is None or not strategies:
+        return {}
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return {}
+    try:
+        versions = {s.name: result_version(s, ticker) for s in strategies}
+        rows = session.query(AnalysisCache).filter(
+            AnalysisCache.ticker == ticker,
+            AnalysisCache.strategy_name.in_(list(versions)),
+            AnalysisCache.bar_date == bar_date,
+        ).all()
+        out = {}
+        for r in rows:
+            if r.version != versions.get(r.strategy_name) or not r.result_json:
+                continue
+            res = r.result_json
+            if isinstance(res, str):
+                res = json.loads(res)
+            out[r.strategy_name] = (r.price, res)
+        return out
+    except Exception as e:
+        print(f"Result Cache Load Error {ticker}: {e}")
+        return {}
+    finally:
+        db.close_session()
+
+def save_persisted(ticker: str, bar_date, price, entries: list):
+    """entries: [(strategy, result)]; stored chart-less, one row per strategy (upsert)."""
+    entries = [(s, r) for s, r in entries if is_cacheable(r)]
+    if bar_date is None or not entries:
+        return
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return
+    try:
+        for strategy, result in entries:
+            session.merge(AnalysisCache(
+                ticker=ticker,
+                strategy_name=strategy.name,
+                result_json=jsonable(strip_chart(result)),
+                bar_date=bar_date,
+                version=result_version(strategy, ticker),
+                price=price,
+            ))
+        session.commit()
+    except Exception as e:
+        print(f"Result Cache Save Error {ticker}: {e}")
+        session.rollback()
+    finally:
+        db.close_session()
@@ -0,0 +1,208 @@
+from .base import MomentumStrategy
+import pandas as pd
+from utils.db import get_db
+from models import RSHistory
+
+# IBD-style weighting: 40% 3-month + 20% each of 6/9/12-month rate of change
+ROC_WEIGHTS = {63: 0.4, 126: 0.2, 189: 0.2, 252: 0.2}
+MAX_LOOKBACK = max(ROC_WEIGHTS)
+
+
+def weighted_roc(close: pd.DataFrame) -> pd.DataFrame:
+    """Weighted ROC (%) for every date and ticker of a dates x tickers close panel."""
+    score = None
+    for days, weight in ROC_WEIGHTS.items():
+        roc = (close / close.shift(days) - 1) * 100 * weight
+        score = roc if score is None else score + roc
+    return score
+
+
+def rank_to_rating(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cross-sectional percentile per date, scaled to 1-99 (weakest 1, strongest 99).
+    Tickers without a score that day stay NaN.
+    """
+    ranks = raw.rank(axis=1, method="average")
+    count = raw.notna().sum(axis=1)
+    span = (count - 1).where(count > 1)
+    # Single-ticker days would divide by zero; call them mid-pack
+    pct = ranks.sub(1).div(span, axis=0).fillna(0.5).where(raw.notna())
+    return (1 + pct * 98).round()
+
+
+def rs_rating_panel(close: pd.DataFrame) -> tuple:
+    """(raw_score, rs_rating) panels for the whole universe, fully vectorized."""
+    raw = weighted_roc(close)
+    return raw, rank_to_rating(raw)
+
+
+def update_rs_history(tickers: list = None, full: bool = False) -> int:
+    """
+    Recomputes ratings from stored market_data and persists the days not yet in rs_history
+    (or everything with full=True). Returns the number of rows written.
+    tickers: write only these - they are still ranked against the whole universe.
+    """
+    from utils.data_loader import load_price_panel
+
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return 0
+    try:
+        from sqlalchemy import func as sa_func
+        q = session.query(sa_func.max(RSHistory.date))
+        if tickers:
+            q = q.filter(RSHistory.ticker.in_(tickers))
+        last = None if full else q.scalar()
+    finally:
+        db.close_session()
+
+    # Enough history before the first new day for the 12-month ROC
+    history_start = None if last is None else pd.Timestamp(last) - pd.Timedelta(days=int(MAX_LOOKBACK * 1.6))
+    # A rating is a rank across the universe, so the whole panel is loaded even for a few tickers
+    panel = load_price_panel(None, start=history_start, fields=["Close"])
+    if not panel: return 0
+
+    # Stocks only: indices (^NSEI and every other benchmark) would shift each stock's percentile
+    close = panel["Close"]
+    close = close.loc[:, ~close.columns.str.startswith("^")]
+    raw, rating = rs_rating_panel(close)
+    if tickers:
+        keep = close.columns.intersection(tickers)
+        raw, rating = raw[keep], rating[keep]
+    if last is not None:
+        raw = raw.loc[raw.index > pd.Timestamp(last)]
+        rating = rating.loc[raw.index]
+
+    long_df = pd.DataFrame({
+        "raw_score": raw.stack(),
+        "rs_rating": rating.stack(),
+    }).dropna().reset_index()
+    long_df.columns = ["date", "ticker", "raw_score", "rs_rating"]
+    if long_df.empty: return 0
+
+    rows = [{
+        "ticker": r.ticker,
+        "date": r.date.date(),
+        "raw_score": float(r.raw_score),
+        "rs_rating": int(r.rs_rating),
+    } for r in long_df.itertuples(index=False)]
+
+    db = get_db()
+    session = db.get_db_session()
+    try:
+        first = min(r["date"] for r in rows)
+        q = session.query(RSHistory).filter(RSHistory.date >= first)
+        if tickers:
+            q = q.filter(RSHistory.ticker.in_(tickers))
+        q.delete(synchronize_session=False)
+        session.bulk_insert_mappings(RSHistory, rows)
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        print(f"RS History Save Error: {e}")
+        session.rollback()
+        return 0
+    finally:
+        db.close_session()
+
+
+def get_latest_rs(tickers: list = None) -> dict:
+    """{ticker: {"rating", "raw_score", "date"}} from the most recent rs_history day."""
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return {}
+    try:
+        from sqlalchemy import func as sa_func
+        last = session.query(sa_func.max(RSHistory.date)).scalar()
+        if last is None: return {}
+        q = session.query(RSHistory).filter(RSHistory.date == last)
+        if tickers:
+            q = q.filter(RSHistory.ticker.in_(tickers))
+        return {r.ticker: {"rating": r.rs_rating, "raw_score": r.raw_score, "date": r.date.isoformat()}
+                for r in q.all()}
+    except Exception as e:
+        print(f"RS Lookup Error: {e}")
+        return {}
+    finally:
+        db.close_session()
+
+
+def get_rs_history(ticker: str, start=None) -> pd.Series:
+    """Daily RS Rating series for one ticker."""
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return pd.Series(dtype=float)
+    try:
+        q = session.query(RSHistory.date, RSHistory.rs_rating).filter(RSHistory.ticker == ticker)
+        if start is not None:
+            q = q.filter(RSHistory.date >= pd.Timestamp(start).date())
+        rows = q.order_by(RSHistory.date.asc()).all()
+        return pd.Series([r.rs_rating for r in rows], index=pd.to_datetime([r.date for r in rows]), name="RS_Rating")
+    except Exception as e:
+        print(f"RS History Lookup Error: {e}")
+        return pd.Series(dtype=float, name="RS_Rating")
+    finally:
+        db.close_session()
+
+
+def top_rated(min_rating: int = 70, limit: int = 100) -> list:
+    """Screener: strongest tickers on the latest day, best first."""
+    latest = get_latest_rs()
+    rows = [{"ticker": t, **v} for t, v in latest.items() if v["rating"] is not None and v["rating"] >= min_rating]
+    rows.sort(key=lambda r: r["raw_score"], reverse=True)
+    return rows[:limit]
+
+
+class RSRatingStrategy(MomentumStrategy):
+    """
+    Relative strength vs. the whole stored universe (IBD-style 1-99).
+    Ratings are precomputed cross-sectionally (update_rs_history); analyze() only looks them up.
+    """
+
+    # The rating table is refreshed by a separate job, so the last bar alone doesn't pin the result
+    cacheable = False
+
+    def __init__(self, min_rating: int = 70, lookup=None):
+        self.min_rating = min_rating
+        # lookup(ticker) -> {"rating", "raw_score", "date"} | None ; injectable for tests
+        self.lookup = lookup or (lambda t: get_latest_rs([t]).get(t))
+
+    @property
+    def name(self) -> str:
+        return "RS Rating (IBD)"
+
+    @property
+    def data_requirements(self) -> dict:
+        # Precomputed - no price history needed at analysis time
+        return {"lookback_bars": 0, "columns": [], "benchmark": False}
+
+    def cache_token(self, ticker: str):
+        rs = self.lookup(ticker) or {}
+        return f"{rs.get('date')}:{rs.get('rating')}"
+
+    def analyze(self, ticker: str, data: pd.DataFrame, chart_options: dict = None) -> dict:
+        rs = self.lookup(ticker)
+        if not rs or rs.get("rating") is None:
+            # Not a failure of the stock - ratings just haven't been computed for it
+            return {
+                "strategy": self.name,
+                "status": "N/A",
+                "signal": "NEUTRAL",
+                "score": "-",
+                "details": ["RS Rating not available (run scripts/update_rs_ratings.py)"],
+                "metrics": {},
+            }
+
+        rating = int(rs["rating"])
+        passed = rating >= self.min_rating
+        return {
+            "strategy": self.name,
+            "status": "PASS" if passed else "FAIL",
+            "signal": "BUY" if passed else "NEUTRAL",
+            "score": f"{rating}/99",
+            "details": [f"RS Rating {rating} {'>=' if passed else '<'} {self.min_rating} (as of {rs.get('date')})"],
+            "metrics": {
+                "RS_Rating": rating,
+                "Weighted_ROC": round(float(rs.get("raw_score") or 0), 2),
+            },
+        }
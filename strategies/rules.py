@@ -0,0 +1,558 @@
+"""
+Small rule language for screens, e.g.
+
+    close > sma(150) and sma(150) > sma(200)
+    close >= low_mult * lowest(year_window)
+    sma(200) > ref(sma(200), 20)
+
+Rules are Python expression syntax restricted to: the price fields (open, high, low,
+close, volume), numbers, parameter names, + - * /, comparisons, and/or/not and the
+functions in FUNCTIONS. They evaluate over EVERY bar at once, on a single ticker's frame
+or a dates x tickers panel, and common subexpressions (sma(200) above) are computed once
+per evaluation. Pass/fail reason strings are generated from the expression itself, unless
+the rule gives its own (format strings over named values, e.g. "RSI Weak ({rsi:.2f})").
+"""
+import ast
+import numbers
+import string
+import threading
+import time
+import numpy as np
+import pandas as pd
+import utils.technical_indicators as ta
+from .base import MomentumStrategy
+
+
+FIELDS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# name -> (implementation(series, window), default window or None if required)
+FUNCTIONS = {
+    "sma": (lambda s, n: ta.sma(s, n), None),
+    "ema": (lambda s, n: ta.ema(s, n), None),
+    "rsi": (lambda s, n: ta.rsi(s, n), 14),
+    "highest": (lambda s, n: s.rolling(window=n).max(), None),
+    "lowest": (lambda s, n: s.rolling(window=n).min(), None),
+    "ref": (lambda s, n: s.shift(n), None),  # value n bars ago
+}
+
+# Exponential smoothers need extra history before they converge
+SMOOTHED = {"ema", "rsi"}
+SMOOTHING_WARMUP = 100
+# Relative cost of a smoother in screening mode (runs over the whole series, not a window)
+SMOOTHED_COST = 1000
+
+_CMP = {ast.Gt: ">", ast.GtE: ">=", ast.Lt: "<", ast.LtE: "<=", ast.Eq: "==", ast.NotEq: "!="}
+_NEGATE = {">": "<=", ">=": "<", "<": ">=", "<=": ">", "==": "!=", "!=": "=="}
+_ARITH = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+_OPS = {
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    "+": lambda a, b: a + b, "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b, "/": lambda a, b: a / b,
+}
+
+
+# --- Parsing ---
+# Nodes are plain tuples, so identical subexpressions are equal and hash the same:
+#   ("field", "Close") ("num", 1.3) ("name", "low_mult") ("call", "sma", arg, window)
+#   ("bin", op, a, b) ("cmp", op, a, b) ("and", (nodes)) ("or", (nodes)) ("not", a) ("neg", a)
+
+def parse(expr: str) -> tuple:
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rule '{expr}': {e.msg}")
+    return _convert(tree.body, expr)
+
+
+def _convert(node, expr):
+    if isinstance(node, ast.BoolOp):
+        kind = "and" if isinstance(node.op, ast.And) else "or"
+        return (kind, tuple(_convert(v, expr) for v in node.values))
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return ("not", _convert(node.operand, expr))
+        if isinstance(node.op, ast.USub):
+            inner = _convert(node.operand, expr)
+            return ("num", -inner[1]) if inner[0] == "num" else ("neg", inner)
+    if isinstance(node, ast.Compare):
+        # a < b < c  ==  a < b and b < c
+        parts, left = [], _convert(node.left, expr)
+        for op, comp in zip(node.ops, node.comparators):
+            if type(op) not in _CMP:
+                break
+            right = _convert(comp, expr)
+            parts.append(("cmp", _CMP[type(op)], left, right))
+            left = right
+        else:
+            return parts[0] if len(parts) == 1 else ("and", tuple(parts))
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        return ("bin", _ARITH[type(node.op)], _convert(node.left, expr), _convert(node.right, expr))
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return ("num", node.value)
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        return ("field", FIELDS[name]) if name in FIELDS else ("name", node.id)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        fn = node.func.id.lower()
+        if fn not in FUNCTIONS:
+            raise ValueError(f"Invalid rule '{expr}': unknown function {fn}()")
+        args = [_convert(a, expr) for a in node.args]
+        default = FUNCTIONS[fn][1]
+        # fn(window) applies to close; fn(series, window) to anything else; rsi() uses 14
+        if len(args) == 0 and default is not None:
+            return ("call", fn, ("field", "Close"), ("num", default))
+        if len(args) == 1:
+            return ("call", fn, ("field", "Close"), args[0])
+        if len(args) == 2:
+            return ("call", fn, args[0], args[1])
+        raise ValueError(f"Invalid rule '{expr}': {fn}() takes (window) or (series, window)")
+    raise ValueError(f"Invalid rule '{expr}': unsupported syntax '{ast.unparse(node)}'")
+
+
+def render(node, params: dict = None) -> str:
+    """Expression text with parameters substituted (used in reason strings)."""
+    params = params or {}
+    kind = node[0]
+    if kind == "field":
+        return node[1].lower()
+    if kind == "num":
+        return f"{node[1]:g}"
+    if kind == "name":
+        return f"{params[node[1]]:g}" if isinstance(params.get(node[1]), (int, float)) else node[1]
+    if kind == "call":
+        _, fn, arg, window = node
+        w = render(window, params)
+        return f"{fn}({w})" if arg == ("field", "Close") else f"{fn}({render(arg, params)}, {w})"
+    if kind == "bin":
+        return f"{render(node[2], params)} {node[1]} {render(node[3], params)}"
+    if kind == "neg":
+        return f"-{render(node[1], params)}"
+    if kind == "cmp":
+        return f"{render(node[2], params)} {node[1]} {render(node[3], params)}"
+    if kind == "not":
+        return f"not ({render(node[1], params)})"
+    return f" {kind} ".join(render(n, params) for n in node[1])
+
+
+def lookback(node, params: dict = None) -> int:
+    """Bars of history the expression needs before its first valid value."""
+    params = params or {}
+    kind = node[0]
+    if kind == "call":
+        _, fn, arg, window = node
+        n = _window(window, params)
+        own = n if fn == "ref" else n - 1
+        return lookback(arg, params) + own + (SMOOTHING_WARMUP if fn in SMOOTHED else 0)
+    if kind in ("bin", "cmp"):
+        return max(lookback(node[2], params), lookback(node[3], params))
+    if kind in ("not", "neg"):
+        return lookback(node[1], params)
+    if kind in ("and", "or"):
+        return max(lookback(n, params) for n in node[1])
+    return 0
+
+
+def _window(node, params) -> int:
+    if node[0] == "num":
+        return int(node[1])
+    if node[0] == "name" and node[1] in params:
+        return int(params[node[1]])
+    raise ValueError(f"Window must be a number or parameter, got '{render(node, params)}'")
+
+
+def cost(node, params: dict = None) -> int:
+    """Rough bars-touched estimate of evaluating node on the last bar only (screening order)."""
+    params = params or {}
+    kind = node[0]
+    if kind == "call":
+        _, fn, arg, window = node
+        if fn in SMOOTHED:
+            return SMOOTHED_COST + cost(arg, params)
+        own = 0 if fn == "ref" else _window(window, params)
+        return own + cost(arg, params)
+    if kind in ("bin", "cmp"):
+        return cost(node[2], params) + cost(node[3], params)
+    if kind in ("not", "neg"):
+        return cost(node[1], params)
+    if kind in ("and", "or"):
+        return sum(cost(n, params) for n in node[1])
+    return 1
+
+
+# --- Evaluation ---
+
+class Evaluator:
+    """
+    Evaluates nodes over one dataset, memoizing every subexpression.
+    data: a ticker's OHLCV frame, a Close series, or a panel dict {'Close': dates x tickers, ...}.
+    Names that are not parameters are looked up as extra data columns (e.g. an RS_Rating panel).
+    """
+
+    def __init__(self, data, params: dict = None):
+        if isinstance(data, pd.Series):
+            data = {"Close": data}
+        self.data = data
+        self.params = params or {}
+        self.cache = {}
+
+    def value(self, node):
+        if node in self.cache:
+            return self.cache[node]
+        val = self._compute(node)
+        self.cache[node] = val
+        return val
+
+    def series(self, expr: str):
+        """Convenience: evaluate an expression string (sharing this evaluator's cache)."""
+        return self.value(parse(expr))
+
+    def _compute(self, node):
+        kind = node[0]
+        if kind == "num":
+            return node[1]
+        if kind == "field":
+            return self.data[node[1]]
+        if kind == "name":
+            if node[1] in self.params:
+                return self.params[node[1]]
+            if node[1] in self.data:
+                return self.data[node[1]]
+            raise ValueError(f"Unknown name '{node[1]}' (not a parameter or data column)")
+        if kind == "call":
+            _, fn, arg, window = node
+            return FUNCTIONS[fn][0](self.value(arg), _window(window, self.params))
+        if kind in ("bin", "cmp"):
+            return _OPS[node[1]](self.value(node[2]), self.value(node[3]))
+        if kind == "neg":
+            return -self.value(node[1])
+        if kind == "not":
+            return ~self.value(node[1])
+        combine = (lambda a, b: a & b) if kind == "and" else (lambda a, b: a | b)
+        out = None
+        for n in node[1]:
+            v = self.value(n)
+            out = v if out is None else combine(out, v)
+        return out
+
+    def at(self, node, pos: int = -1):
+        """Scalar value of node at bar `pos` (single-ticker data)."""
+        v = self.value(node)
+        return v.iloc[pos] if hasattr(v, "iloc") else v
+
+    def reason(self, node, passed: bool, pos: int = -1) -> str:
+        """Why node is (passed=True) / isn't true at bar pos, with the values involved."""
+        kind = node[0]
+        if kind == "cmp":
+            op = node[1] if passed else _NEGATE[node[1]]
+            return f"{self._operand(node[2], pos)} {op} {self._operand(node[3], pos)}"
+        if kind in ("and", "or"):
+            # Passing AND / failing OR: every part matters. Otherwise only the deciding parts.
+            every = passed == (kind == "and")
+            parts = [n for n in node[1] if every or bool(self.at(n, pos)) == passed]
+            joiner = " or " if kind == "or" and passed else " and "
+            return joiner.join(self.reason(n, passed, pos) for n in parts)
+        if kind == "not":
+            return self.reason(node[1], not passed, pos)
+        return f"{render(node, self.params)} is {'true' if passed else 'false'}"
+
+    def _operand(self, node, pos) -> str:
+        text = render(node, self.params)
+        if node[0] == "num" or (node[0] == "name" and node[1] in self.params):
+            return text
+        v = self.at(node, pos)
+        return f"{text} ({v:.2f})" if isinstance(v, numbers.Real) and not pd.isna(v) else f"{text} (n/a)"
+
+
+class LastBarEvaluator:
+    """
+    Screening-mode evaluator: the value of a node at ONE bar (offset k from the end),
+    computed from just the window it needs (sma(200) is a 200-value mean, not a rolling
+    pass over the series). Smoothers (ema/rsi) have no short form and fall back to the
+    full series. Values are memoized per (node, offset), so shared subexpressions are free.
+    """
+
+    def __init__(self, data, params: dict = None):
+        if isinstance(data, pd.Series):
+            data = {"Close": data}
+        self.data = data
+        self.params = params or {}
+        self.cache = {}
+        self._arrays = {}
+        self._full = None
+
+    def _array(self, key):
+        arr = self._arrays.get(key)
+        if arr is None:
+            arr = np.asarray(self.data[key], dtype=float)
+            self._arrays[key] = arr
+        return arr
+
+    def value_at(self, node, k: int = 0):
+        key = (node, k)
+        if key in self.cache:
+            return self.cache[key]
+        val = self._compute(node, k)
+        self.cache[key] = val
+        return val
+
+    def _column(self, node):
+        """Data column behind a field / non-parameter name node, else None."""
+        if node[0] == "field":
+            return node[1]
+        if node[0] == "name" and node[1] not in self.params:
+            if node[1] not in self.data:
+                raise ValueError(f"Unknown name '{node[1]}' (not a parameter or data column)")
+            return node[1]
+        return None
+
+    def _window_values(self, arg, k: int, w: int):
+        col = self._column(arg)
+        if col is not None:
+            a = self._array(col)
+            end = len(a) - k
+            return a[end - w:end] if end - w >= 0 else None
+        return np.array([self.value_at(arg, k + j) for j in range(w - 1, -1, -1)], dtype=float)
+
+    def _compute(self, node, k):
+        kind = node[0]
+        if kind == "num":
+            return node[1]
+        if kind == "name" and node[1] in self.params:
+            return self.params[node[1]]
+        col = self._column(node)
+        if col is not None:
+            a = self._array(col)
+            return a[len(a) - 1 - k] if k < len(a) else np.nan
+        if kind == "call":
+            _, fn, arg, window = node
+            w = _window(window, self.params)
+            if fn == "ref":
+                return self.value_at(arg, k + w)
+            if fn in SMOOTHED:
+                self._full = self._full or Evaluator(self.data, self.params)
+                v = self._full.value(node)
+                return v.iloc[-1 - k] if k < len(v) else np.nan
+            vals = self._window_values(arg, k, w)
+            if vals is None or len(vals) < w:
+                return np.nan
+            if fn == "sma":
+                return vals.mean()
+            return vals.max() if fn == "highest" else vals.min()
+        if kind in ("bin", "cmp"):
+            return _OPS[node[1]](self.value_at(node[2], k), self.value_at(node[3], k))
+        if kind == "neg":
+            return -self.value_at(node[1], k)
+        if kind == "not":
+            return not self.value_at(node[1], k)
+        if kind == "and":
+            return all(bool(self.value_at(n, k)) for n in node[1])
+        return any(bool(self.value_at(n, k)) for n in node[1])
+
+
+class ScreenStats:
+    """
+    Per-rule counters for screening mode (thread-safe): how often each rule ran, how often
+    it rejected, and its average time. Once every rule has `min_samples`, screening orders
+    rules by observed time per rejection instead of the static cost estimate.
+    """
+
+    def __init__(self, min_samples: int = 50):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.evaluated = {}
+        self.rejected = {}
+        self.seconds = {}
+        self.screens = 0
+        self.passed = 0
+
+    def record(self, name: str, passed: bool, seconds: float):
+        with self._lock:
+            self.evaluated[name] = self.evaluated.get(name, 0) + 1
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            if not passed:
+                self.rejected[name] = self.rejected.get(name, 0) + 1
+
+    def record_screen(self, passed: bool):
+        with self._lock:
+            self.screens += 1
+            self.passed += int(passed)
+
+    def order(self, rules: list, costs: dict) -> list:
+        if any(self.evaluated.get(r.name, 0) < self.min_samples for r in rules):
+            return sorted(rules, key=lambda r: costs[r.name])
+
+        def expected_cost(r):
+            n = self.evaluated[r.name]
+            reject_rate = self.rejected.get(r.name, 0) / n
+            # Cheap, selective rules first: time spent per rejection obtained
+            return (self.seconds[r.name] / n) / max(reject_rate, 1e-3)
+        return sorted(rules, key=expected_cost)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            rules = {}
+            for name, n in self.evaluated.items():
+                rej = self.rejected.get(name, 0)
+                rules[name] = {
+                    "evaluated": n,
+                    "rejected": rej,
+                    "reject_rate": round(rej / n, 4) if n else 0.0,
+                    "avg_us": round(self.seconds[name] / n * 1e6, 1) if n else 0.0,
+                }
+            return {"screens": self.screens, "passed": self.passed, "rules": rules}
+
+
+class Rule:
+    """
+    One named condition: Rule("sma200_rising", "sma(200) > ref(sma(200), slope_lookback)", label=...).
+    passed/failed: optional reason format strings. Their fields are names from `values`
+    ({name: expression}) or expressions themselves (close, rsi_min), taken at the bar explained:
+        Rule("rsi_bullish", "rsi(14) >= rsi_min", "RSI", values={"rsi": "rsi(14)"},
+             passed="RSI Bullish ({rsi:.2f})", failed="RSI Weak ({rsi:.2f})")
+    """
+
+    def __init__(self, name: str, expr: str, label: str = None, passed: str = None, failed: str = None,
+                 values: dict = None):
+        self.name = name
+        self.expr = expr
+        self.label = label
+        self.node = parse(expr)
+        self.formats = (passed, failed)
+        self.values = {k: parse(v) for k, v in (values or {}).items()}
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.expr!r})"
+
+
+class RuleSet:
+    """
+    An ordered set of rules evaluated together (shared subexpressions computed once).
+    Build from code or config:
+        RuleSet.from_config({"above_50": "close > sma(50)",
+                             "rsi_ok": {"rule": "rsi() >= rsi_min", "label": "RSI bullish"}},
+                            params={"rsi_min": 50})
+    """
+
+    def __init__(self, rules: list, params: dict = None):
+        self.rules = list(rules)
+        self.params = dict(params or {})
+        self.names = [r.name for r in self.rules]
+        self.labels = {r.name: r.label or r.name for r in self.rules}
+
+    @classmethod
+    def from_config(cls, config, params: dict = None):
+        items = config.items() if isinstance(config, dict) else ((c["name"], c) for c in config)
+        rules = []
+        for name, spec in items:
+            if isinstance(spec, str):
+                rules.append(Rule(name, spec))
+            else:
+                rules.append(Rule(name, spec["rule"], spec.get("label")))
+        return cls(rules, params)
+
+    def evaluator(self, data, **params) -> Evaluator:
+        return Evaluator(data, {**self.params, **params})
+
+    def lookback(self, **params) -> int:
+        p = {**self.params, **params}
+        return max((lookback(r.node, p) for r in self.rules), default=0)
+
+    def evaluate(self, data, evaluator: Evaluator = None, **params) -> dict:
+        """{rule name: boolean series/frame over every bar}. NaN comparisons are False."""
+        ev = evaluator or self.evaluator(data, **params)
+        return {r.name: ev.value(r.node) for r in self.rules}
+
+    def mask(self, data, **params):
+        """True where every rule holds."""
+        out = None
+        for v in self.evaluate(data, **params).values():
+            out = v if out is None else (out & v)
+        return out
+
+    def costs(self, **params) -> dict:
+        p = {**self.params, **params}
+        return {r.name: cost(r.node, p) for r in self.rules}
+
+    def screen(self, data, stats: ScreenStats = None, **params) -> tuple:
+        """
+        Screening mode: last bar only, cheapest (or, with stats, most cost-effective) rule
+        first, stopping at the first failure. Returns (passed, failed rule name or None, rules checked).
+        """
+        p = {**self.params, **params}
+        ev = LastBarEvaluator(data, p)
+        ordered = stats.order(self.rules, self.costs(**p)) if stats else \
+            sorted(self.rules, key=lambda r: cost(r.node, p))
+        for i, r in enumerate(ordered, 1):
+            t0 = time.perf_counter()
+            ok = bool(ev.value_at(r.node))
+            if stats:
+                stats.record(r.name, ok, time.perf_counter() - t0)
+            if not ok:
+                if stats: stats.record_screen(False)
+                return False, r.name, i
+        if stats: stats.record_screen(True)
+        return True, None, len(ordered)
+
+    def explain(self, data, pos: int = -1, evaluator: Evaluator = None, formats: dict = None, **params) -> list:
+        """
+        Per-rule verdict at one bar of a single ticker: [{"name", "label", "passed", "reason"}].
+        Reasons use the rule's passed/failed format (or formats[name] = (passed, failed) to
+        override them), else they are generated from the rule text.
+        """
+        ev = evaluator or self.evaluator(data, **params)
+        out = []
+        for r in self.rules:
+            passed = bool(ev.at(r.node, pos))
+            template = (formats or {}).get(r.name, r.formats)[0 if passed else 1]
+            if template:
+                reason = self._format(template, r, ev, pos)
+            else:
+                reason = ev.reason(r.node, passed, pos)
+                reason = f"{r.label}: {reason}" if r.label else reason
+            out.append({"name": r.name, "label": self.labels[r.name], "passed": passed, "reason": reason})
+        return out
+
+    @staticmethod
+    def _format(template: str, rule: Rule, ev: Evaluator, pos: int) -> str:
+        fields = {f for _, f, _, _ in string.Formatter().parse(template) if f}
+        values = {f: ev.at(rule.values[f] if f in rule.values else parse(f), pos) for f in fields}
+        return template.format(**values)
+
+
+class RuleStrategy(MomentumStrategy):
+    """A screen defined entirely by a RuleSet - passes when every rule holds on the last bar."""
+
+    def __init__(self, name: str, rules: RuleSet, **params):
+        self._name = name
+        self.rules = rules
+        self.params = {**rules.params, **params}
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def data_requirements(self) -> dict:
+        return {"lookback_bars": self.rules.lookback(**self.params) + 1,
+                "columns": ["Open", "High", "Low", "Close", "Volume"], "benchmark": False}
+
+    def analyze(self, ticker: str, data: pd.DataFrame, chart_options: dict = None) -> dict:
+        if data is None or data.empty:
+            return {"strategy": self.name, "status": "FAIL", "signal": "NEUTRAL", "score": "0/0",
+                    "details": ["No Data"], "metrics": {}}
+
+        verdicts = self.rules.explain(data, **self.params)
+        passed = [v for v in verdicts if v["passed"]]
+        failed = [v for v in verdicts if not v["passed"]]
+        status = "PASS" if not failed else "FAIL"
+        return {
+            "strategy": self.name,
+            "status": status,
+            "signal": "BUY" if status == "PASS" else "NEUTRAL",
+            "score": f"{len(passed)}/{len(verdicts)}",
+            "details": [v["reason"] for v in (passed if status == "PASS" else failed)],
+            "all_details": {"pass": [v["reason"] for v in passed], "fail": [v["reason"] for v in failed]},
+            "metrics": {"Price": float(data['Close'].iloc[-1])},
+        }
@@ -0,0 +1,324 @@
+"""
+Background scan jobs.
+
+A scan (universe, portfolio, watchlist or an explicit ticker list) is submitted as a scan_jobs
+row with its ticker list frozen, then executed off the request thread by ScanScheduler: one job
+at a time, each through StrategyManager.iter_batch (its own worker pool). Per-ticker results
+land in scan_results as they complete, so progress survives the browser tab and the process:
+  - progress/heartbeat are written every FLUSH_EVERY results or FLUSH_SECONDS;
+  - cancel flips the row to 'cancelled', which the running loop sees at its next flush;
+  - resume (explicit, or at startup for jobs whose heartbeat went quiet) re-queues a job and
+    skips the tickers it already has results for.
+State lives in the DB, so any app process can report on or cancel any job.
+"""
+import datetime
+import os
+import queue
+import threading
+import time
+import uuid
+from sqlalchemy import func, cast, Integer
+from models import ScanJob, ScanResult, MarketData, Portfolio
+from strategies.result_cache import jsonable
+from utils.db import get_db
+
+KINDS = ("universe", "portfolio", "watchlist", "tickers")
+ACTIVE = ("queued", "running")
+
+FLUSH_EVERY = 25
+FLUSH_SECONDS = 1.0
+# A running job whose heartbeat is older than this belongs to a dead process and may be resumed
+STALE_AFTER = datetime.timedelta(minutes=2)
+
+# iter_batch backend for scans ("thread" or "process")
+SCAN_BACKEND = os.getenv('SCAN_BACKEND', 'thread')
+
+
+def _now():
+    return datetime.datetime.now()
+
+def resolve_tickers(kind: str, params: dict = None) -> list:
+    """Ticker list for a scan kind (frozen into the job at submit time)."""
+    params = params or {}
+    if kind == "tickers":
+        tickers = [t.strip().upper() for t in params.get("tickers") or [] if t and t.strip()]
+        return list(dict.fromkeys(tickers))
+    if kind == "watchlist":
+        from strategies.watchlist import load_watchlist_tickers
+        return load_watchlist_tickers()
+
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return []
+    try:
+        if kind == "portfolio":
+            q = session.query(Portfolio.ticker)
+            if params.get("portfolio_id") is not None:
+                q = q.filter(Portfolio.portfolio_id == int(params["portfolio_id"]))
+        else:
+            # Universe: every ticker we store history for
+            q = session.query(MarketData.ticker)
+        return sorted(t for (t,) in q.distinct().all())
+    finally:
+        db.close_session()
+
+def job_to_json(job: ScanJob) -> dict:
+    total = job.total or 0
+    processed = job.processed or 0
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "mode": (job.params or {}).get("mode", "full"),
+        "total": total,
+        "processed": processed,
+        "passed": job.passed or 0,
+        "progress": int(processed * 100 / total) if total else (100 if job.status == "completed" else 0),
+        "current": job.current or "",
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class ScanScheduler:
+    """
+    Runs queued scan jobs on a background thread.
+    on_result(ticker, result): optional hook per successful analysis (e.g. summary cache update).
+    """
+
+    def __init__(self, manager, on_result=None, backend: str = SCAN_BACKEND, max_workers: int = None):
+        self.manager = manager
+        self.on_result = on_result
+        self.backend = backend
+        self.max_workers = max_workers
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # --- API ---
+
+    def submit(self, kind: str, tickers: list = None, mode: str = "full", portfolio_id=None) -> dict:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown scan kind: {kind}")
+        if mode not in ("full", "screen"):
+            raise ValueError(f"Unknown mode: {mode}")
+        params = {"mode": mode, "portfolio_id": portfolio_id, "tickers": tickers}
+        params["tickers"] = resolve_tickers(kind, params)
+
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            job = ScanJob(id=uuid.uuid4().hex, kind=kind, params=params, status="queued",
+                          total=len(params["tickers"]), processed=0, passed=0, created_at=_now())
+            session.add(job)
+            session.commit()
+            out = job_to_json(job)
+        finally:
+            db.close_session()
+        self._enqueue(out["id"])
+        return out
+
+    def get(self, job_id: str) -> dict:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            job = session.get(ScanJob, job_id)
+            return job_to_json(job) if job else None
+        finally:
+            db.close_session()
+
+    def recent(self, kind: str = None, limit: int = 20) -> list:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            q = session.query(ScanJob)
+            if kind:
+                q = q.filter(ScanJob.kind == kind)
+            return [job_to_json(j) for j in q.order_by(ScanJob.created_at.desc()).limit(limit).all()]
+        finally:
+            db.close_session()
+
+    def active(self, kind: str = None) -> dict:
+        """Most recent queued/running job (of kind), or None."""
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            q = session.query(ScanJob).filter(ScanJob.status.in_(ACTIVE))
+            if kind:
+                q = q.filter(ScanJob.kind == kind)
+            job = q.order_by(ScanJob.created_at.desc()).first()
+            return job_to_json(job) if job else None
+        finally:
+            db.close_session()
+
+    def cancel(self, job_id: str) -> bool:
+        """Queued jobs never start; a running job stops at its next progress flush."""
+        return self._transition(job_id, ACTIVE, "cancelled", finished_at=_now())
+
+    def resume(self, job_id: str) -> bool:
+        """Re-queue a cancelled/failed/interrupted job; tickers with results are skipped."""
+        if not self._transition(job_id, ("cancelled", "failed"), "queued", finished_at=None, error=None):
+            return False
+        self._enqueue(job_id)
+        return True
+
+    def resume_interrupted(self) -> list:
+        """Startup: re-queue jobs left queued/running by a process that is gone (stale heartbeat)."""
+        cutoff = _now() - STALE_AFTER
+        db = get_db()
+        session = db.get_db_session() if db else None
+        if not session: return []
+        try:
+            ids = [j.id for j in session.query(ScanJob).filter(ScanJob.status.in_(ACTIVE)).all()
+                   if (j.heartbeat or j.created_at or cutoff) <= cutoff]
+        except Exception as e:
+            print(f"Scan resume check failed: {e}")
+            ids = []
+        finally:
+            db.close_session()
+        for job_id in ids:
+            self._enqueue(job_id)
+        return ids
+
+    def results(self, job_id: str, bullish: bool = None, offset: int = 0, limit: int = 100) -> list:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            q = session.query(ScanResult).filter(ScanResult.job_id == job_id)
+            if bullish is not None:
+                q = q.filter(ScanResult.bullish == bullish)
+            rows = q.order_by(ScanResult.ticker).offset(offset).limit(limit).all()
+            return [r.result_json for r in rows]
+        finally:
+            db.close_session()
+
+    # --- Execution ---
+
+    def _enqueue(self, job_id):
+        self._queue.put(job_id)
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="scan-jobs", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self.run(job_id)
+            except Exception as e:
+                print(f"Scan job {job_id} failed: {e}")
+                self._transition(job_id, ("running",), "failed", finished_at=_now(), error=str(e)[:255])
+            finally:
+                self._queue.task_done()
+
+    def run(self, job_id: str):
+        """Executes one job in the calling thread (the scheduler thread, or directly in scripts)."""
+        params = self._claim(job_id)
+        if params is None:
+            return
+        tickers = params.get("tickers") or []
+        done = self._done_tickers(job_id)
+        todo = [t for t in tickers if t not in done]
+
+        buffer = []
+        last_flush = time.monotonic()
+        failed_at = None  # last failed flush: its items stay buffered and are retried
+        batch = self.manager.iter_batch(todo, backend=self.backend, max_workers=self.max_workers,
+                                        chart_options={"disabled": True}, mode=params.get("mode", "full"))
+        try:
+            for ticker, res in batch:
+                buffer.append((ticker, res))
+                if self.on_result and res and not res.get("error"):
+                    try:
+                        self.on_result(ticker, res)
+                    except Exception as e:
+                        print(f"Scan result hook failed for {ticker}: {e}")
+                now = time.monotonic()
+                due = len(buffer) >= FLUSH_EVERY or now - last_flush >= FLUSH_SECONDS
+                if due and (failed_at is None or now - failed_at >= FLUSH_SECONDS):
+                    try:
+                        alive = self._flush(job_id, buffer)
+                    except Exception:
+                        failed_at = now
+                        continue
+                    buffer, last_flush, failed_at = [], time.monotonic(), None
+                    if not alive:
+                        return # cancelled
+        finally:
+            batch.close()
+        try:
+            alive = self._flush(job_id, buffer)
+        except Exception as e:
+            # Results not stored: fail the job rather than complete it short; a resume recomputes them
+            self._transition(job_id, ("running",), "failed", finished_at=_now(), error=f"Saving results failed: {e}"[:255])
+            return
+        if alive:
+            self._transition(job_id, ("running",), "completed", finished_at=_now(), current="")
+
+    def _claim(self, job_id):
+        """queued -> running (atomic, so only one process runs a job). Returns its params or None."""
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            now = _now()
+            claimed = session.query(ScanJob).filter(
+                ScanJob.id == job_id,
+                (ScanJob.status == "queued") | ((ScanJob.status == "running") & (ScanJob.heartbeat <= now - STALE_AFTER)),
+            ).update({"status": "running", "started_at": now, "heartbeat": now}, synchronize_session=False)
+            session.commit()
+            if not claimed:
+                return None
+            return dict(session.get(ScanJob, job_id).params or {})
+        finally:
+            db.close_session()
+
+    def _done_tickers(self, job_id) -> set:
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            return {t for (t,) in session.query(ScanResult.ticker).filter(ScanResult.job_id == job_id).all()}
+        finally:
+            db.close_session()
+
+    def _flush(self, job_id, items) -> bool:
+        """Stores results and progress; False if the job was cancelled meanwhile. Raises if the write fails."""
+        db = get_db()
+        session = db.get_db_session()
+        try:
+            for ticker, res in items:
+                res = res or {"ticker": ticker, "error": "No result"}
+                session.merge(ScanResult(job_id=job_id, ticker=ticker, ok=not res.get("error"),
+                                         bullish=bool(res.get("summary", {}).get("bullish")),
+                                         result_json=jsonable(res)))
+            session.flush()
+            processed, passed = session.query(func.count(ScanResult.ticker),
+                                              func.sum(cast(ScanResult.bullish, Integer))).filter(ScanResult.job_id == job_id).one()
+            values = {"processed": processed or 0, "passed": int(passed or 0), "heartbeat": _now()}
+            if items:
+                values["current"] = items[-1][0]
+            # Not running any more = cancelled; what was computed is kept and counts for a resume
+            alive = session.query(ScanJob).filter(ScanJob.id == job_id, ScanJob.status == "running") \
+                .update(values, synchronize_session=False)
+            session.commit()
+            return bool(alive)
+        except Exception as e:
+            print(f"Scan flush failed for {job_id}: {e}")
+            session.rollback()
+            raise
+        finally:
+            db.close_session()
+
+    def _transition(self, job_id, from_states, to_state, **values) -> bool:
+        db = get_db()
+        session = db.get_db_session() if db else None
+        if not session: return False
+        try:
+            n = session.query(ScanJob).filter(ScanJob.id == job_id, ScanJob.status.in_(from_states)) \
+                .update({"status": to_state, **values}, synchronize_session=False)
+            session.commit()
+            return bool(n)
+        finally:
+            db.close_session()
@@ -0,0 +1,218 @@
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .backtest import backtest_trend_template, max_drawdown
+
+# Thresholds that used to be literals in the strategies / screeners
+DEFAULT_SPACE = {
+    "low_mult": [1.20, 1.25, 1.30, 1.40],
+    "high_mult": [0.70, 0.75, 0.80, 0.85],
+    "rsi_min": [40, 50, 60],
+    "slope_lookback": [20, 40, 60],
+    "dual_lookback": [None, 126, 252],
+    "rs_min": [None, 70, 80],
+}
+
+# Keys that belong to MinerviniStrategy; everything else goes to the backtest itself
+TEMPLATE_KEYS = {"low_mult", "high_mult", "rsi_min", "slope_lookback", "year_window"}
+
+PANEL_FIELDS = ["Open", "High", "Low", "Close"]
+
+
+def grid(space: dict) -> list:
+    """Every combination of the listed values."""
+    keys = list(space.keys())
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+
+def random_configs(space: dict, n: int, seed: int = None) -> list:
+    """
+    n random configurations. A list is sampled from; a (lo, hi) tuple is a uniform range
+    (integer if both ends are ints).
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n):
+        cfg = {}
+        for k, v in space.items():
+            if isinstance(v, tuple):
+                lo, hi = v
+                cfg[k] = rng.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rng.uniform(lo, hi)
+            else:
+                cfg[k] = rng.choice(v)
+        configs.append(cfg)
+    return configs
+
+
+def walk_forward_segments(index: pd.DatetimeIndex, folds: int, warmup: int = 260) -> list:
+    """
+    Splits the tradable part of index (after the indicator warm-up) into folds + 1
+    consecutive (start, end) windows. Fold k trains on window k and tests on window k + 1.
+    """
+    tradable = index[warmup:] if len(index) > warmup else index
+    chunks = np.array_split(np.arange(len(tradable)), folds + 1)
+    return [(tradable[c[0]], tradable[c[-1]]) for c in chunks if len(c)]
+
+
+def segment_metrics(equity: pd.Series, trades: pd.DataFrame, start, end) -> dict:
+    """Return, Sharpe, drawdown and hit rate of one window of a full-history run."""
+    prior = equity.loc[:start].iloc[:-1]
+    base = prior.iloc[-1] if len(prior) else 1.0
+    seg = equity.loc[start:end]
+    if seg.empty:
+        return {"return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0, "trades": 0, "hit_rate": 0.0}
+
+    daily = seg.pct_change()
+    daily.iloc[0] = seg.iloc[0] / base - 1
+    std = daily.std()
+    sharpe = float(daily.mean() / std * np.sqrt(252)) if std and std > 0 else 0.0
+
+    if trades is not None and not trades.empty:
+        t = trades[(trades["entry_date"] >= start) & (trades["entry_date"] <= end)]
+    else:
+        t = pd.DataFrame()
+    hit = float((t["return_pct"] > 0).mean() * 100) if len(t) else 0.0
+
+    return {
+        "return": float((seg.iloc[-1] / base - 1) * 100),
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown(seg / base),
+        "trades": int(len(t)),
+        "hit_rate": hit,
+    }
+
+
+# --- Shared memory panel ---
+# The parent copies the panel ONCE into a shared block; workers map it read-only.
+
+class SharedPanel:
+    """Owns a (fields x dates x tickers) float64 block in shared memory."""
+
+    def __init__(self, panel: dict, benchmark: pd.Series = None):
+        close = panel["Close"]
+        self.fields = [f for f in PANEL_FIELDS if f in panel]
+        self.index = close.index
+        self.columns = close.columns
+        shape = (len(self.fields), len(self.index), len(self.columns))
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        arr = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        for i, f in enumerate(self.fields):
+            arr[i] = panel[f].reindex(index=self.index, columns=self.columns).to_numpy(dtype=np.float64)
+        self.shape = shape
+        self.benchmark = benchmark
+
+    def spec(self) -> tuple:
+        """Small picklable description the workers need to attach."""
+        return (self.shm.name, self.shape, self.fields, self.index, self.columns, self.benchmark)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+_WORKER = {}
+
+
+def _attach(name: str):
+    # Pool workers share the parent's resource tracker, so attaching on older Pythons
+    # re-registers the same name (a no-op) and the parent's unlink() cleans up once.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(spec):
+    name, shape, fields, index, columns, benchmark = spec
+    shm = _attach(name)
+    arr = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    arr.flags.writeable = False
+    _WORKER["shm"] = shm  # keep the mapping alive
+    _WORKER["panel"] = {f: pd.DataFrame(arr[i], index=index, columns=columns, copy=False)
+                        for i, f in enumerate(fields)}
+    _WORKER["benchmark"] = benchmark
+
+
+def _evaluate(config: dict, segments: list) -> dict:
+    """Runs one configuration over the full history, scored per walk-forward window."""
+    template_params = {k: v for k, v in config.items() if k in TEMPLATE_KEYS}
+    bt_params = {k: v for k, v in config.items() if k not in TEMPLATE_KEYS}
+    res = backtest_trend_template(_WORKER["panel"], template_params=template_params,
+                                  benchmark=_WORKER["benchmark"], **bt_params)
+    return {
+        "config": config,
+        "segments": [segment_metrics(res["equity"], res["trades"], s, e) for s, e in segments],
+    }
+
+
+def run_sweep(panel: dict, configs: list, folds: int = 4, objective: str = "sharpe",
+              benchmark: pd.Series = None, max_workers: int = None, progress=None) -> dict:
+    """
+    Evaluates every config on a process pool (all cores by default) sharing the panel via
+    shared memory, then ranks them by mean `objective` over the windows after the first.
+
+    Returns {"ranking": DataFrame (best first), "walk_forward": DataFrame of the per-fold
+    in-sample pick and its out-of-sample score}. Only walk_forward is out-of-sample: the
+    ranking scores every config on the later windows without selecting on earlier ones.
+    """
+    segments = walk_forward_segments(panel["Close"].index, folds)
+    max_workers = max_workers or os.cpu_count() or 1
+    shared = SharedPanel(panel, benchmark)
+
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(shared.spec(),)) as pool:
+            futures = {pool.submit(_evaluate, cfg, segments): n for n, cfg in enumerate(configs)}
+            for i, fut in enumerate(as_completed(futures), 1):
+                try:
+                    results.append((futures[fut], fut.result()))
+                except Exception as e:
+                    print(f"Sweep config failed: {e}")
+                if progress:
+                    progress(i, len(configs))
+    finally:
+        shared.close()
+
+    # Submission order, so ties resolve the same way every run
+    results = [r for _, r in sorted(results, key=lambda x: x[0])]
+    return rank_results(results, segments, objective)
+
+
+def rank_results(results: list, segments: list, objective: str = "sharpe") -> dict:
+    n_folds = len(segments) - 1
+    rows = []
+    for r in results:
+        later = [seg[objective] for seg in r["segments"][1:]]
+        row = {**r["config"]}
+        row[f"later_folds_{objective}"] = float(np.mean(later)) if later else 0.0
+        row[f"later_folds_{objective}_min"] = float(np.min(later)) if later else 0.0
+        row["later_folds_return"] = float(np.mean([seg["return"] for seg in r["segments"][1:]])) if n_folds else 0.0
+        row["later_folds_trades"] = int(sum(seg["trades"] for seg in r["segments"][1:]))
+        rows.append(row)
+    ranking = pd.DataFrame(rows)
+    if not ranking.empty:
+        ranking = ranking.sort_values(f"later_folds_{objective}", ascending=False).reset_index(drop=True)
+
+    # Walk-forward: pick the in-sample best on window k, record how it did on window k + 1
+    wf = []
+    for k in range(n_folds):
+        if not results:
+            break
+        best = max(results, key=lambda r: r["segments"][k][objective])
+        wf.append({
+            "train_start": segments[k][0], "train_end": segments[k][1],
+            "test_start": segments[k + 1][0], "test_end": segments[k + 1][1],
+            "config": best["config"],
+            f"is_{objective}": best["segments"][k][objective],
+            f"oos_{objective}": best["segments"][k + 1][objective],
+        })
+
+    return {"ranking": ranking, "walk_forward": pd.DataFrame(wf)}
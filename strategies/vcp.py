@@ -0,0 +1,361 @@
+"""
+Volatility Contraction Pattern (VCP) / base detection.
+
+Swing highs and lows come from a zigzag (one O(n) pass: a peak is confirmed once price
+falls `zigzag_pct` below it, a trough once it rises `zigzag_pct` above it). A base starts
+at the highest swing high in the window; each swing high -> following swing low is one
+pullback. A VCP is a run of pullbacks that get shallower, ending tight, on drying volume.
+"""
+import numpy as np
+import pandas as pd
+from utils.db import get_db
+from models import VCPBase
+
+VCP_DEFAULTS = {
+    "zigzag_pct": 0.03,        # swing size that counts as a pivot
+    "base_window": 250,        # bars searched for the base
+    "min_contractions": 2,     # shallower-and-shallower pullbacks required
+    "max_base_depth": 0.35,    # first pullback no deeper than 35%
+    "max_final_depth": 0.10,   # last pullback no deeper than 10%
+    "tight_window": 10,        # pivot tightness: high-low range of the last N bars ...
+    "max_tightness": 0.10,     # ... as a fraction of close
+    "volume_short": 10,        # volume dry-up: short average ...
+    "volume_long": 50,         # ... vs long average
+    "max_volume_ratio": 0.80,
+}
+
+
+# --- Zigzag ---
+
+def zigzag(high: np.ndarray, low: np.ndarray, pct: float) -> tuple:
+    """
+    Swing pivots of one series: (positions, kinds, prices); kind +1 peak (at the high),
+    -1 trough (at the low). The last pivot is the current, not yet confirmed, extreme.
+    """
+    h = np.asarray(high, dtype=float).tolist()
+    l = np.asarray(low, dtype=float).tolist()
+    pos, kinds, prices = [], [], []
+
+    direction = 0
+    hi = lo = ext = None
+    hi_i = lo_i = ext_i = -1
+    for i in range(len(h)):
+        hv, lv = h[i], l[i]
+        if hv != hv or lv != lv:  # NaN
+            continue
+        if direction == 0:
+            if hi is None or hv > hi: hi, hi_i = hv, i
+            if lo is None or lv < lo: lo, lo_i = lv, i
+            if lo_i < hi_i and hi >= lo * (1 + pct):
+                pos.append(lo_i); kinds.append(-1); prices.append(lo)
+                direction, ext, ext_i = 1, hi, hi_i
+            elif hi_i < lo_i and lo <= hi * (1 - pct):
+                pos.append(hi_i); kinds.append(1); prices.append(hi)
+                direction, ext, ext_i = -1, lo, lo_i
+        elif direction == 1:
+            if hv > ext:
+                ext, ext_i = hv, i
+            elif lv <= ext * (1 - pct):
+                pos.append(ext_i); kinds.append(1); prices.append(ext)
+                direction, ext, ext_i = -1, lv, i
+        else:
+            if lv < ext:
+                ext, ext_i = lv, i
+            elif hv >= ext * (1 + pct):
+                pos.append(ext_i); kinds.append(-1); prices.append(ext)
+                direction, ext, ext_i = 1, hv, i
+
+    if direction != 0:
+        pos.append(ext_i); kinds.append(direction); prices.append(ext)
+    return np.array(pos, dtype=int), np.array(kinds, dtype=int), np.array(prices, dtype=float)
+
+
+def zigzag_panel(high: np.ndarray, low: np.ndarray, pct: float) -> np.ndarray:
+    """
+    Same state machine as zigzag(), stepped over dates for every ticker at once
+    (dates x tickers arrays). Returns an int8 matrix: +1 peak, -1 trough, 0 otherwise.
+    """
+    n, m = high.shape
+    cols = np.arange(m)
+    piv = np.zeros((n, m), dtype=np.int8)
+    direction = np.zeros(m, dtype=np.int8)
+    hi = np.full(m, -np.inf); lo = np.full(m, np.inf); ext = np.zeros(m)
+    hi_i = np.full(m, -1); lo_i = np.full(m, -1); ext_i = np.full(m, -1)
+
+    for t in range(n):
+        hv, lv = high[t], low[t]
+        valid = ~(np.isnan(hv) | np.isnan(lv))
+        init = valid & (direction == 0)
+        up = valid & (direction == 1)
+        down = valid & (direction == -1)
+
+        # Undecided: track both extremes until the first swing completes
+        m_hi = init & (hv > hi); hi[m_hi] = hv[m_hi]; hi_i[m_hi] = t
+        m_lo = init & (lv < lo); lo[m_lo] = lv[m_lo]; lo_i[m_lo] = t
+        first_up = init & (lo_i < hi_i) & (hi >= lo * (1 + pct))
+        first_dn = init & ~first_up & (hi_i < lo_i) & (lo <= hi * (1 - pct))
+        piv[lo_i[first_up], cols[first_up]] = -1
+        direction[first_up] = 1; ext[first_up] = hi[first_up]; ext_i[first_up] = hi_i[first_up]
+        piv[hi_i[first_dn], cols[first_dn]] = 1
+        direction[first_dn] = -1; ext[first_dn] = lo[first_dn]; ext_i[first_dn] = lo_i[first_dn]
+
+        # Rising leg: extend the high, or confirm the peak on a pct drop
+        new_hi = up & (hv > ext)
+        rev_dn = up & ~new_hi & (lv <= ext * (1 - pct))
+        ext[new_hi] = hv[new_hi]; ext_i[new_hi] = t
+        piv[ext_i[rev_dn], cols[rev_dn]] = 1
+        direction[rev_dn] = -1; ext[rev_dn] = lv[rev_dn]; ext_i[rev_dn] = t
+
+        # Falling leg: extend the low, or confirm the trough on a pct rise
+        new_lo = down & (lv < ext)
+        rev_up = down & ~new_lo & (hv >= ext * (1 + pct))
+        ext[new_lo] = lv[new_lo]; ext_i[new_lo] = t
+        piv[ext_i[rev_up], cols[rev_up]] = -1
+        direction[rev_up] = 1; ext[rev_up] = hv[rev_up]; ext_i[rev_up] = t
+
+    live = direction != 0
+    piv[ext_i[live], cols[live]] = direction[live]
+    return piv
+
+
+# --- Base analysis ---
+
+def base_from_pivots(pos: np.ndarray, kinds: np.ndarray, prices: np.ndarray, n: int, **params) -> dict:
+    """
+    Pullbacks (swing high -> next swing low) of the base in the last `base_window` bars,
+    starting at its highest swing high. Contractions = the trailing run of pullbacks that
+    each got shallower. None if there is no completed pullback.
+    """
+    p = {**VCP_DEFAULTS, **params}
+    start = n - p["base_window"]
+    pairs = [(pos[k], prices[k], pos[k + 1], prices[k + 1]) for k in range(len(pos) - 1)
+             if kinds[k] == 1 and kinds[k + 1] == -1 and pos[k] >= start]
+    if not pairs:
+        return None
+
+    top = max(range(len(pairs)), key=lambda k: (pairs[k][1], -k))
+    pairs = pairs[top:]
+    depths = [(ph - tl) / ph for _, ph, _, tl in pairs]
+
+    k = len(depths) - 1
+    while k > 0 and depths[k] < depths[k - 1]:
+        k -= 1
+    run = pairs[k:]
+    run_depths = depths[k:]
+    pivot_pos, pivot_price = run[-1][0], run[-1][1]
+
+    return {
+        "base_start": int(pairs[0][0]),
+        "base_high": float(pairs[0][1]),
+        "contractions": len(run),
+        "depths": [round(float(d) * 100, 1) for d in run_depths],
+        "first_depth": float(run_depths[0]),
+        "final_depth": float(run_depths[-1]),
+        "pivot_pos": int(pivot_pos),
+        "pivot_price": float(pivot_price),
+    }
+
+
+def _is_vcp(base: dict, volume_ratio, tightness, p: dict) -> bool:
+    if base is None:
+        return False
+    # Indices carry no volume; skip the dry-up check rather than fail it
+    dry = volume_ratio is None or np.isnan(volume_ratio) or volume_ratio <= p["max_volume_ratio"]
+    return bool(base["contractions"] >= p["min_contractions"]
+                and base["first_depth"] <= p["max_base_depth"]
+                and base["final_depth"] <= p["max_final_depth"]
+                and tightness <= p["max_tightness"]
+                and dry)
+
+
+def _record(base: dict, dates, close_last, volume_ratio, tightness, p) -> dict:
+    base = dict(base)
+    base["base_start"] = dates[base["base_start"]]
+    base["pivot_date"] = dates[base.pop("pivot_pos")]
+    base["volume_ratio"] = None if volume_ratio is None or np.isnan(volume_ratio) else float(volume_ratio)
+    base["tightness"] = float(tightness)
+    base["pivot_distance"] = float(close_last / base["pivot_price"] - 1)
+    base["is_vcp"] = _is_vcp(base, volume_ratio, tightness, p)
+    return base
+
+
+def detect_base(df: pd.DataFrame, **params) -> dict:
+    """Base / VCP check on the last bar of one ticker's OHLCV frame. None if no base."""
+    p = {**VCP_DEFAULTS, **params}
+    if df is None or len(df) < p["tight_window"]:
+        return None
+    tail = df.iloc[-p["base_window"]:]
+    pos, kinds, prices = zigzag(tail['High'].to_numpy(), tail['Low'].to_numpy(), p["zigzag_pct"])
+    base = base_from_pivots(pos, kinds, prices, len(tail), **p)
+    if base is None:
+        return None
+
+    close_last = float(tail['Close'].iloc[-1])
+    recent = tail.iloc[-p["tight_window"]:]
+    tightness = (recent['High'].max() - recent['Low'].min()) / close_last
+    volume_ratio = None
+    if 'Volume' in df.columns:
+        vol = df['Volume'].iloc[-p["volume_long"]:].astype(float)
+        long_avg = vol.mean()
+        volume_ratio = vol.iloc[-p["volume_short"]:].mean() / long_avg if long_avg > 0 else None
+    return _record(base, tail.index, close_last, volume_ratio, tightness, p)
+
+
+def base_to_json(base: dict) -> dict:
+    """JSON-safe copy (dates as ISO strings) for analysis results and the API."""
+    if base is None:
+        return None
+    return {k: (v.date().isoformat() if isinstance(v, pd.Timestamp) else v) for k, v in base.items()}
+
+
+def describe_base(base: dict) -> str:
+    """'3 contractions (24.1% > 11.3% > 4.8%), pivot 123.40'"""
+    depths = " > ".join(f"{d:g}%" for d in base["depths"])
+    return f"{base['contractions']} contractions ({depths}), pivot {base['pivot_price']:.2f}"
+
+
+def detect_bases(panel: dict, **params) -> pd.DataFrame:
+    """
+    Base / VCP check on the last bar for every ticker of a price panel
+    ({'High','Low','Close'[, 'Volume']}: dates x tickers). One row per ticker with a base.
+    """
+    p = {**VCP_DEFAULTS, **params}
+    close = panel["Close"].iloc[-p["base_window"]:]
+    if close.empty:
+        return pd.DataFrame()
+    high = panel.get("High", panel["Close"]).reindex_like(close)
+    low = panel.get("Low", panel["Close"]).reindex_like(close)
+
+    # Tightness and volume dry-up for all tickers at once
+    last_close = close.ffill().iloc[-1]
+    recent_hi = high.iloc[-p["tight_window"]:].max()
+    recent_lo = low.iloc[-p["tight_window"]:].min()
+    tightness = (recent_hi - recent_lo) / last_close
+    if "Volume" in panel:
+        vol = panel["Volume"].reindex(columns=close.columns).iloc[-p["volume_long"]:].astype(float)
+        long_avg = vol.mean()
+        volume_ratio = (vol.iloc[-p["volume_short"]:].mean() / long_avg.where(long_avg > 0))
+    else:
+        volume_ratio = pd.Series(np.nan, index=close.columns)
+
+    piv = zigzag_panel(high.to_numpy(dtype=float), low.to_numpy(dtype=float), p["zigzag_pct"])
+    hi_arr, lo_arr = high.to_numpy(dtype=float), low.to_numpy(dtype=float)
+
+    # Pivots grouped by ticker in one pass: nonzero over the transposed matrix is ticker-major
+    cols, rows = np.nonzero(piv.T)
+    bounds = np.searchsorted(cols, np.arange(len(close.columns) + 1))
+    n = len(close)
+
+    records = []
+    for j, ticker in enumerate(close.columns):
+        r = rows[bounds[j]:bounds[j + 1]]
+        if len(r) < 2:
+            continue
+        kinds = piv[r, j].astype(int)
+        prices = np.where(kinds > 0, hi_arr[r, j], lo_arr[r, j])
+        base = base_from_pivots(r, kinds, prices, n, **p)
+        if base is None:
+            continue
+        rec = _record(base, close.index, float(last_close[ticker]), volume_ratio[ticker], tightness[ticker], p)
+        rec["ticker"] = ticker
+        records.append(rec)
+
+    out = pd.DataFrame(records)
+    if not out.empty:
+        out["as_of"] = close.index[-1]
+        out = out.set_index("ticker")
+    return out
+
+
+# --- Persistence ---
+
+def update_bases(tickers: list = None, **params) -> int:
+    """Nightly: detect bases for the stored universe (market_data) and persist them. Returns rows written."""
+    from utils.data_loader import load_price_panel, BENCHMARK_TICKER
+    p = {**VCP_DEFAULTS, **params}
+
+    # Calendar days covering the base window plus the long volume average
+    days = int(max(p["base_window"], p["volume_long"]) * 1.6)
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+    panel = load_price_panel(tickers, start=start, fields=["High", "Low", "Close", "Volume"])
+    if not panel: return 0
+    panel = {k: v.drop(columns=[BENCHMARK_TICKER], errors="ignore") for k, v in panel.items()}
+
+    bases = detect_bases(panel, **p)
+    close = panel["Close"]
+    if close.empty: return 0
+    # Tickers that no longer have a base must lose that day's row too
+    return save_bases(bases, close.index[-1].date(), scanned=list(tickers) if tickers else None)
+
+
+def save_bases(bases: pd.DataFrame, as_of, scanned: list = None) -> int:
+    """
+    Replaces the scan of as_of: deletes that day's rows of the scanned tickers (every ticker
+    when scanned is None), then inserts the bases found. Returns rows written.
+    """
+    rows = [{
+        "ticker": t,
+        "as_of": r.as_of.date(),
+        "base_start": r.base_start.date(),
+        "base_high": r.base_high,
+        "pivot_date": r.pivot_date.date(),
+        "pivot_price": r.pivot_price,
+        "contractions": int(r.contractions),
+        "depths": ",".join(f"{d:g}" for d in r.depths),
+        "final_depth": r.final_depth,
+        "volume_ratio": None if pd.isna(r.volume_ratio) else float(r.volume_ratio),
+        "tightness": r.tightness,
+        "is_vcp": bool(r.is_vcp),
+    } for t, r in bases.iterrows()]
+
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return 0
+    try:
+        q = session.query(VCPBase).filter(VCPBase.as_of == as_of)
+        if scanned is not None:
+            q = q.filter(VCPBase.ticker.in_(scanned))
+        q.delete(synchronize_session=False)
+        if rows:
+            session.bulk_insert_mappings(VCPBase, rows)
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        print(f"VCP Base Save Error: {e}")
+        session.rollback()
+        return 0
+    finally:
+        db.close_session()
+
+
+def get_latest_bases(tickers: list = None, vcp_only: bool = False) -> dict:
+    """{ticker: base dict} from the most recent scan day."""
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return {}
+    try:
+        from sqlalchemy import func as sa_func
+        last = session.query(sa_func.max(VCPBase.as_of)).scalar()
+        if last is None: return {}
+        q = session.query(VCPBase).filter(VCPBase.as_of == last)
+        if tickers:
+            q = q.filter(VCPBase.ticker.in_(tickers))
+        if vcp_only:
+            q = q.filter(VCPBase.is_vcp.is_(True))
+        return {r.ticker: {
+            "as_of": r.as_of.isoformat(),
+            "base_start": r.base_start.isoformat() if r.base_start else None,
+            "pivot_date": r.pivot_date.isoformat() if r.pivot_date else None,
+            "pivot_price": r.pivot_price,
+            "contractions": r.contractions,
+            "depths": [float(d) for d in r.depths.split(",")] if r.depths else [],
+            "final_depth": r.final_depth,
+            "volume_ratio": r.volume_ratio,
+            "tightness": r.tightness,
+            "is_vcp": bool(r.is_vcp),
+        } for r in q.all()}
+    except Exception as e:
+        print(f"VCP Lookup Error: {e}")
+        return {}
+    finally:
+        db.close_session()
@@ -0,0 +1,94 @@
+"""
+Startup warm-up: the work the first requests after a deploy would otherwise do.
+
+  1. shared read-only state - symbol master, benchmark series;
+  2. portfolio tickers analyzed chart-less (bars synced, strategy results memoized, latest
+     prices known);
+  3. the watchlist snapshot (its tickers analyzed the same way, 52W/pivot levels loaded);
+  4. the dashboard snapshot;
+  5. the portfolios' NAV history, brought up to the last bar.
+Under a preloading server (gunicorn.conf.py, wsgi.py) this runs once in the master before
+workers fork, so every worker starts with it, shared copy-on-write.
+Warmup tracks progress so /readyz can answer 503 until the steps have run. Steps are
+best-effort: a failing one (e.g. provider down) is recorded and the rest still run.
+"""
+import datetime
+import threading
+from strategies.scan_jobs import resolve_tickers
+from utils.benchmark_service import get_benchmark_service
+from utils.symbol_master import get_symbol_index
+
+COLD, WARMING, READY = 'cold', 'warming', 'ready'
+
+
+class Warmup:
+
+    def __init__(self, manager, watchlist_service=None, tickers_loader=None, max_workers: int = None,
+                 dashboard=None, nav_engine=None):
+        self.manager = manager
+        self.watchlist_service = watchlist_service
+        self.dashboard = dashboard
+        self.nav_engine = nav_engine
+        self._tickers_loader = tickers_loader or (lambda: resolve_tickers("portfolio"))
+        self.max_workers = max_workers
+        self._state = {"status": COLD, "step": "", "done": 0, "total": 0, "errors": [],
+                       "started_at": None, "finished_at": None}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self._state["status"] == READY
+
+    def status(self) -> dict:
+        with self._lock:
+            return dict(self._state, errors=list(self._state["errors"]))
+
+    def steps(self) -> list:
+        steps = [("symbols", lambda: get_symbol_index()),
+                 ("benchmark", lambda: get_benchmark_service().refresh_all()),
+                 ("portfolio", self._warm_portfolio)]
+        if self.watchlist_service is not None:
+            steps.append(("watchlist", self.watchlist_service.refresh))
+        if self.dashboard is not None:
+            steps.append(("dashboard", self.dashboard.refresh))
+        if self.nav_engine is not None:
+            steps.append(("nav", lambda: self.nav_engine.series(None)))
+        return steps
+
+    def run(self) -> dict:
+        """Runs every step in the calling thread; returns the final status."""
+        self._update(status=WARMING, started_at=datetime.datetime.now(), finished_at=None, errors=[])
+        for name, step in self.steps():
+            self._update(step=name)
+            try:
+                step()
+            except Exception as e:
+                print(f"Warm-up step {name} failed: {e}")
+                with self._lock:
+                    self._state["errors"].append(f"{name}: {e}")
+        self._update(status=READY, step="", finished_at=datetime.datetime.now())
+        return self.status()
+
+    def start(self):
+        """Runs in a background thread (development server: serve while warming)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _warm_portfolio(self):
+        tickers = self._tickers_loader()
+        self._update(done=0, total=len(tickers))
+        batch = self.manager.iter_batch(tickers, backend="thread", max_workers=self.max_workers,
+                                        chart_options={"disabled": True})
+        try:
+            for done, _ in enumerate(batch, start=1):
+                self._update(done=done)
+        finally:
+            batch.close()
+
+    def _update(self, **values):
+        with self._lock:
+            self._state.update(values)
@@ -0,0 +1,383 @@
+"""
+Watchlist engine: precomputed rows for the watchlist page.
+
+All tickers are analyzed in parallel (StrategyManager.iter_batch, chart-less - strategy results
+are memoized per bar), and the 52W high / pivot come from one High/Close panel query instead of
+a history load per ticker. Rows are published as an immutable snapshot; the page only reads it.
+The snapshot is rebuilt when the watchlist changes, and in the background once a new bar is due.
+
+Adds are validated locally (utils.ticker_validation); a ticker without stored bars is added as
+'pending' and fetched by WatchlistVerifier, and joins the snapshot once it turns 'active'.
+"""
+import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from utils.data_loader import load_price_panel, fetch_stock_data
+from utils.db import get_db
+from utils.market_calendar import IST, next_bar_due
+from utils.ticker_validation import INVALID, classify, is_listed
+
+NEAR_HIGH = 0.95          # within 5% of the 52W high -> momentum target
+MOMENTUM_TARGET = 1.20    # pivot + 20%
+PIVOT_BARS = 20           # pivot = highest high of the last 20 bars
+YEAR_DAYS = 365
+
+# After a refresh that brought no new bar (holiday), wait this long before trying again
+MIN_RETRY = datetime.timedelta(minutes=15)
+
+MINERVINI = 'Minervini Trend Template'
+
+# Watchlist row states
+ACTIVE, PENDING, INVALID_STATUS = 'active', 'pending', 'invalid'
+
+VERIFY_WORKERS = 4
+
+
+def load_watchlist_tickers() -> list:
+    """Active tickers (the ones with data to analyze)."""
+    from models import Watchlist
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return []
+    try:
+        return [t for (t,) in session.query(Watchlist.ticker).filter(Watchlist.status == ACTIVE).all()]
+    finally:
+        db.close_session()
+
+def load_watchlist_pending() -> dict:
+    """{ticker: status} for rows not active yet (pending data) or found invalid."""
+    from models import Watchlist
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return {}
+    try:
+        rows = session.query(Watchlist.ticker, Watchlist.status).filter(Watchlist.status != ACTIVE)
+        return {t: status for t, status in rows.order_by(Watchlist.created_at).all()}
+    finally:
+        db.close_session()
+
+def add_to_watchlist(tickers: list) -> dict:
+    """
+    Bulk add of resolved tickers, validated locally (no download) - one lookup query and one
+    insert for the whole list. Returns {"added", "existing", "pending", "rejected"}; "pending"
+    are the tickers the caller should hand to WatchlistVerifier.
+    """
+    from models import Watchlist
+    ready, pending, rejected = classify(tickers)
+    accepted = ready + pending
+    out = {"added": [], "existing": [], "pending": [], "rejected": rejected}
+    if not accepted:
+        return out
+    ready_set = set(ready)
+
+    db = get_db()
+    session = db.get_db_session()
+    try:
+        rows = {r.ticker: r for r in session.query(Watchlist).filter(Watchlist.ticker.in_(accepted)).all()}
+        for t in accepted:
+            status = ACTIVE if t in ready_set else PENDING
+            row = rows.get(t)
+            if row is None:
+                session.add(Watchlist(ticker=t, status=status))
+                out["added"].append(t)
+            else:
+                # Rows not active yet are re-evaluated (bars may have arrived, negative cache expired)
+                if row.status != ACTIVE:
+                    row.status = status
+                else:
+                    status = ACTIVE
+                out["existing"].append(t)
+            if status == PENDING:
+                out["pending"].append(t)
+        session.commit()
+        return out
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        db.close_session()
+
+def set_watchlist_status(ticker: str, status: str) -> bool:
+    from models import Watchlist
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return False
+    try:
+        n = session.query(Watchlist).filter(Watchlist.ticker == ticker, Watchlist.status != status) \
+            .update({"status": status}, synchronize_session=False)
+        session.commit()
+        return bool(n)
+    finally:
+        db.close_session()
+
+def price_levels(panel: dict) -> dict:
+    """
+    {ticker: {"high_52", "pivot", "close", "as_of"}} from a High/Close panel (dates x tickers)
+    covering the last year. Vectorized across tickers; each ticker's own last bars are used.
+    """
+    high, close = panel.get("High"), panel.get("Close")
+    if high is None or close is None or high.empty:
+        return {}
+    # Bars counted from each ticker's own last valid bar (calendars/listing dates differ)
+    valid = high.notna()
+    from_end = valid[::-1].cumsum()[::-1]
+    pivot = high.where(valid & (from_end <= PIVOT_BARS)).max()
+    high_52 = high.max()
+    last_close = close.ffill().iloc[-1]
+    last_date = close.apply(lambda s: s.last_valid_index())
+
+    out = {}
+    for t in high.columns:
+        if pd.isna(high_52[t]) or pd.isna(last_close[t]):
+            continue
+        out[t] = {
+            "high_52": float(high_52[t]),
+            "pivot": float(pivot[t]),
+            "close": float(last_close[t]),
+            "as_of": last_date[t],
+        }
+    return out
+
+def upside(status: str, levels: dict):
+    """(upside html, css class) - target is pivot+20% near highs, else the 52W high."""
+    if not levels:
+        return "N/A", "text-gray-500"
+    if status != 'PASS':
+        return "-", "text-gray-600"
+
+    current, high_52 = levels["close"], levels["high_52"]
+    if current >= high_52 * NEAR_HIGH:
+        target = levels["pivot"] * MOMENTUM_TARGET
+        target_label = "Momentum (Pivot+20%)"
+    else:
+        target = high_52
+        target_label = "Resistance (52W High)"
+
+    css = "text-gray-500"
+    if target > current:
+        txt = f"+{(target - current) / current * 100:.1f}%"
+        css = "text-green-400"
+    elif target == current:
+        txt = "0%"
+    else:
+        txt = "Blue Sky"
+        css = "text-blue-400"
+    return f"{txt} <span class='text-xs text-gray-500 block'>{target_label}</span>", css
+
+def watchlist_row(ticker: str, analysis: dict, levels: dict = None, rs: dict = None, base: dict = None) -> dict:
+    """One watchlist table row from the ticker's analysis, price levels, RS rating and base."""
+    analysis = analysis or {}
+    min_res = analysis.get('strategies', {}).get(MINERVINI, {})
+    status = min_res.get('status', 'FAIL')
+
+    # Action & Momentum Health
+    if status == 'PASS':
+        health, health_class = "Strong Buy", "text-green-400"
+        action, action_class = "BUY", "bg-green-600 text-white"
+    else:
+        health, health_class = "Weak", "text-red-400"
+        action, action_class = "AVOID", "bg-red-600 text-white"
+
+    upside_txt, upside_class = upside(status, levels)
+    rating = (rs or {}).get('rating')
+    base = base or min_res.get('base')
+    return {
+        "ticker": ticker,
+        "price": analysis.get('price', 0),
+        "rs_rating": rating,
+        "rs_class": "text-green-400" if rating is not None and rating >= 70 else "text-gray-500",
+        "base": base,
+        "base_class": "text-green-400" if base and base.get('is_vcp') else "text-gray-500",
+        "health": health,
+        "health_class": health_class,
+        "action": action,
+        "action_class": action_class,
+        "upside": upside_txt,
+        "upside_class": upside_class,
+    }
+
+
+class WatchlistSnapshot:
+    """Immutable set of computed rows (watchlist order); shared by readers without locks."""
+    __slots__ = ("rows", "tickers", "as_of", "built_at")
+
+    def __init__(self, rows, tickers, as_of=None, built_at=None):
+        object.__setattr__(self, "rows", tuple(rows))
+        object.__setattr__(self, "tickers", tuple(tickers))
+        object.__setattr__(self, "as_of", as_of)
+        object.__setattr__(self, "built_at", built_at or datetime.datetime.now(IST))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("WatchlistSnapshot is immutable")
+
+
+class WatchlistService:
+    """
+    Computes and caches the watchlist snapshot.
+    get(): current snapshot; rebuilt synchronously when the watchlist itself changed, in the
+    background when a new bar is due (readers keep the previous snapshot meanwhile).
+    """
+
+    def __init__(self, manager, tickers_loader=load_watchlist_tickers, max_workers: int = None):
+        self.manager = manager
+        self._tickers_loader = tickers_loader
+        self.max_workers = max_workers
+        self._snapshot = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def get(self) -> WatchlistSnapshot:
+        tickers = self._tickers_loader()
+        snap = self._snapshot
+        if snap is None or set(snap.tickers) != set(tickers):
+            return self.refresh(tickers)
+        if self._is_stale(snap):
+            self.refresh_async()
+        return snap
+
+    def refresh(self, tickers: list = None) -> WatchlistSnapshot:
+        with self._lock:
+            tickers = list(self._tickers_loader() if tickers is None else tickers)
+            snap = self._build(tickers)
+            self._snapshot = snap
+            self._checked = datetime.datetime.now(IST)
+            return snap
+
+    def refresh_async(self):
+        """Rebuild in a background thread (one at a time)."""
+        if self._refreshing.is_set():
+            return
+        self._refreshing.set()
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Watchlist refresh failed: {e}")
+            finally:
+                self._refreshing.clear()
+        threading.Thread(target=run, daemon=True).start()
+
+    def _build(self, tickers: list) -> WatchlistSnapshot:
+        if not tickers:
+            return WatchlistSnapshot([], [])
+
+        # Analyses first: they sync each ticker's bars, so the panel below is current
+        analyses = dict(self.manager.iter_batch(tickers, backend="thread", max_workers=self.max_workers,
+                                                chart_options={"disabled": True}))
+
+        from strategies.rs_rating import get_latest_rs
+        from strategies.vcp import get_latest_bases
+        rs_map = get_latest_rs(tickers)
+        # Bases from the nightly VCP scan (scripts/update_vcp_bases.py)
+        base_map = get_latest_bases(tickers)
+        start = datetime.date.today() - datetime.timedelta(days=YEAR_DAYS)
+        levels = price_levels(load_price_panel(tickers, start=start, fields=["High", "Close"]))
+
+        rows = []
+        for t in tickers:
+            try:
+                rows.append(watchlist_row(t, analyses.get(t), levels.get(t), rs_map.get(t), base_map.get(t)))
+            except Exception as e:
+                print(f"Error processing {t}: {e}")
+        dates = [lv["as_of"] for lv in levels.values() if lv["as_of"] is not None]
+        return WatchlistSnapshot(rows, tickers, as_of=max(dates) if dates else None)
+
+    def _is_stale(self, snap: WatchlistSnapshot, now: datetime.datetime = None) -> bool:
+        now = now or datetime.datetime.now(IST)
+        if self._checked is not None and now - self._checked < MIN_RETRY:
+            return False
+        if snap.as_of is None:
+            return True
+        return now >= next_bar_due(snap.as_of)
+
+
+class WatchlistVerifier:
+    """
+    Fetches history for pending watchlist tickers off the request thread (VERIFY_WORKERS at a
+    time) and settles their status:
+      - bars downloaded -> 'active' (stored in market_data, so the snapshot picks it up);
+      - nothing, and not in the exchange lists -> 'invalid' + negative cache;
+      - nothing for a listed symbol (new listing, provider lag) -> stays 'pending', retried
+        after MIN_RETRY.
+    """
+
+    def __init__(self, max_workers: int = VERIFY_WORKERS, fetch=None):
+        self.max_workers = max_workers
+        self._fetch = fetch or (lambda t: fetch_stock_data(t, period="5y", bars=1, columns=["Close"]))
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._attempted = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, tickers: list, now: datetime.datetime = None) -> list:
+        """Queues tickers not already queued or tried within MIN_RETRY; returns those queued."""
+        now = now or datetime.datetime.now()
+        added = []
+        with self._lock:
+            for t in tickers:
+                last = self._attempted.get(t)
+                if t in self._queued or (last is not None and now - last < MIN_RETRY):
+                    continue
+                self._queued.add(t)
+                self._queue.put(t)
+                added.append(t)
+            if added and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._loop, name="watchlist-verify", daemon=True)
+                self._thread.start()
+        return added
+
+    def enqueue_pending(self) -> list:
+        """Picks up pending rows (e.g. left by a previous process)."""
+        return self.enqueue([t for t, status in load_watchlist_pending().items() if status == PENDING])
+
+    def verify(self, ticker: str) -> str:
+        """Fetches ticker's bars and stores its resulting status."""
+        with self._lock:
+            self._attempted[ticker] = datetime.datetime.now()
+        try:
+            df = self._fetch(ticker)
+        except Exception as e:
+            print(f"Watchlist verify failed for {ticker}: {e}")
+            df = None
+        if df is not None and not df.empty:
+            status = ACTIVE
+            INVALID.discard(ticker)
+        elif not is_listed(ticker):
+            status = INVALID_STATUS
+            INVALID.add(ticker, f"Invalid or delisted ticker: {ticker}")
+        else:
+            status = PENDING
+        set_watchlist_status(ticker, status)
+        return status
+
+    def _loop(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=5)]
+                except queue.Empty:
+                    with self._lock:
+                        if self._queue.empty():
+                            self._thread = None
+                            return
+                    continue
+                while len(batch) < self.max_workers * 4:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                for ticker, _ in zip(batch, pool.map(self._safe_verify, batch)):
+                    with self._lock:
+                        self._queued.discard(ticker)
+
+    def _safe_verify(self, ticker):
+        try:
+            return self.verify(ticker)
+        except Exception as e:
+            print(f"Watchlist verify failed for {ticker}: {e}")
+            return None
@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+class SqliteDb:
+    """
+    get_db() stand-in: one in-memory SQLite database shared across sessions/threads,
+    with the tables of the given models. Patch it in: patch.object(module, 'get_db', db).
+    """
+    def __init__(self, *models):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        for model in models:
+            model.__table__.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def __call__(self):
+        return _Conn(self.Session())
+
+class _Conn:
+    def __init__(self, session):
+        self.session = session
+
+    def get_db_session(self):
+        return self.session
+
+    def close_session(self):
+        self.session.close()
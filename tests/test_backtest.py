@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import pandas as pd
+from strategies.backtest import (trend_template_conditions, trend_template_mask, extract_trades,
+                                 backtest_trend_template, max_drawdown, CONDITION_NAMES)
+from strategies.minervini import MinerviniStrategy
+
+def _frame(close, dates):
+    df = pd.DataFrame(index=dates)
+    df['Close'] = close
+    df['Open'] = df['Close']
+    df['High'] = df['Close'] + 1
+    df['Low'] = df['Close'] - 1
+    return df
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = pd.date_range(start="2020-01-01", periods=400)
+        # Uptrend, then a sharp fall
+        up = [10 + 2 * i for i in range(350)]
+        down = [up[-1] - 15 * i for i in range(1, 51)]
+        self.stock = _frame(up + down, self.dates)
+
+    def test_last_bar_matches_strategy(self):
+        """Vectorized conditions on the last bar agree with MinerviniStrategy.analyze."""
+        rng = np.random.default_rng(7)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, 400)))
+        df = _frame(close, self.dates)
+        for end in (300, 350, 400):
+            part = df.iloc[:end]
+            conds = trend_template_conditions(part['Close'])
+            passed = sum(bool(conds[n].iloc[-1]) for n in CONDITION_NAMES)
+            res = MinerviniStrategy().analyze("T", part)
+            self.assertEqual(f"{passed}/8", res['score'])
+
+    def test_panel_matches_single_series(self):
+        panel = pd.DataFrame({'A': self.stock['Close'], 'B': self.stock['Close'][::-1].to_numpy()})
+        mask = trend_template_mask(panel)
+        single = trend_template_mask(self.stock['Close'])
+        pd.testing.assert_series_equal(mask['A'], single, check_names=False)
+
+    def test_stop_exit(self):
+        n = 10
+        close = np.array([100, 101, 102, 103, 104, 90, 91, 92, 93, 94], dtype=float)
+        signal = np.zeros(n, dtype=bool)
+        signal[1] = True
+        sma50 = np.zeros(n)  # never triggers
+        trades = extract_trades("T", self.dates[:n], close, close + 1, close - 1, close, signal, sma50)
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0]['exit_reason'], 'STOP')
+        # Gapped through the stop -> filled at the open
+        self.assertEqual(trades[0]['exit_price'], 90)
+
+    def test_backtest_uptrend_then_crash(self):
+        panel = {k: self.stock[[k]].rename(columns={k: 'TEST'}) for k in ['Open', 'High', 'Low', 'Close']}
+        res = backtest_trend_template(panel)
+        trades = res['trades']
+        self.assertEqual(len(trades), 1)
+        self.assertGreater(trades.iloc[0]['return_pct'], 0)
+        self.assertEqual(res['stats']['hit_rate'], 100.0)
+        self.assertLess(res['stats']['max_drawdown'], 0)
+
+    def test_max_drawdown(self):
+        eq = pd.Series([1.0, 1.2, 0.9, 1.1])
+        self.assertAlmostEqual(max_drawdown(eq), -25.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import threading
+import time
+import datetime
+import numpy as np
+import pandas as pd
+from utils.benchmark_service import BenchmarkSnapshot, BenchmarkService, next_bar_due, IST
+
+class TestBenchmarkService(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = pd.bdate_range(start="2024-01-01", periods=300)
+        self.bench = pd.DataFrame({'Close': np.linspace(100, 130, 300)}, index=self.dates)
+
+    def test_align_same_calendar_is_range(self):
+        snap = BenchmarkSnapshot("^NSEI", self.bench)
+        pos = snap.align(self.dates[50:250])
+        np.testing.assert_array_equal(pos, np.arange(50, 250))
+
+    def test_align_with_gaps_matches_intersection(self):
+        snap = BenchmarkSnapshot("^NSEI", self.bench)
+        # Stock suspended for a week and traded one extra session the index didn't
+        idx = self.dates[10:200].delete(range(40, 45)).append(pd.DatetimeIndex(["2030-01-05"]))
+        stock = pd.DataFrame({'Close': np.arange(len(idx), dtype=float)}, index=idx)
+
+        s, b = snap.aligned_close(stock)
+        common = stock.index.intersection(self.bench.index)
+        self.assertTrue(s.index.equals(common))
+        np.testing.assert_array_equal(b.to_numpy(), self.bench.loc[common, 'Close'].to_numpy())
+
+    def test_snapshot_is_immutable(self):
+        snap = BenchmarkSnapshot("^NSEI", self.bench)
+        with self.assertRaises(AttributeError):
+            snap.close = None
+        with self.assertRaises(ValueError):
+            snap.close[0] = 0.0
+
+    def test_next_bar_due_skips_weekend(self):
+        friday = pd.Timestamp("2024-06-07")
+        due = next_bar_due(friday)
+        self.assertEqual(due.date(), datetime.date(2024, 6, 10))
+        self.assertEqual(due.tzinfo, IST)
+
+    def test_concurrent_stale_reads_refresh_once(self):
+        calls = []
+        def loader(ticker):
+            calls.append(ticker)
+            time.sleep(0.05)
+            return self.bench
+
+        svc = BenchmarkService(tickers=["^NSEI"], loader=loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(svc.get("^NSEI"))) for _ in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_failed_refresh_keeps_previous_snapshot(self):
+        frames = [self.bench, None]
+        svc = BenchmarkService(tickers=["^NSEI"], loader=lambda t: frames.pop(0))
+        first = svc.refresh("^NSEI")
+        self.assertIs(svc.refresh("^NSEI"), first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import pandas as pd
+from utils.chart_encoding import lttb_indices, downsample, slice_range, encode_dates
+from utils.visualization import create_minervini_figure
+
+class TestChartEncoding(unittest.TestCase):
+
+    def setUp(self):
+        dates = pd.date_range(start="2020-01-01", periods=1200, freq="B")
+        close = 100 + np.cumsum(np.sin(np.arange(1200) / 15.0))
+        self.data = pd.DataFrame(index=dates)
+        self.data['Close'] = close
+        self.data['Open'] = close
+        self.data['High'] = close + 1
+        self.data['Low'] = close - 1
+
+    def test_lttb_keeps_endpoints_and_size(self):
+        idx = lttb_indices(self.data['Close'].to_numpy(), 100)
+        self.assertEqual(len(idx), 100)
+        self.assertEqual(idx[0], 0)
+        self.assertEqual(idx[-1], len(self.data) - 1)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+
+    def test_lttb_keeps_spike(self):
+        y = np.zeros(1000)
+        y[537] = 50
+        idx = lttb_indices(y, 50)
+        self.assertIn(537, idx)
+
+    def test_downsample_preserves_ohlc_range(self):
+        out = downsample(self.data, 200)
+        self.assertEqual(len(out), 200)
+        self.assertAlmostEqual(out['High'].max(), self.data['High'].max())
+        self.assertAlmostEqual(out['Low'].min(), self.data['Low'].min())
+
+    def test_slice_range(self):
+        self.assertEqual(len(slice_range(self.data, "2021-01-01:2021-01-31")), 21)
+        self.assertLess(len(slice_range(self.data, "6mo")), 140)
+        self.assertEqual(len(slice_range(self.data, "garbage")), len(self.data))
+
+    def test_encode_dates_epoch_ms(self):
+        ms = encode_dates(self.data.index[:1])
+        self.assertEqual(ms[0], pd.Timestamp("2020-01-01").value // 10**6)
+
+    def test_figure_uses_binary_arrays(self):
+        fig = create_minervini_figure("TEST", self.data.copy(), max_points=300)
+        payload = fig.to_json()
+        self.assertIn('"bdata"', payload)
+        self.assertEqual(len(fig.data[0].x), 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import datetime
+import threading
+import unittest
+from strategies.dashboard import DashboardService
+from strategies.portfolio_manager import PortfolioManager
+
+class _FakePortfolios:
+    def __init__(self):
+        self.builds = 0
+        self.built = threading.Event()
+
+    def get_all_portfolios_summary(self):
+        self.builds += 1
+        return [{"id": 1, "name": "Main", "pnl": self.builds}]
+
+    def get_dashboard_metrics(self):
+        self.built.set()
+        return {"breadth": {"total": self.builds}}
+
+class TestDashboardService(unittest.TestCase):
+
+    def setUp(self):
+        self.pm = _FakePortfolios()
+        self.svc = DashboardService(self.pm, refresh_every=datetime.timedelta(hours=1),
+                                    min_interval=datetime.timedelta(0))
+
+    def test_get_serves_snapshot(self):
+        snap = self.svc.get()
+        self.assertEqual(snap.portfolios[0]["pnl"], 1)
+        for _ in range(5):
+            self.assertIs(self.svc.get(), snap)
+        self.assertEqual(self.pm.builds, 1)
+        with self.assertRaises(AttributeError):
+            snap.metrics = {}
+
+    def test_invalidate_rebuilds_in_background(self):
+        first = self.svc.get()
+        self.pm.built.clear()
+        self.svc.invalidate("holding", "A.NS")
+        self.assertTrue(self.pm.built.wait(5))
+        for _ in range(100):
+            if self.svc.get() is not first:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.svc.get().metrics["breadth"]["total"], 2)
+
+    def test_portfolio_manager_notifies_listeners(self):
+        events = []
+        pm = PortfolioManager()
+        pm.listeners.append(lambda event, ticker: events.append((event, ticker)))
+        pm.listeners.append(lambda event, ticker: 1 / 0)  # a failing listener is isolated
+        pm._changed("analysis", "A.NS")
+        self.assertEqual(events, [("analysis", "A.NS")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import datetime
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+import app as app_mod
+from utils import http_cache
+from utils.market_calendar import IST
+
+BAR = datetime.date(2024, 6, 14)  # a Friday
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app_mod.app.test_client()
+        self.calls = 0
+        http_cache.BODIES = http_cache.BodyCache()
+
+        def analyze(ticker, chart_options=None, mode="full", bar_date=None):
+            self.calls += 1
+            return {"ticker": ticker, "price": 1.0, "chart": "x" * 5000}
+        for p in (patch.object(app_mod.manager, 'analyze_ticker', analyze),
+                  patch.object(app_mod.manager, 'result_tag', lambda *a, **k: ("tag1", BAR)),
+                  patch.object(app_mod.portfolio_mgr, 'save_analysis', lambda *a: None)):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_etag_304_and_compression(self):
+        resp = self.client.get('/analyze_ticker?ticker=TCS', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(resp.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(resp.headers['ETag'], 'W/"tag1"')
+        self.assertIn('Accept-Encoding', resp.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(resp.get_data()))["ticker"], "TCS.NS")
+
+        again = self.client.get('/analyze_ticker?ticker=TCS', headers={"If-None-Match": 'W/"tag1"'})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.calls, 1)
+
+    def test_repeat_served_from_encoded_body(self):
+        first = self.client.get('/analyze_ticker?ticker=TCS', headers={"Accept-Encoding": "gzip"})
+        second = self.client.get('/analyze_ticker?ticker=TCS', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers['Content-Encoding'], 'gzip')
+
+    def test_identity_when_not_accepted(self):
+        resp = self.client.get('/analyze_ticker?ticker=TCS', headers={"Accept-Encoding": "identity"})
+        self.assertNotIn('Content-Encoding', resp.headers)
+        self.assertEqual(resp.get_json()["ticker"], "TCS.NS")
+
+    def test_cache_control_follows_calendar(self):
+        friday_eve = datetime.datetime(2024, 6, 14, 18, 0, tzinfo=IST)
+        # Next bar: Monday 15:45
+        self.assertEqual(http_cache.max_age(BAR, now=friday_eve), int((2 * 24 + 21.75) * 3600))
+        monday_late = datetime.datetime(2024, 6, 17, 16, 0, tzinfo=IST)
+        self.assertEqual(http_cache.max_age(BAR, now=monday_late), 0)
+
+if __name__ == '__main__':
+    unittest.main()
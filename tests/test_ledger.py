@@ -0,0 +1,233 @@
+import datetime
+import random
+import threading
+import unittest
+from unittest.mock import patch
+import pandas as pd
+import strategies.ledger as ledger_mod
+import strategies.portfolio_manager as pm_mod
+from models import LedgerCheckpoint, MarketData, Portfolio, Portfolios, PortfolioTransaction
+from strategies.ledger import Ledger, LedgerState, apply_transactions, available
+from strategies.portfolio_manager import PortfolioManager
+from _sqlite_db import SqliteDb
+
+D0 = datetime.date(2020, 1, 1)
+
+def _txns(rows, start_id=1):
+    """rows: (ticker, type, qty, price, day offset)"""
+    return pd.DataFrame([{"id": start_id + i, "ticker": t, "transaction_type": k, "quantity": float(q),
+                          "price": float(p), "date": D0 + datetime.timedelta(days=d)}
+                         for i, (t, k, q, p, d) in enumerate(rows)])
+
+def _fifo_reference(txns):
+    """Trade-by-trade FIFO: {ticker: (open [(qty, price)], realized, unmatched)}"""
+    out = {}
+    for r in txns.itertuples():
+        lots, realized, unmatched = out.setdefault(r.ticker, ([], 0.0, 0.0))
+        if r.transaction_type == "BUY":
+            lots.append([r.quantity, r.price])
+        else:
+            left = r.quantity
+            while left > 1e-12 and lots:
+                take = min(left, lots[0][0])
+                realized += take * (r.price - lots[0][1])
+                lots[0][0] -= take
+                left -= take
+                if lots[0][0] <= 1e-12:
+                    lots.pop(0)
+            unmatched += left
+        out[r.ticker] = (lots, realized, unmatched)
+    return out
+
+class TestApplyTransactions(unittest.TestCase):
+
+    def test_fifo_realized_and_open_lots(self):
+        txns = _txns([("A", "BUY", 10, 100, 0), ("B", "BUY", 5, 20, 0), ("A", "BUY", 10, 120, 1),
+                      ("A", "SELL", 15, 130, 2), ("B", "SELL", 8, 25, 3)])
+        lots, realized = apply_transactions(LedgerState().lots, txns)
+        # A: 10 @100 and 5 @120 sold at 130; 5 @120 left. B: 5 of 8 matched
+        self.assertAlmostEqual(realized.loc["A", "realized"], 10 * 30 + 5 * 10)
+        self.assertAlmostEqual(realized.loc["B", "realized"], 5 * 5)
+        self.assertAlmostEqual(realized.loc["B", "unmatched"], 3)
+        self.assertEqual(lots[["ticker", "quantity", "price", "txn_id"]].values.tolist(), [["A", 5.0, 120.0, 3]])
+
+    def test_matches_trade_by_trade_replay(self):
+        rng = random.Random(7)
+        rows, held = [], {}
+        for day in range(600):
+            t = rng.choice("ABCDEFG")
+            if held.get(t, 0) and rng.random() < 0.4:
+                q = rng.choice([held[t], rng.randint(1, held[t]), held[t] + 3])  # incl. oversells
+                held[t] = max(0, held[t] - q)
+                rows.append((t, "SELL", q, rng.uniform(50, 150), day))
+            else:
+                q = rng.randint(1, 50)
+                held[t] = held.get(t, 0) + q
+                rows.append((t, "BUY", q, rng.uniform(50, 150), day))
+        txns = _txns(rows)
+        expected = _fifo_reference(txns)
+
+        # All at once, and incrementally in chunks
+        whole = LedgerState().apply(txns)
+        chunked = LedgerState()
+        for i in range(0, len(txns), 37):
+            chunked = chunked.apply(txns.iloc[i:i + 37])
+
+        for st in (whole, chunked):
+            for t, (lots, realized, unmatched) in expected.items():
+                got = st.lots[st.lots["ticker"] == t]
+                self.assertEqual([round(q, 6) for q in got["quantity"]], [round(q, 6) for q, _ in lots], t)
+                self.assertEqual(list(got["price"]), [p for _, p in lots], t)
+                if t in st.realized.index:
+                    self.assertAlmostEqual(st.realized.loc[t, "realized"], realized, places=6)
+                    self.assertAlmostEqual(st.realized.loc[t, "unmatched"], unmatched, places=6)
+            self.assertEqual((st.count, st.last_id), (len(txns), len(txns)))
+
+    def test_checkpoint_roundtrip(self):
+        st = LedgerState().apply(_txns([("A", "BUY", 10, 100, 0), ("A", "SELL", 4, 110, 1)]))
+        back = LedgerState.from_json(st.to_json())
+        pd.testing.assert_frame_equal(back.lots, st.lots, check_dtype=False)
+        self.assertEqual(back.realized.loc["A"].tolist(), st.realized.loc["A"].tolist())
+
+    def test_available_for_backdated_sell(self):
+        txns = _txns([("A", "BUY", 10, 100, 0), ("A", "BUY", 10, 100, 5), ("A", "SELL", 15, 120, 6)])
+        self.assertEqual(available(txns, D0 + datetime.timedelta(days=2)), 5)   # 10 held, 5 after the later sell
+        self.assertEqual(available(txns, D0 + datetime.timedelta(days=5)), 5)
+        self.assertEqual(available(txns, D0 - datetime.timedelta(days=1)), 0)
+        self.assertEqual(available(txns.iloc[:2], D0 + datetime.timedelta(days=2)), 10)
+
+class TestLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SqliteDb(Portfolios, Portfolio, PortfolioTransaction, LedgerCheckpoint, MarketData)
+        for mod in (ledger_mod, pm_mod):
+            patcher = patch.object(mod, 'get_db', self.db)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        session = self.db.Session()
+        session.add(Portfolios(id=1, name="Main"))
+        session.commit()
+        session.close()
+
+    def _add(self, rows, pid=1):
+        session = self.db.Session()
+        for t, k, q, p, d in rows:
+            session.add(PortfolioTransaction(portfolio_id=pid, ticker=t, transaction_type=k, quantity=q, price=p,
+                                             date=D0 + datetime.timedelta(days=d)))
+        session.commit()
+        session.close()
+
+    def test_incremental_with_checkpoints(self):
+        self._add([("A.NS", "BUY", 10, 100, i) for i in range(5)])
+        ledger = Ledger(checkpoint_every=5)
+        self.assertEqual(ledger.state(1).count, 5)
+        session = self.db.Session()
+        self.assertEqual(session.get(LedgerCheckpoint, 1).txn_count, 5)
+        session.close()
+
+        # A new process resumes from the checkpoint and fetches only what came after it
+        self._add([("A.NS", "SELL", 15, 120, 10)])
+        fresh = Ledger(checkpoint_every=5)
+        with patch.object(Ledger, '_fetch', wraps=Ledger._fetch) as fetch:
+            st = fresh.state(1)
+        self.assertEqual(len(fetch.call_args[0][2].lots), 5)  # started from the checkpointed lots
+        self.assertAlmostEqual(st.realized.loc["A.NS", "realized"], 15 * 20)
+        self.assertAlmostEqual(st.lots["quantity"].sum(), 35)
+
+    def test_backdated_transaction_replays(self):
+        self._add([("A.NS", "BUY", 10, 100, 0), ("A.NS", "BUY", 10, 200, 5)])
+        ledger = Ledger(checkpoint_every=1)
+        ledger.state(1)
+        # A buy dated before the last applied one changes the FIFO order
+        self._add([("A.NS", "BUY", 10, 50, 1), ("A.NS", "SELL", 20, 210, 6)])
+        st = ledger.state(1)
+        self.assertAlmostEqual(st.realized.loc["A.NS", "realized"], 10 * 110 + 10 * 160)
+        self.assertEqual(st.lots["price"].tolist(), [200.0])
+        rebuilt = Ledger().rebuild(1)
+        pd.testing.assert_frame_equal(rebuilt.lots, st.lots)
+
+    def test_positions_with_prices(self):
+        self._add([("A.NS", "BUY", 10, 100, 0), ("A.NS", "SELL", 10, 90, 1), ("B.NS", "BUY", 4, 50, 0)])
+        session = self.db.Session()
+        session.add_all([MarketData(ticker="B.NS", date=D0, close_price=60),
+                         MarketData(ticker="B.NS", date=D0 + datetime.timedelta(days=1), close_price=70)])
+        session.commit()
+        session.close()
+        pos = Ledger().positions(1)
+        self.assertEqual(pos.loc["A.NS", "quantity"], 0)
+        self.assertAlmostEqual(pos.loc["A.NS", "realized"], -100)
+        self.assertEqual((pos.loc["B.NS", "price"], pos.loc["B.NS", "unrealized"]), (70.0, 80.0))
+
+    def test_sell_stock(self):
+        mgr = PortfolioManager()
+        mgr.add_stock("A", 10, 100, 1, purchase_date="2024-01-01")
+        mgr.add_stock("A", 10, 200, 1, purchase_date="2024-02-01")
+        ok, msg = mgr.sell_stock("A", 15, 180, 1, sell_date="2024-03-01")
+        self.assertTrue(ok, msg)
+        self.assertIn("+700.00", msg)
+        session = self.db.Session()
+        row = session.query(Portfolio).filter_by(ticker="A.NS").one()
+        self.assertEqual((float(row.quantity), float(row.avg_price)), (5.0, 200.0))
+        session.close()
+
+        self.assertEqual(mgr.sell_stock("A", 6, 180, 1)[0], False)
+        self.assertTrue(mgr.sell_stock("A", 5, 180, 1)[0])
+        session = self.db.Session()
+        self.assertIsNone(session.query(Portfolio).filter_by(ticker="A.NS").first())
+        session.close()
+        ledger = mgr.get_ledger(1)
+        self.assertAlmostEqual(ledger["totals"]["realized"], 700 - 100)
+
+    def test_backdated_sell_checks_shares_held_then(self):
+        mgr = PortfolioManager()
+        mgr.add_stock("A", 10, 100, 1, purchase_date="2024-01-01")
+        mgr.add_stock("A", 10, 200, 1, purchase_date="2024-03-01")
+        # Only the first lot was held on Feb 1
+        ok, msg = mgr.sell_stock("A", 15, 150, 1, sell_date="2024-02-01")
+        self.assertFalse(ok)
+        self.assertIn("Only 10 shares", msg)
+        ok, msg = mgr.sell_stock("A", 10, 150, 1, sell_date="2024-02-01")
+        self.assertTrue(ok, msg)
+        self.assertIn("+500.00", msg)
+        session = self.db.Session()
+        row = session.query(Portfolio).filter_by(ticker="A.NS").one()
+        self.assertEqual((float(row.quantity), float(row.avg_price)), (10.0, 200.0))
+        session.close()
+
+    def test_concurrent_sells_do_not_oversell(self):
+        mgr = PortfolioManager()
+        mgr.add_stock("A", 10, 100, 1, purchase_date="2024-01-01")
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(mgr.sell_stock("A", 10, 110, 1)[0]))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(results), [False, False, False, True])
+
+    def test_edits_and_removals_keep_the_ledger(self):
+        mgr = PortfolioManager()
+        mgr.add_stock("A", 10, 100, 1, purchase_date="2024-01-01")
+        # Tracked by the ledger: no in-place edit
+        self.assertFalse(mgr.update_stock("A.NS", 20, 90, 1))
+        session = self.db.Session()
+        # A legacy holding without transactions is still edited in place
+        session.add(Portfolio(portfolio_id=1, ticker="B.NS", quantity=5, avg_price=50))
+        session.commit()
+        session.close()
+        self.assertTrue(mgr.update_stock("B.NS", 6, 55, 1))
+
+        # Removal deletes the holding and its history; no trade is invented
+        mgr.add_stock("C", 4, 10, 1, purchase_date="2024-01-01")
+        self.assertTrue(mgr.remove_stock("A.NS", 1))
+        session = self.db.Session()
+        self.assertIsNone(session.query(Portfolio).filter_by(ticker="A.NS").first())
+        self.assertEqual(session.query(PortfolioTransaction).filter_by(ticker="A.NS").count(), 0)
+        self.assertEqual(session.query(PortfolioTransaction).filter_by(transaction_type="SELL").count(), 0)
+        session.close()
+        positions = {p["ticker"] for p in mgr.get_ledger(1)["positions"]}
+        self.assertEqual(positions, {"C.NS"})
+
+if __name__ == '__main__':
+    unittest.main()
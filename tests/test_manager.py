@@ -0,0 +1,148 @@
+import unittest
+import multiprocessing
+import pandas as pd
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+import strategies.manager as manager_mod
+import utils.data_loader as data_loader
+from strategies.manager import StrategyManager
+
+def _fake_fetch(ticker, period="5y", bars=None, columns=None, sync=True):
+    if ticker == "BAD":
+        return None
+    dates = pd.date_range(start="2020-01-01", periods=300)
+    df = pd.DataFrame(index=dates)
+    df['Close'] = [10 + i for i in range(300)]
+    df['Open'] = df['Close']
+    df['High'] = df['Close'] + 1
+    df['Low'] = df['Close'] - 1
+    return df
+
+class TestAnalyzeBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.mgr = StrategyManager()
+        # Minervini only: keeps the test offline
+        self.mgr.strategies = self.mgr.strategies[:1]
+        # No database: bar-date lookups answer None instead of connecting
+        patcher = patch.object(data_loader, 'get_db', lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(manager_mod, 'fetch_stock_data', _fake_fetch)
+    def test_thread_backend_keeps_order(self):
+        res = self.mgr.analyze_batch(["A", "BAD", "C"], backend="thread")
+        self.assertEqual([r['ticker'] for r in res], ["A", "BAD", "C"])
+        self.assertEqual(res[1]['error'], "Data Not Found")
+        self.assertEqual(res[0]['summary']['strategies_passed'], "1/1")
+
+    @patch.object(manager_mod, 'fetch_stock_data', _fake_fetch)
+    def test_iter_batch_streams_all(self):
+        seen = dict(self.mgr.iter_batch(["A", "B", "C", "D"], backend="thread", max_workers=2))
+        self.assertEqual(set(seen), {"A", "B", "C", "D"})
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "patched fetch only reaches forked workers")
+    @patch.object(manager_mod, 'fetch_stock_data', _fake_fetch)
+    def test_process_backend(self):
+        with patch.object(manager_mod, 'StrategyManager', _MinerviniOnlyManager):
+            res = self.mgr.analyze_batch(["A", "B", "C"], backend="process", max_workers=2, chunksize=1)
+        self.assertEqual([r['ticker'] for r in res], ["A", "B", "C"])
+        self.assertTrue(all(r['summary']['bullish'] for r in res))
+
+    def test_process_failure_fails_only_its_chunks(self):
+        class BrokenPool:
+            """A worker dies on the chunk holding "X"; the pool refuses work after that."""
+            def __init__(self, **kwargs):
+                self.broken = False
+            def submit(self, fn, chunk, *args):
+                if self.broken:
+                    raise BrokenProcessPool("pool is broken")
+                fut = Future()
+                if "X" in chunk:
+                    self.broken = True
+                    fut.set_exception(BrokenProcessPool("worker died"))
+                else:
+                    fut.set_result([(t, {"ticker": t}) for t in chunk])
+                return fut
+            def shutdown(self, **kwargs):
+                pass
+        with patch.object(manager_mod, 'ProcessPoolExecutor', BrokenPool):
+            seen = dict(self.mgr.iter_batch(["A", "B", "X", "C", "D"], backend="process", max_workers=1,
+                                            chunksize=2))
+        self.assertEqual(seen["A"], {"ticker": "A"})
+        self.assertEqual(seen["X"]["error"], "worker died")
+        self.assertEqual(seen["C"]["error"], "worker died")
+        self.assertEqual(seen["D"]["error"], "pool is broken")
+
+    def test_in_flight_work_is_bounded(self):
+        submitted = []
+        def submit(item):
+            submitted.append(item)
+            fut = Future()
+            fut.set_result(item)
+            return fut
+        gen = manager_mod._bounded(submit, range(100), limit=3)
+        first = next(gen)[1]
+        self.assertEqual(len(submitted), 4)  # 3 in flight + 1 refill after the first completed
+        rest = [item for _, item in gen]
+        self.assertEqual(sorted([first] + rest), list(range(100)))
+
+    def test_subset_shares_cache(self):
+        sub = self.mgr.subset(["Minervini Trend Template"])
+        self.assertIs(sub.results, self.mgr.results)
+        with self.assertRaises(ValueError):
+            self.mgr.subset(["Nope"])
+
+class TestDataRequirements(unittest.TestCase):
+
+    def test_union_and_chart_window(self):
+        mgr = StrategyManager()
+        req = mgr.data_requirements({"disabled": True})
+        self.assertTrue(req["benchmark"])
+        self.assertIn("High", req["columns"])
+        # Minervini reads Volume for the VCP dry-up check
+        self.assertIn("Volume", req["columns"])
+        # Minervini (52W + RSI warm-up) dominates Dual Momentum's 252
+        self.assertEqual(req["lookback_bars"], mgr.strategies[0].data_requirements["lookback_bars"])
+        # Full-history chart by default, bounded window for shorthand ranges
+        self.assertIsNone(mgr.data_requirements()["lookback_bars"])
+        self.assertGreater(mgr.data_requirements({"date_range": "1y"})["lookback_bars"], req["lookback_bars"])
+        # The window starts with a full RS-line SMA (Dual Momentum's 252-bar average), not just SMA-200
+        six_months = mgr.data_requirements({"date_range": "6mo"})["lookback_bars"]
+        self.assertGreaterEqual(six_months, 126 + 252)
+        year = mgr.data_requirements({"date_range": "1y"})["lookback_bars"]
+        minervini_only = mgr.data_requirements({"date_range": "1y"}, strategies=mgr.strategies[:1])
+        self.assertEqual(year - minervini_only["lookback_bars"], mgr.strategies[1].chart_warmup_bars - 200)
+
+    def test_manager_loads_only_lookback(self):
+        calls = []
+        def fetch(ticker, period="5y", bars=None, columns=None, sync=True):
+            calls.append((bars, columns))
+            return _fake_fetch(ticker).iloc[-bars:] if bars else _fake_fetch(ticker)
+        mgr = _MinerviniOnlyManager()
+        with patch.object(manager_mod, 'fetch_stock_data', fetch), patch.object(data_loader, 'get_db', lambda: None):
+            res = mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(calls[0][0], mgr.strategies[0].data_requirements["lookback_bars"])
+        self.assertIsNone(res['strategies']['Minervini Trend Template']['chart_json'])
+        self.assertEqual(res['summary']['strategies_passed'], "1/1")
+
+    def test_bar_date_from_tag_skips_second_sync(self):
+        syncs = []
+        def fetch(ticker, period="5y", bars=None, columns=None, sync=True):
+            syncs.append(sync)
+            return _fake_fetch(ticker)
+        def latest(ticker):
+            raise AssertionError("synced twice")
+        mgr = _MinerviniOnlyManager()
+        with patch.object(manager_mod, 'fetch_stock_data', fetch), patch.object(manager_mod, 'latest_bar_date', latest):
+            mgr.analyze_ticker("A", chart_options={"disabled": True}, bar_date=pd.Timestamp("2020-10-26").date())
+        self.assertEqual(syncs, [False])
+
+class _MinerviniOnlyManager(StrategyManager):
+    def __init__(self):
+        super().__init__()
+        self.strategies = self.strategies[:1]
+
+if __name__ == '__main__':
+    unittest.main()
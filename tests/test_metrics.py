@@ -0,0 +1,76 @@
+import json
+import tempfile
+import unittest
+from sqlalchemy import create_engine, text
+from utils import metrics
+from utils.metrics import Counter, Histogram, Registry
+
+class TestRegistry(unittest.TestCase):
+
+    def test_exposition_format(self):
+        reg = Registry()
+        c = Counter("jobs_total", "Jobs.", ("kind",), registry=reg)
+        h = Histogram("job_seconds", "Job time.", ("kind",), buckets=(0.1, 1.0), registry=reg)
+        c.inc(kind='a"b')
+        c.inc(2, kind='a"b')
+        for v in (0.05, 0.1, 0.5, 3.0):
+            h.observe(v, kind="x")
+        lines = reg.exposition().splitlines()
+        self.assertIn("# TYPE wealthlab_jobs_total counter", lines)
+        self.assertIn('wealthlab_jobs_total{kind="a\\"b"} 3.0', lines)
+        # Buckets are cumulative, "le" inclusive
+        self.assertIn('wealthlab_job_seconds_bucket{kind="x",le="0.1"} 2', lines)
+        self.assertIn('wealthlab_job_seconds_bucket{kind="x",le="1.0"} 3', lines)
+        self.assertIn('wealthlab_job_seconds_bucket{kind="x",le="+Inf"} 4', lines)
+        self.assertIn('wealthlab_job_seconds_count{kind="x"} 4', lines)
+        self.assertIn('wealthlab_job_seconds_sum{kind="x"} 3.65', lines)
+
+    def test_workers_merge_through_directory(self):
+        with tempfile.TemporaryDirectory() as d:
+            workers = []
+            for _ in range(2):
+                reg = Registry(d)
+                reg._flusher_pid = -1  # no background thread in the test
+                workers.append((reg, Counter("hits_total", "Hits.", ("route",), registry=reg),
+                                Histogram("t_seconds", "T.", buckets=(1.0,), registry=reg)))
+            (r1, c1, h1), (r2, c2, h2) = workers
+            c1.inc(route="/")
+            c2.inc(4, route="/")
+            h1.observe(0.5)
+            h2.observe(2.0)
+            r2.flush(name="other")
+            merged = r1.collect()
+            self.assertEqual(merged["wealthlab_hits_total"][json.dumps(["/"])], 5.0)
+            self.assertEqual(merged["wealthlab_t_seconds"][json.dumps([])], [[1, 1], 2.5])
+
+    def test_reset_after_fork_drops_parent_values(self):
+        reg = Registry()
+        c = Counter("n_total", "N.", registry=reg)
+        c.inc()
+        reg.reset()
+        self.assertEqual(c.state(), {})
+
+class TestInstrumentation(unittest.TestCase):
+
+    def _count(self, metric, **labels):
+        entry = metric.state().get(metric._key(labels))
+        return 0 if entry is None else sum(entry[0])
+
+    def test_engine_statements_timed(self):
+        engine = create_engine("sqlite://")
+        metrics.instrument_engine(engine)
+        before = self._count(metrics.DB_SECONDS, operation="SELECT")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.assertEqual(self._count(metrics.DB_SECONDS, operation="SELECT"), before + 1)
+
+    def test_routes_timed_and_exposed(self):
+        import app as app_mod
+        client = app_mod.app.test_client()
+        client.get('/healthz')
+        body = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('wealthlab_http_request_duration_seconds_count{endpoint="healthz",method="GET",status="200"}', body)
+        self.assertIn("# TYPE wealthlab_cache_lookups_total counter", body)
+
+if __name__ == '__main__':
+    unittest.main()
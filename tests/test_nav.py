@@ -0,0 +1,132 @@
+import datetime
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import strategies.nav as nav_mod
+from models import MarketData, NavCheckpoint, NavHistory, Portfolio, Portfolios, PortfolioTransaction
+from strategies.nav import NavEngine, compute_nav, with_returns
+from _sqlite_db import SqliteDb
+
+def _day(n):
+    return datetime.date(2024, 1, 1) + datetime.timedelta(days=n)
+
+def _flows(rows):
+    """rows: (ticker, day, signed qty, price)"""
+    return pd.DataFrame([(t, _day(d), float(q), float(p)) for t, d, q, p in rows],
+                        columns=["ticker", "date", "quantity", "price"])
+
+def _closes(days, **series):
+    return pd.DataFrame(series, index=pd.to_datetime([_day(d) for d in days]), dtype=float)
+
+class TestComputeNav(unittest.TestCase):
+
+    def test_nav_cash_flows_and_returns(self):
+        flows = _flows([("A", 0, 10, 100), ("B", 2, 5, 40), ("A", 3, -5, 130)])  # day 2 has no bar
+        closes = _closes([0, 1, 3, 4], A=[100, 110, 130, 120], B=[np.nan, np.nan, 50, 60])
+        rows, state = compute_nav(flows, closes)
+        # B settles on day 3 (next bar); A's sale is a -650 flow
+        self.assertEqual(rows["nav"].tolist(), [1000, 1100, 5 * 130 + 5 * 50, 5 * 120 + 5 * 60])
+        self.assertEqual(rows["cash_flow"].tolist(), [1000, 0, 200 - 650, 0])
+        self.assertAlmostEqual(rows["ret"].iloc[1], 0.10)
+        self.assertAlmostEqual(rows["ret"].iloc[2], (900 + 450) / 1100 - 1)
+        self.assertEqual((state.last_date, state.quantities, state.nav), (_day(4), {"A": 5.0, "B": 5.0}, 900.0))
+
+    def test_oversell_flow_counts_shares_held(self):
+        flows = _flows([("A", 0, 10, 100), ("A", 1, -15, 120), ("A", 2, 5, 130)])
+        rows, _ = compute_nav(flows, _closes(range(3), A=[100, 120, 130]))
+        self.assertEqual(rows["nav"].tolist(), [1000, 0, 650])
+        self.assertEqual(rows["cash_flow"].tolist(), [1000, -1200, 650])
+        self.assertAlmostEqual(rows["ret"].iloc[1], 0.2)  # not a -100% day
+
+    def test_deposits_do_not_move_twr(self):
+        flows = _flows([("A", 0, 10, 100), ("A", 2, 90, 100)])
+        rows, _ = compute_nav(flows, _closes(range(4), A=[100, 100, 100, 100]))
+        self.assertEqual(with_returns(rows)["twr"].tolist(), [0, 0, 0, 0])
+
+    def test_appending_days_matches_full_run(self):
+        rng = np.random.default_rng(3)
+        days = [d for d in range(120) if d % 7 not in (5, 6)]
+        closes = _closes(days, **{t: 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days)))) for t in "ABCD"})
+        closes.iloc[10:20, 2] = np.nan  # missing bars
+        flows = _flows([(t, int(d), q, 100) for t, d, q in
+                        zip(rng.choice(list("ABCD"), 40), rng.integers(0, 119, 40), rng.integers(-20, 50, 40))])
+        flows = flows.sort_values("date", kind="stable")
+
+        whole, _ = compute_nav(flows, closes)
+        parts, state = [], None
+        for start in range(0, len(closes), 11):
+            rows, state = compute_nav(flows, closes.iloc[start:start + 11], state)
+            parts.append(rows)
+        pd.testing.assert_frame_equal(pd.concat(parts), whole)
+        dd = with_returns(whole)["drawdown"]
+        self.assertTrue((dd <= 1e-12).all())
+
+class TestNavEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SqliteDb(Portfolios, Portfolio, PortfolioTransaction, MarketData, NavHistory, NavCheckpoint)
+        patcher = patch.object(nav_mod, 'get_db', self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._add(Portfolios(id=1, name="Main"), Portfolios(id=2, name="Other"),
+                  PortfolioTransaction(portfolio_id=1, ticker="A.NS", transaction_type="BUY", quantity=10,
+                                       price=100, date=_day(0)),
+                  # Held without a logged transaction: counts from its purchase date
+                  Portfolio(portfolio_id=2, ticker="B.NS", quantity=2, avg_price=50, purchase_date=_day(1)),
+                  *[MarketData(ticker=t, date=_day(d), close_price=p)
+                    for t, d, p in [("A.NS", 0, 100), ("A.NS", 1, 110), ("A.NS", 2, 121),
+                                    ("B.NS", 1, 50), ("B.NS", 2, 40)]])
+
+    def _add(self, *objs):
+        session = self.db.Session()
+        session.add_all(objs)
+        session.commit()
+        session.close()
+
+    def _stored(self, pid):
+        session = self.db.Session()
+        n = session.query(NavHistory).filter_by(portfolio_id=pid).count()
+        session.close()
+        return n
+
+    def test_builds_then_appends(self):
+        engine = NavEngine()
+        s = engine.series(1)
+        self.assertEqual(s["nav"].tolist(), [1000, 1100, 1210])
+        self.assertAlmostEqual(s["twr"].iloc[-1], 0.21)
+        self.assertEqual(self._stored(1), 3)
+
+        # A new bar: only that day is computed and stored (also by a fresh process)
+        self._add(MarketData(ticker="A.NS", date=_day(3), close_price=110))
+        with patch.object(NavEngine, '_closes', wraps=NavEngine._closes) as closes:
+            s = NavEngine().series(1)
+        self.assertEqual(closes.call_args[0][2:], (_day(2),))
+        self.assertEqual(closes.call_args[1], {"after": True})
+        self.assertEqual(s["nav"].tolist(), [1000, 1100, 1210, 1100])
+        self.assertAlmostEqual(s["drawdown"].iloc[-1], 1100 / 1210 - 1)
+        self.assertEqual(self._stored(1), 4)
+
+        # A backdated trade changes the flows: the portfolio is recomputed
+        self._add(PortfolioTransaction(portfolio_id=1, ticker="A.NS", transaction_type="SELL", quantity=5,
+                                       price=110, date=_day(1)))
+        s = engine.series(1)
+        self.assertEqual(s["nav"].tolist(), [1000, 550, 605, 550])
+        self.assertEqual(s["cash_flow"].tolist(), [1000, -550, 0, 0])
+        self.assertEqual(self._stored(1), 4)
+
+    def test_aggregate_and_endpoint(self):
+        total = NavEngine().series(None)
+        self.assertEqual(total["nav"].tolist(), [1000, 1100 + 100, 1210 + 80])
+        self.assertEqual(total["cash_flow"].tolist(), [1000, 100, 0])
+        self.assertAlmostEqual(total["ret"].iloc[2], 1290 / 1200 - 1)
+
+        import app as app_mod
+        with patch.object(app_mod, 'nav_engine', NavEngine()):
+            data = app_mod.app.test_client().get('/api/nav?pid=2').get_json()
+        self.assertEqual(data["dates"], ["2024-01-02", "2024-01-03"])
+        self.assertEqual(data["drawdown"], [0.0, -20.0])
+        self.assertEqual(data["summary"], {"nav": 80.0, "twr": -20.0, "max_drawdown": -20.0, "net_invested": 100.0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import datetime
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+import strategies.portfolio_manager as pm_mod
+from models import AnalysisCache, MarketData, Portfolio, Portfolios, StockDetails
+from strategies.portfolio_manager import PortfolioManager
+from _sqlite_db import SqliteDb
+
+class TestLoadPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SqliteDb(Portfolios, Portfolio, MarketData, AnalysisCache, StockDetails)
+        patcher = patch.object(pm_mod, 'get_db', self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        d1, d2 = datetime.date(2024, 1, 1), datetime.date(2024, 1, 2)
+        session = self.db.Session()
+        session.add_all([
+            Portfolios(id=1, name="Main"), Portfolios(id=2, name="Other"),
+            Portfolio(portfolio_id=1, ticker="A.NS", quantity=10, avg_price=100, purchase_date=d1),
+            Portfolio(portfolio_id=1, ticker="B.NS", quantity=5, avg_price=50),
+            Portfolio(portfolio_id=2, ticker="C.NS", quantity=1, avg_price=10),
+            MarketData(ticker="A.NS", date=d1, close_price=110), MarketData(ticker="A.NS", date=d2, close_price=120),
+            AnalysisCache(ticker="A.NS", strategy_name="combined",
+                          result_json={"passed": "3/4", "bullish": True, "bearish": False, "timestamp": "2024-01-02 16:00"}),
+            # Per-strategy result-cache rows and other tickers' summaries are not part of the page
+            AnalysisCache(ticker="A.NS", strategy_name="Minervini Trend Template", result_json={"status": "PASS"}),
+            AnalysisCache(ticker="Z.NS", strategy_name="combined", result_json={"bullish": True}),
+        ])
+        session.commit()
+        session.close()
+
+    def test_rows_with_latest_price_and_summary(self):
+        rows = {r["ticker"]: r for r in PortfolioManager().load_portfolio(portfolio_id=1)}
+        self.assertEqual(sorted(rows), ["A.NS", "B.NS"])
+        a, b = rows["A.NS"], rows["B.NS"]
+        self.assertEqual(a["current_price"], 120.0)
+        self.assertEqual(a["pnl"], 200.0)
+        self.assertEqual(a["purchase_date"], "2024-01-01")
+        self.assertEqual(a["analysis"], {"passed": "3/4", "bullish": True, "bearish": False,
+                                         "timestamp": "2024-01-02 16:00"})
+        # No bars / no analysis yet: cost basis as price, no badge
+        self.assertEqual(b["current_price"], 50.0)
+        self.assertNotIn("analysis", b)
+        self.assertEqual(len(PortfolioManager().load_portfolio(portfolio_id=None)), 3)
+
+    def test_lookups_use_primary_keys(self):
+        session = self.db.Session()
+        stmt = PortfolioManager._holdings_query(session, portfolio_id=1).statement
+        sql = str(stmt.compile(self.db.engine, compile_kwargs={"literal_binds": True}))
+        with self.db.engine.connect() as conn:
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+        session.close()
+        self.assertFalse([step for step in plan if step.startswith("SCAN")], plan)
+        self.assertTrue(any("analysis_cache USING INDEX" in step for step in plan), plan)
+
+class TestHoldingsPage(unittest.TestCase):
+
+    def setUp(self):
+        self.db = SqliteDb(Portfolios, Portfolio, MarketData, AnalysisCache, StockDetails)
+        patcher = patch.object(pm_mod, 'get_db', self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        d = datetime.date(2024, 1, 2)
+        session = self.db.Session()
+        session.add_all([Portfolios(id=1, name="Main"), Portfolios(id=2, name="Other")])
+        # 250 holdings (one ticker held in both portfolios); every 3rd at a loss, ties on value
+        for i in range(250):
+            ticker = f"T{i:03d}.NS"
+            session.add(Portfolio(portfolio_id=1 + i % 2, ticker=ticker, quantity=10, avg_price=100))
+            session.add(MarketData(ticker=ticker, date=d, close_price=90 if i % 3 == 0 else 100 + i % 7))
+            session.add(StockDetails(ticker=ticker, sector="Energy" if i % 5 == 0 else "IT"))
+        session.add(Portfolio(portfolio_id=2, ticker="T000.NS", quantity=1, avg_price=50))
+        session.add_all([
+            AnalysisCache(ticker="T001.NS", strategy_name="combined", result_json={"bullish": True, "bearish": False}),
+            AnalysisCache(ticker="T002.NS", strategy_name="combined", result_json={"bullish": False, "bearish": True}),
+            AnalysisCache(ticker="T003.NS", strategy_name="combined", result_json={"bullish": False, "bearish": False}),
+        ])
+        session.commit()
+        session.close()
+
+    def _all_pages(self, **kwargs):
+        mgr, rows, cursor, pages = PortfolioManager(), [], None, 0
+        while True:
+            page = mgr.holdings_page(limit=40, cursor=cursor, **kwargs)
+            rows += page["rows"]
+            pages += 1
+            cursor = page["next_cursor"]
+            if not cursor:
+                return rows, pages
+
+    def test_pages_cover_every_row_in_order(self):
+        for sort, order in (("value", "desc"), ("pnl_pct", "asc"), ("ticker", "asc"), ("pnl", "desc")):
+            rows, pages = self._all_pages(sort=sort, order=order)
+            keys = [(r["ticker"], r["portfolio_id"]) for r in rows]
+            self.assertEqual(len(keys), 251, sort)
+            self.assertEqual(len(set(keys)), 251, sort)
+            self.assertEqual(pages, 7)
+            field = {"value": "current_value", "ticker": "ticker"}.get(sort, sort)
+            values = [r[field] for r in rows]
+            self.assertEqual(values, sorted(values, reverse=order == "desc"), sort)
+
+    def test_filters_and_signal(self):
+        rows, _ = self._all_pages(sort="ticker", order="asc", portfolio_id=2, sector="Energy", pnl="loss")
+        self.assertTrue(rows)
+        for r in rows:
+            self.assertEqual((r["portfolio_id"], r["sector"]), (2, "Energy"))
+            self.assertLess(r["pnl"], 0)
+        signals = {r["ticker"]: r["signal"] for r in
+                   PortfolioManager().holdings_page(sort="ticker", order="asc", limit=6, search="t00")["rows"]}
+        self.assertEqual(signals, {"T000.NS": "none", "T001.NS": "bullish", "T002.NS": "bearish",
+                                   "T003.NS": "mixed", "T004.NS": "none"})
+        only = PortfolioManager().holdings_page(signal="bearish")["rows"]
+        self.assertEqual([r["ticker"] for r in only], ["T002.NS"])
+
+    def test_bad_requests(self):
+        mgr = PortfolioManager()
+        cursor = mgr.holdings_page(sort="value", limit=10)["next_cursor"]
+        for kwargs in ({"sort": "quantity"}, {"order": "sideways"}, {"signal": "maybe"},
+                       {"cursor": "not-a-cursor"}, {"sort": "ticker", "cursor": cursor}):
+            with self.assertRaises(ValueError, msg=kwargs):
+                mgr.holdings_page(**kwargs)
+
+    def test_totals_match_rows(self):
+        mgr = PortfolioManager()
+        rows, _ = self._all_pages(sort="value", order="desc", portfolio_id=1)
+        totals = mgr.holdings_totals(portfolio_id=1)
+        self.assertEqual(totals["stock_count"], len(rows))
+        self.assertAlmostEqual(totals["current_value"], sum(r["current_value"] for r in rows))
+        self.assertAlmostEqual(totals["total_pnl"], sum(r["pnl"] for r in rows))
+        self.assertEqual({s["label"]: s["count"] for s in totals["sectors"]}, {"IT": 100, "Energy": 25})
+        self.assertEqual(mgr.holdings_totals(portfolio_id=1, pnl="gain")["stock_count"],
+                         sum(1 for r in rows if r["pnl"] >= 0))
+
+    def test_endpoint(self):
+        import app as app_mod
+        client = app_mod.app.test_client()
+        first = client.get('/api/holdings?pid=2&sort=pnl&order=asc&limit=50').get_json()
+        self.assertEqual(len(first["rows"]), 50)
+        self.assertEqual(first["totals"]["stock_count"], 126)
+        second = client.get(f'/api/holdings?pid=2&sort=pnl&order=asc&limit=50&cursor={first["next_cursor"]}').get_json()
+        self.assertNotIn("totals", second)
+        self.assertGreaterEqual(second["rows"][0]["pnl"], first["rows"][-1]["pnl"])
+        self.assertEqual(client.get('/api/holdings?sort=bogus').get_json(), {"error": "Unknown sort: bogus desc"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import datetime
+import unittest
+import pandas as pd
+from unittest.mock import patch
+import strategies.manager as manager_mod
+import strategies.result_cache as result_cache
+from strategies.manager import StrategyManager
+from strategies.dual_momentum import DualMomentumStrategy
+from strategies.minervini import MinerviniStrategy
+from strategies.rs_rating import RSRatingStrategy
+from utils.benchmark_service import BenchmarkSnapshot
+
+def _frame(n=300):
+    dates = pd.date_range(start="2020-01-01", periods=n)
+    df = pd.DataFrame(index=dates)
+    df['Close'] = [10.0 + i for i in range(n)]
+    df['Open'] = df['Close']
+    df['High'] = df['Close'] + 1
+    df['Low'] = df['Close'] - 1
+    df['Volume'] = 1000.0
+    return df
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mgr = StrategyManager()
+        # Minervini (cacheable) + RS Rating (not cacheable, no history needed)
+        self.rs_calls = []
+        def lookup(t):
+            self.rs_calls.append(t)
+            return {"rating": 90, "raw_score": 1.0, "date": "2020-10-26"}
+        self.mgr.strategies = [MinerviniStrategy(), RSRatingStrategy(lookup=lookup)]
+        self.fetches = []
+        self.bar_date = datetime.date(2020, 10, 26)
+        patches = [
+            patch.object(manager_mod, 'fetch_stock_data', self._fetch),
+            patch.object(manager_mod, 'latest_bar_date', lambda t: self.bar_date),
+            patch.object(result_cache, 'load_persisted', lambda *a: {}),
+            patch.object(result_cache, 'save_persisted', lambda *a: None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _fetch(self, ticker, period="5y", bars=None, columns=None, sync=True):
+        self.fetches.append(bars)
+        return _frame()
+
+    def test_hit_skips_history_load(self):
+        first = self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        second = self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(first, second)
+        # Non-cacheable strategies still run (they need no history)
+        self.assertEqual(len(self.rs_calls), 2)
+
+    def test_screen_served_from_full_result(self):
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        res = self.mgr.analyze_ticker("A", mode="screen")
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(res['summary']['strategies_passed'], "2/2")
+
+    def test_chart_variants_are_separate(self):
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        res = self.mgr.analyze_ticker("A", chart_options={"date_range": "1y"})
+        self.assertEqual(len(self.fetches), 2)
+        self.assertIsNotNone(res['strategies']['Minervini Trend Template']['chart_json'])
+
+    def test_new_bar_invalidates(self):
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.bar_date = datetime.date(2020, 10, 27)
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_parameter_change_invalidates(self):
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.mgr.strategies[0] = MinerviniStrategy(rsi_min=60)
+        self.assertNotEqual(self.mgr.strategies[0].cache_version, MinerviniStrategy().cache_version)
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_dependency_change_invalidates(self):
+        import strategies.base as base
+        import strategies.rules as rules
+        version = MinerviniStrategy().cache_version
+        # e.g. an edited rule in strategies/rules.py
+        with patch.dict(base._SOURCE_DIGESTS, {rules: "edited"}):
+            self.assertNotEqual(MinerviniStrategy().cache_version, version)
+        self.assertEqual(MinerviniStrategy().cache_version, version)
+
+    def test_result_tag_tracks_inputs(self):
+        tag, bar = self.mgr.result_tag("A", chart_options={"disabled": True})
+        self.assertEqual(bar, self.bar_date)
+        self.assertEqual(self.mgr.result_tag("A", chart_options={"disabled": True})[0], tag)
+        self.assertNotEqual(self.mgr.result_tag("A", mode="screen")[0], tag)
+        # RS Rating's precomputed input changed (nightly job) - same bar, new tag
+        self.mgr.strategies[1].lookup = lambda t: {"rating": 91, "date": "2020-10-26"}
+        self.assertNotEqual(self.mgr.result_tag("A", chart_options={"disabled": True})[0], tag)
+        self.bar_date = None
+        self.assertIsNone(self.mgr.result_tag("A"))
+
+    def test_benchmark_bar_invalidates_dual_momentum(self):
+        bench = {"snap": BenchmarkSnapshot("^NSEI", _frame(299))}
+        dm = DualMomentumStrategy()
+        dm._get_benchmark = lambda: bench["snap"]
+        self.mgr.strategies = [dm]
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 1)
+        # The benchmark gained a bar: same stock bar, new key
+        bench["snap"] = BenchmarkSnapshot("^NSEI", _frame(300))
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_result_tag_tracks_benchmark(self):
+        bench = {"snap": BenchmarkSnapshot("^NSEI", _frame(299))}
+        dm = DualMomentumStrategy()
+        dm._get_benchmark = lambda: bench["snap"]
+        self.mgr.strategies = [dm]
+        tag = self.mgr.result_tag("A", chart_options={"disabled": True})[0]
+        self.assertEqual(self.mgr.result_tag("A", chart_options={"disabled": True})[0], tag)
+        bench["snap"] = BenchmarkSnapshot("^NSEI", _frame(300))
+        self.assertNotEqual(self.mgr.result_tag("A", chart_options={"disabled": True})[0], tag)
+
+    def test_missing_benchmark_is_not_cached(self):
+        dm = DualMomentumStrategy()
+        dm._get_benchmark = lambda: None
+        self.mgr.strategies = [dm]
+        res = self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(res['strategies'][dm.name]['status'], "N/A")
+        self.mgr.analyze_ticker("A", chart_options={"disabled": True})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_lru_bound_and_no_error_results(self):
+        cache = result_cache.ResultCache(maxsize=2)
+        strat = MinerviniStrategy()
+        for t in ("A", "B", "C"):
+            cache.put(t, self.bar_date, strat, "screen", 1.0, {"status": "PASS"})
+        cache.put("D", self.bar_date, strat, "screen", 1.0, {"status": "ERROR"})
+        self.assertIsNone(cache.get("A", self.bar_date, strat, "screen"))
+        self.assertIsNone(cache.get("D", self.bar_date, strat, "screen"))
+        self.assertEqual(cache.get("C", self.bar_date, strat, "screen"), (1.0, {"status": "PASS"}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import strategies.rs_rating as rs_mod
+import utils.data_loader as data_loader
+from models import RSHistory
+from strategies.rs_rating import weighted_roc, rank_to_rating, rs_rating_panel, RSRatingStrategy, update_rs_history
+from _sqlite_db import SqliteDb
+
+class TestRSRating(unittest.TestCase):
+
+    def setUp(self):
+        dates = pd.date_range(start="2020-01-01", periods=300)
+        growth = {'SLOW': 0.0005, 'MID': 0.001, 'FAST': 0.003, 'DOWN': -0.001}
+        self.close = pd.DataFrame({t: 100 * np.exp(g * np.arange(300)) for t, g in growth.items()}, index=dates)
+
+    def test_weighted_roc_matches_loop(self):
+        """Same numbers as the per-ticker loop in the testing/ screeners."""
+        raw = weighted_roc(self.close)
+        s = self.close['FAST']
+        roc = lambda d: (s.iloc[-1] - s.iloc[-1 - d]) / s.iloc[-1 - d] * 100
+        expected = 0.4 * roc(63) + 0.2 * roc(126) + 0.2 * roc(189) + 0.2 * roc(252)
+        self.assertAlmostEqual(raw['FAST'].iloc[-1], expected)
+
+    def test_ratings_rank_order(self):
+        _, rating = rs_rating_panel(self.close)
+        last = rating.iloc[-1]
+        self.assertEqual(last['FAST'], 99)
+        self.assertEqual(last['DOWN'], 1)
+        self.assertTrue(last['SLOW'] < last['MID'] < last['FAST'])
+        # Warm-up period has no rating
+        self.assertTrue(rating.iloc[:252].isna().all().all())
+
+    def test_missing_tickers_stay_nan(self):
+        raw = pd.DataFrame({'A': [1.0, 2.0], 'B': [np.nan, 1.0], 'C': [3.0, np.nan]})
+        rating = rank_to_rating(raw)
+        self.assertTrue(np.isnan(rating.loc[0, 'B']))
+        self.assertEqual(rating.loc[0, 'C'], 99)
+        self.assertEqual(rating.loc[0, 'A'], 1)
+
+    def test_strategy_pass_fail_and_missing(self):
+        ratings = {'GOOD': {"rating": 85, "raw_score": 40.0, "date": "2024-01-01"},
+                   'BAD': {"rating": 30, "raw_score": -5.0, "date": "2024-01-01"}}
+        strat = RSRatingStrategy(lookup=ratings.get)
+        self.assertEqual(strat.analyze('GOOD', None)['status'], 'PASS')
+        self.assertEqual(strat.analyze('BAD', None)['status'], 'FAIL')
+        self.assertEqual(strat.analyze('UNKNOWN', None)['status'], 'N/A')
+
+    def test_update_subset_ranks_against_universe(self):
+        db = SqliteDb(RSHistory)
+
+        loads = []
+        def load_price_panel(tickers, start=None, fields=None):
+            loads.append(tickers)
+            return {"Close": self.close}
+        with patch.object(rs_mod, 'get_db', db), patch.object(data_loader, 'load_price_panel', load_price_panel):
+            written = update_rs_history(tickers=["MID"])
+        self.assertEqual(loads, [None])
+        session = db.Session()
+        rows = session.query(RSHistory).all()
+        session.close()
+        self.assertEqual({r.ticker for r in rows}, {"MID"})
+        self.assertEqual(written, len(rows))
+        # Ranked among all four, not alone (which would make it 50 every day)
+        _, rating = rs_rating_panel(self.close)
+        last = max(rows, key=lambda r: r.date)
+        self.assertEqual(last.rs_rating, rating['MID'].iloc[-1])
+        self.assertNotEqual(last.rs_rating, 50)
+
+    def test_update_ignores_indices(self):
+        db = SqliteDb(RSHistory)
+        with_indices = self.close.assign(**{"^NSEI": self.close['MID'] * 2, "^BSESN": self.close['FAST'] * 3})
+        with patch.object(rs_mod, 'get_db', db), \
+                patch.object(data_loader, 'load_price_panel', lambda *a, **k: {"Close": with_indices}):
+            update_rs_history()
+        session = db.Session()
+        rows = session.query(RSHistory).all()
+        session.close()
+        self.assertEqual({r.ticker for r in rows}, set(self.close.columns))
+        _, rating = rs_rating_panel(self.close)
+        last = max(r.date for r in rows)
+        self.assertEqual({r.ticker: r.rs_rating for r in rows if r.date == last}, rating.iloc[-1].to_dict())
+
+if __name__ == '__main__':
+    unittest.main()
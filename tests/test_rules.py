@@ -0,0 +1,133 @@
+import unittest
+import numpy as np
+import pandas as pd
+import utils.technical_indicators as ta
+from strategies.rules import (parse, Evaluator, LastBarEvaluator, Rule, RuleSet, RuleStrategy, ScreenStats,
+                              lookback)
+from strategies.minervini import MinerviniStrategy
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        dates = pd.date_range(start="2020-01-01", periods=400)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, 400)))
+        self.df = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close}, index=dates)
+
+    def test_matches_hand_coded(self):
+        rules = RuleSet([Rule("trend", "close > sma(150) and sma(150) > sma(200)"),
+                         Rule("low", "close >= low_mult * lowest(260)")], {"low_mult": 1.3})
+        res = rules.evaluate(self.df)
+        c = self.df['Close']
+        expected = (c > ta.sma(c, 150)) & (ta.sma(c, 150) > ta.sma(c, 200))
+        pd.testing.assert_series_equal(res["trend"], expected, check_names=False)
+        pd.testing.assert_series_equal(res["low"], c >= 1.3 * c.rolling(260).min(), check_names=False)
+
+    def test_common_subexpressions_computed_once(self):
+        ev = Evaluator(self.df)
+        ev.value(parse("sma(200) > ref(sma(200), 20) and close > sma(200)"))
+        sma_nodes = [k for k in ev.cache if k[0] == "call" and k[1] == "sma"]
+        self.assertEqual(len(sma_nodes), 1)
+
+    def test_panel_matches_single(self):
+        panel = {"Close": pd.DataFrame({'A': self.df['Close'], 'B': self.df['Close'][::-1].to_numpy()})}
+        rules = RuleSet([Rule("r", "rsi() >= 50 and close > ema(20)")])
+        pd.testing.assert_series_equal(rules.mask(panel)['A'], rules.mask(self.df), check_names=False)
+
+    def test_reasons_generated(self):
+        df = self.df.copy()
+        df['Close'] = np.arange(1.0, 401.0)
+        rules = RuleSet.from_config({"up": {"rule": "close > sma(50) and close > sma(200)", "label": "Trend"},
+                                     "rsi": "rsi() < rsi_max"}, params={"rsi_max": 30})
+        out = {v["name"]: v for v in rules.explain(df)}
+        self.assertTrue(out["up"]["passed"])
+        self.assertEqual(out["up"]["reason"], "Trend: close (400.00) > sma(50) (375.50) and close (400.00) > sma(200) (300.50)")
+        self.assertFalse(out["rsi"]["passed"])
+        self.assertTrue(out["rsi"]["reason"].endswith(">= 30"))
+
+    def test_rule_formats(self):
+        df = self.df.copy()
+        df['Close'] = np.concatenate([np.arange(100.0, 300.0), np.arange(300.0, 100.0, -1)])
+        res = MinerviniStrategy().analyze("T", df, chart_options={"disabled": True})
+        self.assertEqual(res["status"], "FAIL")
+        self.assertIn("Price (101.00) below 150/200 SMA", res["details"])
+        self.assertIn("Too far from 52W High (300.00)", res["details"])
+        self.assertEqual(res["failed_rules"][0], "price_above_150_200")
+        self.assertEqual(MinerviniStrategy.RULES.labels["price_above_150_200"], "Price vs 150/200 SMA")
+        # Another wording over the same rules and values
+        out = MinerviniStrategy.RULES.explain(df, formats={"near_52w_high": (None, "High was {high:.0f}")},
+                                              **MinerviniStrategy.DEFAULT_PARAMS)
+        self.assertEqual({v["name"]: v["reason"] for v in out}["near_52w_high"], "High was 300")
+
+    def test_failed_and_lists_only_failing_parts(self):
+        df = self.df.copy()
+        df['Close'] = np.arange(400.0, 0.0, -1)
+        ev = Evaluator(df)
+        node = parse("close < sma(50) and close > sma(200)")
+        self.assertEqual(ev.reason(node, False), "close (1.00) <= sma(200) (100.50)")
+
+    def test_rejects_unsafe_syntax(self):
+        for bad in ("__import__('os')", "close.values", "foo(10)", "close in [1]", "x = 1"):
+            with self.assertRaises(ValueError):
+                parse(bad)
+
+    def test_lookback(self):
+        self.assertEqual(lookback(parse("sma(200) > ref(sma(200), n)"), {"n": 20}), 219)
+
+    def test_rule_strategy(self):
+        strat = RuleStrategy("Above 50", RuleSet([Rule("above", "close > sma(50)")]))
+        res = strat.analyze("T", self.df)
+        self.assertIn(res["status"], ("PASS", "FAIL"))
+        self.assertEqual(res["score"][-2:], "/1")
+        self.assertEqual(strat.data_requirements["lookback_bars"], 50)
+
+class TestScreening(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        dates = pd.date_range(start="2020-01-01", periods=400)
+        self.frames = []
+        for drift in (0.004, 0.001, -0.002):
+            close = 100 * np.exp(np.cumsum(rng.normal(drift, 0.01, 400)))
+            self.frames.append(pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close},
+                                            index=dates))
+
+    def test_last_bar_matches_vectorized(self):
+        rules = MinerviniStrategy.RULES
+        for df in self.frames:
+            full = rules.evaluate(df)
+            ev = LastBarEvaluator(df, rules.params)
+            for r in rules.rules:
+                self.assertEqual(bool(ev.value_at(r.node)), bool(full[r.name].iloc[-1]), r.name)
+
+    def test_screen_agrees_and_short_circuits(self):
+        stats = ScreenStats()
+        rules = MinerviniStrategy.RULES
+        for df in self.frames:
+            passed, failed, checked = rules.screen(df, stats=stats)
+            self.assertEqual(passed, bool(rules.mask(df).iloc[-1]))
+            if not passed:
+                self.assertFalse(rules.evaluate(df)[failed].iloc[-1])
+                self.assertLessEqual(checked, len(rules.rules))
+        snap = stats.snapshot()
+        self.assertEqual(snap["screens"], 3)
+        self.assertEqual(sum(r["rejected"] for r in snap["rules"].values()), 3 - snap["passed"])
+
+    def test_learned_order_prefers_selective_rules(self):
+        rules = [Rule("cheap_lax", "close > 0"), Rule("dear_strict", "close > sma(200)")]
+        stats = ScreenStats(min_samples=2)
+        for _ in range(2):
+            stats.record("cheap_lax", True, 1e-6)
+            stats.record("dear_strict", False, 5e-6)
+        self.assertEqual([r.name for r in stats.order(rules, {"cheap_lax": 1, "dear_strict": 200})],
+                         ["dear_strict", "cheap_lax"])
+
+    def test_strategy_screen(self):
+        strat = MinerviniStrategy()
+        for df in self.frames:
+            full = strat.analyze("T", df, chart_options={"disabled": True})
+            res = strat.screen("T", df)
+            self.assertEqual(res["status"], full["status"])
+
+if __name__ == '__main__':
+    unittest.main()
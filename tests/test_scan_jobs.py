@@ -0,0 +1,105 @@
+import datetime
+import unittest
+from unittest.mock import patch
+import strategies.scan_jobs as scan_mod
+from models import ScanJob, ScanResult
+from strategies.scan_jobs import ScanScheduler
+from _sqlite_db import SqliteDb
+
+class _FakeManager:
+    def __init__(self):
+        self.seen = []
+        self.on_item = None
+
+    def iter_batch(self, tickers, **kwargs):
+        for t in tickers:
+            self.seen.append(t)
+            if self.on_item:
+                self.on_item(t)
+            if t == "BAD":
+                yield t, {"ticker": t, "error": "Data Not Found", "results": {}}
+            else:
+                yield t, {"ticker": t, "price": 1.0, "summary": {"bullish": t.startswith("A")}}
+
+class TestScanJobs(unittest.TestCase):
+
+    def setUp(self):
+        db = SqliteDb(ScanJob, ScanResult)
+        for p in (patch.object(scan_mod, 'get_db', db), patch.object(scan_mod, 'FLUSH_EVERY', 1)):
+            p.start()
+            self.addCleanup(p.stop)
+        self.mgr = _FakeManager()
+        self.hooked = []
+        self.sched = ScanScheduler(self.mgr, on_result=lambda t, r: self.hooked.append(t))
+        # Run jobs synchronously in the test thread
+        self.sched._enqueue = lambda job_id: None
+
+    def test_run_persists_results_and_progress(self):
+        job = self.sched.submit("tickers", tickers=["a1", "B2", "BAD", "A3"])
+        self.assertEqual(job["status"], "queued")
+        self.sched.run(job["id"])
+        done = self.sched.get(job["id"])
+        self.assertEqual((done["status"], done["processed"], done["passed"], done["progress"]),
+                         ("completed", 4, 2, 100))
+        self.assertEqual([r["ticker"] for r in self.sched.results(job["id"], bullish=True)], ["A1", "A3"])
+        self.assertEqual(self.hooked, ["A1", "B2", "A3"])  # errors don't reach the hook
+
+    def test_failed_flush_is_retried(self):
+        calls = []
+        def jsonable(res):
+            calls.append(res["ticker"])
+            if len(calls) == 1:
+                raise RuntimeError("lost connection")
+            return res
+        job = self.sched.submit("tickers", tickers=["A1", "A2", "A3"])
+        with patch.object(scan_mod, 'jsonable', jsonable):
+            self.sched.run(job["id"])
+        done = self.sched.get(job["id"])
+        # A1's first write failed; it stayed buffered and was stored with the rest
+        self.assertEqual((done["status"], done["processed"]), ("completed", 3))
+
+    def test_unsaved_results_fail_the_job(self):
+        job = self.sched.submit("tickers", tickers=["A1", "A2"])
+        with patch.object(scan_mod, 'jsonable', side_effect=RuntimeError("disk full")):
+            self.sched.run(job["id"])
+        failed = self.sched.get(job["id"])
+        self.assertEqual((failed["status"], failed["processed"]), ("failed", 0))
+        self.assertTrue(self.sched.resume(job["id"]))
+        self.sched.run(job["id"])
+        self.assertEqual(self.sched.get(job["id"])["processed"], 2)
+
+    def test_cancel_then_resume_skips_done(self):
+        job = self.sched.submit("tickers", tickers=["T1", "T2", "T3", "T4", "T5"])
+        self.mgr.on_item = lambda t: t == "T3" and self.sched.cancel(job["id"])
+        self.sched.run(job["id"])
+        cancelled = self.sched.get(job["id"])
+        self.assertEqual(cancelled["status"], "cancelled")
+        self.assertLess(cancelled["processed"], 5)
+
+        self.mgr.on_item, self.mgr.seen = None, []
+        self.assertTrue(self.sched.resume(job["id"]))
+        self.sched.run(job["id"])
+        self.assertEqual(self.sched.get(job["id"])["status"], "completed")
+        self.assertEqual(self.sched.get(job["id"])["processed"], 5)
+        self.assertNotIn("T1", self.mgr.seen)
+
+    def test_claim_is_exclusive_and_stale_jobs_resume(self):
+        job = self.sched.submit("tickers", tickers=["T1"])
+        self.assertIsNotNone(self.sched._claim(job["id"]))
+        self.assertIsNone(self.sched._claim(job["id"]))  # already running elsewhere
+        self.assertEqual(self.sched.resume_interrupted(), [])
+
+        # Worker died: heartbeat went quiet
+        old = datetime.datetime.now() - scan_mod.STALE_AFTER * 2
+        session = scan_mod.get_db().get_db_session()
+        session.query(ScanJob).update({"heartbeat": old})
+        session.commit()
+        self.assertEqual(self.sched.resume_interrupted(), [job["id"]])
+        self.assertIsNotNone(self.sched._claim(job["id"]))
+
+    def test_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.sched.submit("everything")
+
+if __name__ == '__main__':
+    unittest.main()
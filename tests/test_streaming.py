@@ -0,0 +1,77 @@
+import json
+import unittest
+from unittest.mock import patch
+import app as app_mod
+
+def _fake_iter_batch(tickers, **kwargs):
+    # Completion order differs from request order
+    for t in reversed(tickers):
+        if t == "BAD.NS":
+            yield t, {"ticker": t, "error": "Data Not Found", "results": {}}
+        else:
+            yield t, {"ticker": t, "price": 1.0, "summary": {"strategies_passed": "1/1", "bullish": True}}
+
+def _events(body):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+class TestStreamAnalyze(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app_mod.app.test_client()
+        self.saved = []
+        for p in (patch.object(app_mod.manager, 'iter_batch', _fake_iter_batch),
+                  patch.object(app_mod.portfolio_mgr, 'save_analysis', lambda t, r: self.saved.append(t))):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_sse_streams_each_result(self):
+        resp = self.client.get('/api/stream/analyze?tickers=tcs,BAD,infy.ns')
+        self.assertEqual(resp.mimetype, 'text/event-stream')
+        events = _events(resp.get_data(as_text=True))
+        self.assertEqual(events[0], ("start", {"total": 3}))
+        self.assertEqual(events[-1], ("done", {"processed": 3}))
+        results = [d for e, d in events if e == "result"]
+        self.assertEqual([r["query"] for r in results], ["infy.ns", "BAD", "tcs"])
+        self.assertEqual(results[1]["error"], "Data Not Found")
+        self.assertEqual(self.saved, ["INFY.NS", "TCS.NS"])
+
+    def test_portfolio_id_is_validated(self):
+        resp = self.client.get('/api/stream/analyze?portfolio_id=abc')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("portfolio_id", resp.get_json()["error"])
+
+        import strategies.scan_jobs as scan_mod
+        asked = []
+        def resolve(kind, params):
+            asked.append(params["portfolio_id"])
+            return ["TCS.NS"]
+        with patch.object(scan_mod, 'resolve_tickers', resolve):
+            for pid in ("2", "all"):
+                self.assertEqual(self.client.get(f'/api/stream/analyze?portfolio_id={pid}').status_code, 200)
+        self.assertEqual(asked, [2, None])
+
+class TestBatchAnalyze(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app_mod.app.test_client()
+        p = patch.object(app_mod.manager, 'iter_batch', _fake_iter_batch)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_ndjson_with_field_selection(self):
+        resp = self.client.post('/api/analyze', json={"tickers": ["tcs", "BAD"], "fields": ["summary.bullish"]})
+        self.assertEqual(resp.mimetype, 'application/x-ndjson')
+        lines = [json.loads(l) for l in resp.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines, [{"ticker": "BAD.NS", "error": "Data Not Found"},
+                                 {"ticker": "TCS.NS", "summary": {"bullish": True}}])
+
+    def test_rejects_unknown_strategy(self):
+        resp = self.client.post('/api/analyze', json={"tickers": ["tcs"], "strategies": ["Nope"]})
+        self.assertIn("Unknown strategies", resp.get_json()["error"])
+
+if __name__ == '__main__':
+    unittest.main()
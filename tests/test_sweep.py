@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+import pandas as pd
+from strategies.sweep import grid, random_configs, walk_forward_segments, run_sweep
+
+class TestSweep(unittest.TestCase):
+
+    def test_grid(self):
+        cfgs = grid({"a": [1, 2], "b": [None, 3, 4]})
+        self.assertEqual(len(cfgs), 6)
+        self.assertIn({"a": 2, "b": None}, cfgs)
+
+    def test_random_configs(self):
+        cfgs = random_configs({"rsi_min": (40, 60), "low_mult": (1.1, 1.5), "x": [7]}, 20, seed=3)
+        self.assertEqual(len(cfgs), 20)
+        for c in cfgs:
+            self.assertIsInstance(c["rsi_min"], int)
+            self.assertTrue(1.1 <= c["low_mult"] <= 1.5)
+            self.assertEqual(c["x"], 7)
+
+    def test_segments_are_consecutive(self):
+        idx = pd.bdate_range("2018-01-01", periods=1000)
+        segs = walk_forward_segments(idx, folds=3)
+        self.assertEqual(len(segs), 4)
+        self.assertEqual(segs[0][0], idx[260])
+        self.assertEqual(segs[-1][1], idx[-1])
+
+    def test_run_sweep_shared_memory(self):
+        rng = np.random.default_rng(5)
+        close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, (900, 8)), axis=0)),
+                             index=pd.bdate_range("2018-01-01", periods=900))
+        panel = {"Close": close, "Open": close, "High": close * 1.01, "Low": close * 0.99}
+        cfgs = grid({"rsi_min": [40, 60], "dual_lookback": [None, 126]})
+        res = run_sweep(panel, cfgs, folds=2, max_workers=2)
+        self.assertEqual(len(res["ranking"]), 4)
+        self.assertEqual(len(res["walk_forward"]), 2)
+        scores = res["ranking"]["later_folds_sharpe"].tolist()
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+if __name__ == '__main__':
+    unittest.main()
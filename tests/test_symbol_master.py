@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+import unittest
+from utils.symbol_master import SymbolIndex, Symbol, load_symbols
+
+NSE_CSV = """SYMBOL,NAME OF COMPANY, SERIES, DATE OF LISTING, PAID UP VALUE, MARKET LOT, ISIN NUMBER, FACE VALUE
+RELIANCE,Reliance Industries Limited,EQ,29-NOV-1995,10,1,INE002A01018,10
+RELAXO,Relaxo Footwears Limited,EQ,15-FEB-2007,1,1,INE131B01039,1
+TCS,Tata Consultancy Services Limited,EQ,25-AUG-2004,1,1,INE467B01029,1
+TATASTEEL,Tata Steel Limited,EQ,08-NOV-1995,1,1,INE081A01020,1
+"""
+
+BSE_CSV = """Security Code,Issuer Name,Security Id,Security Name,Status,Group,Face Value,ISIN No,Industry,Instrument
+500325,Reliance Industries Ltd,RELIANCE,RELIANCE INDUSTRIES LTD.,Active,A,10.00,INE002A01018,Refineries,Equity
+500570,Tata Motors Ltd,TATAMOTORS,TATA MOTORS LTD.,Active,A,2.00,INE155A01022,Automobiles,Equity
+999999,Gone Ltd,GONE,GONE LTD.,Delisted,Z,1.00,INE999Z01011,Misc,Equity
+"""
+
+class TestSymbolMaster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        for name, body in (("EQUITY_L.csv", NSE_CSV), ("Equity.csv", BSE_CSV)):
+            with open(os.path.join(cls.tmp.name, name), "w") as f:
+                f.write(body)
+        cls.index = SymbolIndex(load_symbols(cls.tmp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_loads_both_exchanges(self):
+        self.assertEqual(self.index.get("tcs.ns").name, "Tata Consultancy Services Limited")
+        self.assertEqual(self.index.get("TATAMOTORS.BO").sector, "Automobiles")
+        self.assertIsNone(self.index.get("GONE.BO"))  # inactive scrips skipped
+        self.assertEqual(self.index.get("INE002A01018").ticker, "RELIANCE.NS")
+
+    def test_prefix_ranking(self):
+        self.assertEqual([s.ticker for s in self.index.search("rel")], ["RELAXO.NS", "RELIANCE.NS"])
+        self.assertEqual(self.index.search("TCS")[0].ticker, "TCS.NS")
+        # Name words, NSE/BSE duplicates collapsed by ISIN
+        self.assertEqual([s.ticker for s in self.index.search("tata")], ["TATAMOTORS.BO", "TATASTEEL.NS", "TCS.NS"])
+        self.assertEqual([s.ticker for s in self.index.search("industries")], ["RELIANCE.NS"])
+
+    def test_fuzzy_names(self):
+        self.assertEqual(self.index.search("consultncy")[0].ticker, "TCS.NS")
+        self.assertEqual(self.index.search("zz"), [])
+
+    def test_fallback_and_speed(self):
+        index = SymbolIndex(load_symbols(os.path.join(self.tmp.name, "missing")))
+        self.assertIsNotNone(index.get("RELIANCE.NS"))
+        big = SymbolIndex([Symbol(f"S{i:05d}.NS", f"S{i:05d}", f"Company {i} Limited", f"IN{i:010d}", "EQ", "", "NSE")
+                           for i in range(20000)])
+        start = time.perf_counter()
+        for _ in range(200):
+            big.search("s123")
+            big.search("co")  # prefix of every name: stops after `limit` hits
+        self.assertLess((time.perf_counter() - start) / 200, 0.002)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import strategies.vcp as vcp_mod
+from models import VCPBase
+from strategies.vcp import zigzag, zigzag_panel, detect_base, detect_bases, base_to_json, save_bases
+from _sqlite_db import SqliteDb
+
+def _vcp_frame():
+    """Uptrend, then a base with pullbacks of ~32%, ~12%, ~6%, tightening near the pivot."""
+    legs = [(50, 100, 120), (20, 120, 82), (20, 82, 98), (15, 98, 86), (15, 86, 97), (10, 97, 91), (12, 91, 96)]
+    close = []
+    for n, a, b in legs:
+        close.extend(np.linspace(a, b, n)[1:] if close else np.linspace(a, b, n))
+    close = np.array(close)
+    dates = pd.bdate_range("2023-01-02", periods=len(close))
+    vol = np.r_[np.full(len(close) - 12, 100000), np.full(12, 40000)]
+    return pd.DataFrame({'Open': close, 'High': close * 1.003, 'Low': close * 0.997,
+                         'Close': close, 'Volume': vol}, index=dates)
+
+class TestVCP(unittest.TestCase):
+
+    def test_zigzag_swings(self):
+        df = _vcp_frame()
+        pos, kinds, prices = zigzag(df['High'].to_numpy(), df['Low'].to_numpy(), 0.03)
+        # Alternating peaks and troughs
+        self.assertTrue((np.diff(kinds) != 0).all())
+        self.assertAlmostEqual(prices[kinds == 1].max(), 120 * 1.003)
+
+    def test_panel_matches_single(self):
+        rng = np.random.default_rng(1)
+        c = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 6)), axis=0))
+        h, l = c * 1.01, c * 0.99
+        h[:40, 2] = l[:40, 2] = np.nan  # late listing
+        piv = zigzag_panel(h, l, 0.04)
+        for j in range(6):
+            pos, kinds, _ = zigzag(h[:, j], l[:, j], 0.04)
+            np.testing.assert_array_equal(np.flatnonzero(piv[:, j]), pos)
+            np.testing.assert_array_equal(piv[pos, j], kinds)
+
+    def test_detects_vcp(self):
+        base = detect_base(_vcp_frame())
+        self.assertIsNotNone(base)
+        self.assertEqual(base["contractions"], 3)
+        self.assertTrue(base["depths"][0] > base["depths"][1] > base["depths"][2])
+        self.assertAlmostEqual(base["pivot_price"], 97 * 1.003)
+        self.assertLess(base["volume_ratio"], 0.8)
+        self.assertTrue(base["is_vcp"])
+        self.assertIsInstance(base_to_json(base)["pivot_date"], str)
+
+    def test_expanding_pullbacks_are_not_vcp(self):
+        df = _vcp_frame()
+        df['Volume'] = 100000
+        base = detect_base(df, max_final_depth=0.01)
+        self.assertFalse(base["is_vcp"])
+
+    def test_universe_matches_single(self):
+        df = _vcp_frame()
+        other = df * np.linspace(1.0, 0.5, len(df))[:, None]
+        panel = {f: pd.DataFrame({'A': df[f], 'B': other[f]}) for f in ['High', 'Low', 'Close', 'Volume']}
+        bases = detect_bases(panel)
+        single = detect_base(df)
+        self.assertEqual(bases.loc['A', 'contractions'], single["contractions"])
+        self.assertEqual(bases.loc['A', 'pivot_price'], single["pivot_price"])
+        self.assertEqual(bool(bases.loc['A', 'is_vcp']), single["is_vcp"])
+
+    def test_rescan_drops_bases_that_are_gone(self):
+        db = SqliteDb(VCPBase)
+
+        df = _vcp_frame()
+        panel = {f: pd.DataFrame({'A': df[f], 'B': df[f], 'C': df[f]}) for f in ['High', 'Low', 'Close', 'Volume']}
+        bases = detect_bases(panel)
+        as_of = df.index[-1].date()
+        stored = lambda: sorted(t for (t,) in db.Session().query(VCPBase.ticker).all())
+        with patch.object(vcp_mod, 'get_db', db):
+            self.assertEqual(save_bases(bases, as_of), 3)
+            # Same day rescanned: B no longer has a base, C wasn't part of this scan
+            save_bases(bases.loc[['A']], as_of, scanned=['A', 'B'])
+            self.assertEqual(stored(), ['A', 'C'])
+            # Whole universe, nothing found
+            self.assertEqual(save_bases(bases.iloc[:0], as_of), 0)
+            self.assertEqual(stored(), [])
+
+if __name__ == '__main__':
+    unittest.main()
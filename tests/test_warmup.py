@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+import strategies.warmup as warmup_mod
+from strategies.warmup import Warmup
+
+class _FakeManager:
+    def __init__(self):
+        self.seen = []
+
+    def iter_batch(self, tickers, **kwargs):
+        for t in tickers:
+            self.seen.append(t)
+            yield t, {"ticker": t}
+
+class _FakeWatchlist:
+    def __init__(self):
+        self.refreshed = 0
+
+    def refresh(self):
+        self.refreshed += 1
+
+class TestWarmup(unittest.TestCase):
+
+    def setUp(self):
+        def no_benchmark():
+            raise RuntimeError("provider down")
+        for p in (patch.object(warmup_mod, 'get_symbol_index', lambda: None),
+                  patch.object(warmup_mod, 'get_benchmark_service',
+                               lambda: type("S", (), {"refresh_all": staticmethod(no_benchmark)})())):
+            p.start()
+            self.addCleanup(p.stop)
+        self.mgr = _FakeManager()
+        self.watchlist = _FakeWatchlist()
+        self.warmup = Warmup(self.mgr, self.watchlist, tickers_loader=lambda: ["A.NS", "B.NS"])
+
+    def test_run_primes_caches_and_becomes_ready(self):
+        self.assertFalse(self.warmup.ready)
+        status = self.warmup.run()
+        self.assertTrue(self.warmup.ready)
+        self.assertEqual(self.mgr.seen, ["A.NS", "B.NS"])
+        self.assertEqual(self.watchlist.refreshed, 1)
+        self.assertEqual((status["done"], status["total"]), (2, 2))
+        # A failing step is recorded but does not block readiness
+        self.assertEqual(len(status["errors"]), 1)
+        self.assertIn("benchmark", status["errors"][0])
+
+    def test_readiness_endpoint(self):
+        import app as app_mod
+        client = app_mod.app.test_client()
+        with patch.object(app_mod, 'warmup', self.warmup):
+            self.assertEqual(client.get('/readyz').status_code, 503)
+            self.warmup.run()
+            resp = client.get('/readyz')
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.get_json()["status"], "ready")
+        self.assertEqual(client.get('/healthz').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
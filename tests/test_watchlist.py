@@ -0,0 +1,146 @@
+import datetime
+import unittest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import strategies.watchlist as watchlist_mod
+import utils.ticker_validation as validation_mod
+from models import MarketData, Watchlist
+from strategies.watchlist import (WatchlistService, WatchlistVerifier, add_to_watchlist, load_watchlist_pending,
+                                  load_watchlist_tickers, price_levels, watchlist_row)
+from utils.symbol_master import Symbol, SymbolIndex
+from utils.ticker_validation import NegativeCache, resolve_ticker
+from _sqlite_db import SqliteDb
+
+def _panel():
+    dates = pd.date_range(start="2024-01-01", periods=260, freq="B")
+    rng = np.random.default_rng(5)
+    close = pd.DataFrame({"A.NS": 100 + np.cumsum(rng.normal(0.2, 1, 260)),
+                          "B.NS": 100 + np.cumsum(rng.normal(-0.2, 1, 260))}, index=dates)
+    close.iloc[-3:, 1] = np.nan  # B's last bars missing (e.g. suspended)
+    return {"High": close + 1, "Close": close}
+
+class _FakeManager:
+    def __init__(self):
+        self.calls = 0
+
+    def iter_batch(self, tickers, **kwargs):
+        self.calls += 1
+        for t in tickers:
+            yield t, {"ticker": t, "price": 123.0,
+                      "strategies": {"Minervini Trend Template": {"status": "PASS" if t == "A.NS" else "FAIL"}}}
+
+class TestPriceLevels(unittest.TestCase):
+
+    def test_matches_per_ticker(self):
+        panel = _panel()
+        levels = price_levels(panel)
+        for t in ("A.NS", "B.NS"):
+            high = panel["High"][t].dropna()
+            self.assertAlmostEqual(levels[t]["high_52"], high.max())
+            self.assertAlmostEqual(levels[t]["pivot"], high.iloc[-20:].max())
+            self.assertAlmostEqual(levels[t]["close"], panel["Close"][t].dropna().iloc[-1])
+        self.assertEqual(levels["B.NS"]["as_of"], panel["Close"].index[-4])
+
+    def test_row_upside(self):
+        levels = {"high_52": 100.0, "pivot": 98.0, "close": 97.0, "as_of": None}
+        row = watchlist_row("A.NS", {"price": 97.0, "strategies": {"Minervini Trend Template": {"status": "PASS"}}},
+                            levels)
+        self.assertEqual(row["action"], "BUY")
+        self.assertTrue(row["upside"].startswith("+21.2%"))
+        self.assertIn("Momentum", row["upside"])
+        self.assertEqual(watchlist_row("A.NS", {}, levels)["upside"], "-")
+
+class TestWatchlistService(unittest.TestCase):
+
+    def setUp(self):
+        self.tickers = ["A.NS", "B.NS"]
+        self.mgr = _FakeManager()
+        self.svc = WatchlistService(self.mgr, tickers_loader=lambda: list(self.tickers))
+        patches = [
+            patch.object(watchlist_mod, 'load_price_panel', lambda *a, **k: _panel()),
+            patch('strategies.rs_rating.get_latest_rs', lambda t: {"A.NS": {"rating": 88}}),
+            patch('strategies.vcp.get_latest_bases', lambda t: {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_snapshot_reused_until_watchlist_changes(self):
+        snap = self.svc.get()
+        self.assertEqual([r["ticker"] for r in snap.rows], self.tickers)
+        self.assertEqual(snap.rows[0]["rs_rating"], 88)
+        self.assertIs(self.svc.get(), snap)
+        self.assertEqual(self.mgr.calls, 1)
+
+        self.tickers.append("C.NS")
+        self.assertEqual(len(self.svc.get().rows), 3)
+        self.assertEqual(self.mgr.calls, 2)
+
+    def test_stale_once_next_bar_due(self):
+        snap = self.svc.get()
+        after_close = datetime.datetime.combine(snap.as_of.date() + datetime.timedelta(days=3),
+                                                datetime.time(16, 0), tzinfo=watchlist_mod.IST)
+        self.assertFalse(self.svc._is_stale(snap, now=self.svc._checked))
+        self.svc._checked = None
+        self.assertTrue(self.svc._is_stale(snap, now=after_close))
+
+    def test_snapshot_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.svc.get().rows = ()
+
+class TestWatchlistAdd(unittest.TestCase):
+
+    def setUp(self):
+        db = SqliteDb(Watchlist, MarketData)
+        session = db.Session()
+        session.add(MarketData(ticker="INFY.NS", date=datetime.date(2024, 1, 2), close_price=1500))
+        session.commit()
+        session.close()
+        index = SymbolIndex([Symbol("INFY.NS", "INFY", "Infosys Limited", "INE009A01021", "EQ", "", "NSE"),
+                             Symbol("NEWCO.NS", "NEWCO", "Newco Limited", "INE000X01010", "EQ", "", "NSE")])
+        invalid = NegativeCache()
+        for p in (patch.object(watchlist_mod, 'get_db', db), patch.object(validation_mod, 'get_db', db),
+                  patch.object(validation_mod, 'get_symbol_index', lambda: index),
+                  patch.object(validation_mod, 'INVALID', invalid), patch.object(watchlist_mod, 'INVALID', invalid)):
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_resolve(self):
+        self.assertEqual(resolve_ticker(" infy "), "INFY.NS")
+        self.assertEqual(resolve_ticker("INE009A01021"), "INFY.NS")
+        self.assertEqual(resolve_ticker("^NSEI"), "^NSEI")
+
+    def test_bulk_add_is_local(self):
+        res = add_to_watchlist(["INFY.NS", "NEWCO.NS", "NOSUCH.NS", "BAD TICKER.NS"])
+        self.assertEqual(res["added"], ["INFY.NS", "NEWCO.NS", "NOSUCH.NS"])
+        self.assertEqual(res["pending"], ["NEWCO.NS", "NOSUCH.NS"])
+        self.assertEqual(list(res["rejected"]), ["BAD TICKER.NS"])
+        # Only tickers with data are analyzed; the rest show as pending
+        self.assertEqual(load_watchlist_tickers(), ["INFY.NS"])
+        self.assertEqual(load_watchlist_pending(), {"NEWCO.NS": "pending", "NOSUCH.NS": "pending"})
+        self.assertEqual(add_to_watchlist(["INFY.NS"])["existing"], ["INFY.NS"])
+
+    def test_verifier_settles_status(self):
+        add_to_watchlist(["NEWCO.NS", "NOSUCH.NS", "LATE.NS"])
+        frame = pd.DataFrame({"Close": [10.0]})
+        fetched = {"NEWCO.NS": frame, "NOSUCH.NS": pd.DataFrame(), "LATE.NS": None}
+        verifier = WatchlistVerifier(fetch=fetched.get)
+        self.assertEqual(verifier.verify("NEWCO.NS"), "active")
+        self.assertEqual(verifier.verify("NOSUCH.NS"), "invalid")
+        self.assertEqual(load_watchlist_tickers(), ["NEWCO.NS"])
+        self.assertEqual(load_watchlist_pending(), {"NOSUCH.NS": "invalid", "LATE.NS": "pending"})
+        # Negative cache: re-adding is rejected without another download
+        self.assertIn("NOSUCH.NS", add_to_watchlist(["NOSUCH.NS"])["rejected"])
+
+    def test_enqueue_dedupes_and_waits_before_retry(self):
+        verifier = WatchlistVerifier(fetch=lambda t: None)
+        verifier._loop = lambda: None  # nothing drains the queue
+        self.assertEqual(verifier.enqueue(["A.NS", "A.NS", "B.NS"]), ["A.NS", "B.NS"])
+        self.assertEqual(verifier.enqueue(["A.NS"]), [])
+        verifier._queued.clear()
+        verifier._attempted["A.NS"] = datetime.datetime.now()
+        self.assertEqual(verifier.enqueue(["A.NS", "B.NS"]), ["B.NS"])
+
+if __name__ == '__main__':
+    unittest.main()
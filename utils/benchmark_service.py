@@ -0,0 +1,140 @@
+import os
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+from utils.data_loader import fetch_stock_data, BENCHMARK_TICKER
+from utils.market_calendar import IST, next_bar_due
+
+# Comma-separated in the env file, e.g. BENCHMARK_TICKERS=^NSEI,^BSESN,^NSEBANK
+BENCHMARK_TICKERS = [t.strip() for t in os.getenv('BENCHMARK_TICKERS', BENCHMARK_TICKER).split(',') if t.strip()]
+
+# After a refresh that brought nothing new (holiday), wait this long before asking again
+MIN_RETRY = datetime.timedelta(minutes=15)
+
+
+class BenchmarkSnapshot:
+    """
+    Immutable view of one benchmark's history.
+    Built once per refresh; readers share it without locks. `positions` maps date -> row,
+    so aligning a ticker that trades on the same calendar is two dict lookups.
+    """
+    __slots__ = ("ticker", "frame", "index", "close", "positions", "as_of", "loaded_at")
+
+    def __init__(self, ticker: str, frame: pd.DataFrame, loaded_at: datetime.datetime = None):
+        frame = frame.sort_index()
+        close = frame['Close'].to_numpy(dtype=float, copy=True)
+        close.flags.writeable = False
+
+        object.__setattr__(self, "ticker", ticker)
+        object.__setattr__(self, "frame", frame)
+        object.__setattr__(self, "index", frame.index)
+        object.__setattr__(self, "close", close)
+        object.__setattr__(self, "positions", {d: i for i, d in enumerate(frame.index)})
+        object.__setattr__(self, "as_of", frame.index[-1] if len(frame) else None)
+        object.__setattr__(self, "loaded_at", loaded_at or datetime.datetime.now(IST))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("BenchmarkSnapshot is immutable")
+
+    def __len__(self):
+        return len(self.index)
+
+    @classmethod
+    def from_frame(cls, ticker: str, frame: pd.DataFrame):
+        return cls(ticker, frame)
+
+    def align(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Benchmark row for each date in index (-1 where the benchmark has no bar).
+        Fast path: if the ticker's first/last dates span exactly len(index) benchmark rows
+        (and those rows are the same dates), the answer is a plain range - no intersection.
+        """
+        n = len(index)
+        if n == 0:
+            return np.empty(0, dtype=int)
+        first = self.positions.get(index[0])
+        last = self.positions.get(index[-1])
+        if first is not None and last is not None and last - first + 1 == n \
+                and self.index[first:last + 1].equals(index):
+            return np.arange(first, last + 1)
+        # Calendars differ (suspensions, extra sessions): hash lookup per date
+        return self.index.get_indexer(index)
+
+    def aligned_close(self, data: pd.DataFrame) -> tuple:
+        """(stock Close, benchmark Close) restricted to the common dates."""
+        pos = self.align(data.index)
+        mask = pos >= 0
+        stock = data['Close'] if mask.all() else data['Close'][mask]
+        bench = pd.Series(self.close[pos[mask]], index=stock.index, name=self.ticker)
+        return stock, bench
+
+
+class BenchmarkService:
+    """
+    Holds the configured benchmarks and refreshes them after each trading session.
+    Reads are lock-free (a snapshot reference swap is atomic); only a stale read takes
+    the per-ticker lock, so concurrent requests trigger a single refresh.
+    """
+
+    def __init__(self, tickers: list = None, loader=None, period: str = "5y"):
+        self.tickers = list(tickers or BENCHMARK_TICKERS)
+        self.period = period
+        self._loader = loader or (lambda t: fetch_stock_data(t, period=self.period))
+        self._snapshots = {}
+        self._checked = {}
+        self._locks = {t: threading.Lock() for t in self.tickers}
+        self._locks_guard = threading.Lock()
+
+    def get(self, ticker: str = BENCHMARK_TICKER) -> BenchmarkSnapshot:
+        snap = self._snapshots.get(ticker)
+        if snap is not None and not self._is_stale(ticker, snap):
+            return snap
+        return self.refresh(ticker, if_stale=True)
+
+    def refresh(self, ticker: str = BENCHMARK_TICKER, if_stale: bool = False) -> BenchmarkSnapshot:
+        with self._lock_for(ticker):
+            snap = self._snapshots.get(ticker)
+            # Another thread may have refreshed while we waited
+            if if_stale and snap is not None and not self._is_stale(ticker, snap):
+                return snap
+            try:
+                df = self._loader(ticker)
+            except Exception as e:
+                print(f"Benchmark refresh failed for {ticker}: {e}")
+                df = None
+            self._checked[ticker] = datetime.datetime.now(IST)
+            if df is not None and not df.empty:
+                snap = BenchmarkSnapshot(ticker, df)
+                self._snapshots[ticker] = snap
+            return snap
+
+    def refresh_all(self):
+        for t in self.tickers:
+            self.refresh(t)
+
+    def _lock_for(self, ticker):
+        lock = self._locks.get(ticker)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(ticker, threading.Lock())
+        return lock
+
+    def _is_stale(self, ticker: str, snap: BenchmarkSnapshot, now: datetime.datetime = None) -> bool:
+        now = now or datetime.datetime.now(IST)
+        checked = self._checked.get(ticker)
+        if checked is not None and now - checked < MIN_RETRY:
+            return False
+        return now >= next_bar_due(snap.as_of)
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+def get_benchmark_service() -> BenchmarkService:
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = BenchmarkService()
+    return _SERVICE
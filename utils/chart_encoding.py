@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+# Roughly the pixel width of the chart frame. More points than this can't be seen anyway.
+DEFAULT_MAX_POINTS = 800
+
+# Shorthand ranges accepted by `range=` (e.g. range=6mo)
+RANGE_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+}
+
+
+def lttb_indices(y, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the positions of the points to keep (always includes first and last).
+    x is taken as the bar position, so gaps (weekends/holidays) don't skew the buckets.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # NaN (e.g. SMA warm-up) would poison the triangle areas
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    x = np.arange(n, dtype=float)
+
+    # Bucket edges for the n-2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        nxt_start = end
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_start:nxt_end].mean()
+        avg_y = y[nxt_start:nxt_end].mean()
+
+        # Triangle area (x2) between selected point a, candidates, and next bucket average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return keep
+
+
+def parse_range(value: str, index: pd.DatetimeIndex = None):
+    """
+    Parse a `range=` parameter into (start, end) timestamps.
+    Accepts shorthand ('6mo', '1y', 'max') or 'YYYY-MM-DD:YYYY-MM-DD' (either side optional).
+    Returns (None, None) for empty / unrecognised input.
+    """
+    if not value:
+        return None, None
+    value = value.strip()
+
+    if value in RANGE_OFFSETS:
+        if index is None or len(index) == 0:
+            return None, None
+        end = index[-1]
+        return end - RANGE_OFFSETS[value], end
+    if value == "max":
+        return None, None
+
+    if ":" in value:
+        start_s, end_s = value.split(":", 1)
+        try:
+            start = pd.Timestamp(start_s) if start_s else None
+            end = pd.Timestamp(end_s) if end_s else None
+            return start, end
+        except (ValueError, TypeError):
+            return None, None
+    return None, None
+
+
+def slice_range(df: pd.DataFrame, date_range=None) -> pd.DataFrame:
+    """Restrict df to a `range=` window. Indicators should be computed BEFORE slicing."""
+    if df is None or not date_range:
+        return df
+    start, end = parse_range(date_range, df.index) if isinstance(date_range, str) else date_range
+    if start is None and end is None:
+        return df
+    sliced = df.loc[start:end]
+    # Keep at least a couple of bars so the chart isn't empty on a tiny zoom
+    return sliced if len(sliced) >= 2 else df
+
+
+def downsample(df: pd.DataFrame, max_points: int = DEFAULT_MAX_POINTS, column: str = "Close") -> pd.DataFrame:
+    """
+    Reduce df to at most max_points rows using LTTB on `column`.
+    OHLC columns (if present) are aggregated over each kept segment so candles keep their true range.
+    """
+    if df is None or not max_points or len(df) <= max_points:
+        return df
+
+    idx = lttb_indices(df[column].to_numpy(dtype=float), max_points)
+    out = df.iloc[idx].copy()
+
+    # Each kept point represents the bars up to the next kept point
+    if {'Open', 'High', 'Low', 'Close'}.issubset(df.columns):
+        seg_end = np.append(idx[1:], len(df)) - 1
+        out['Open'] = df['Open'].to_numpy()[idx]
+        out['High'] = np.maximum.reduceat(df['High'].to_numpy(dtype=float), idx)
+        out['Low'] = np.minimum.reduceat(df['Low'].to_numpy(dtype=float), idx)
+        out['Close'] = df['Close'].to_numpy()[seg_end]
+    return out
+
+
+def encode_values(series, dtype: str = "f4") -> np.ndarray:
+    """
+    Numeric series as a typed numpy array.
+    Plotly serializes these as {"dtype", "bdata"} base64 buffers instead of JSON number lists.
+    """
+    return np.asarray(series, dtype=np.dtype(dtype))
+
+
+def encode_dates(index: pd.DatetimeIndex) -> np.ndarray:
+    """Dates as epoch milliseconds (f8). Axes using these must be type='date'."""
+    return pd.DatetimeIndex(index).values.astype("datetime64[ms]").astype("f8")
@@ -3,67 +3,152 @@ import pandas as pd
 from sqlalchemy import func
 from utils.db import get_db
 from models import MarketData, StockDetails
+from utils.market_calendar import now_ist, bar_is_due
+from utils import metrics
 
 BENCHMARK_TICKER = "^NSEI"
 
-def fetch_stock_data(ticker: str, period: str = "5y") -> pd.DataFrame:
-    ticker = ticker.strip().upper()
-    if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
-        ticker += ".NS"
+# DataFrame column -> market_data column
+PANEL_FIELDS = {
+    'Open': 'open_price',
+    'High': 'high_price',
+    'Low': 'low_price',
+    'Close': 'close_price',
+    'Volume': 'volume',
+}
+
+def fetch_stock_data(ticker: str, period: str = "5y", bars: int = None, columns: list = None,
+                     sync: bool = True) -> pd.DataFrame:
+    """
+    OHLCV history for ticker, synced into market_data first.
+    period: how much history to backfill/keep. bars/columns: only return the last `bars` rows
+    of these columns (what strategies declared in data_requirements) instead of everything stored.
+    sync=False: the caller has just synced (latest_bar_date) - read what is stored, no sync queries.
+    """
+    ticker = _normalize(ticker)
     
     db = get_db()
-    if not db: return _fetch_direct(ticker, period)
+    if not db: return _trim(_fetch_direct(ticker, period), bars, columns)
     
     session = db.get_db_session()
     try:
-        # Check max AND min date to ensure history
-        min_date = session.query(func.min(MarketData.date)).filter_by(ticker=ticker).scalar()
-        last_date = session.query(func.max(MarketData.date)).filter_by(ticker=ticker).scalar()
-        
-        # Heuristic: If we need "5y" or "1y", we expect at least ~200 days for strategies.
-        # If min_date is too recent (e.g. < 1 year ago), we might need to backfill.
-        # Simple fix: If total count is small (< 260) and period is long, force refetch.
-        count = session.query(func.count(MarketData.date)).filter_by(ticker=ticker).scalar() or 0
-        
-        need_full_fetch = False
-        if period in ['1y', '2y', '5y', 'max'] and count < 260:
-            need_full_fetch = True
-            
-        if last_date and not need_full_fetch:
-            today = pd.Timestamp.now().date()
-            if last_date < today:
-                # Fetch missing
-                new_data = yf.download(ticker, start=last_date + pd.Timedelta(days=1), progress=False, auto_adjust=True)
-                if not new_data.empty:
-                    _save_to_db(session, ticker, new_data)
-            
-            # Ensure StockDetails exist
-            try:
-                if not session.query(StockDetails.ticker).filter_by(ticker=ticker).scalar():
-                     _save_details(session, ticker)
-            except Exception:
-                pass
-
+        if not sync:
+            stored = _load_from_db(session, ticker, bars=bars, columns=columns)
+            if stored is not None:
+                return stored
+        synced, direct = _sync(session, ticker, period)
+        if synced:
             # Return from DB
-            return _load_from_db(session, ticker)
-        
-        # Else fetch full (either no data or insufficient history)
-        df = _fetch_direct(ticker, period)
-        if df is not None:
-             _save_to_db(session, ticker, df)
-             _save_details(session, ticker)
-        return df
+            return _load_from_db(session, ticker, bars=bars, columns=columns)
+        return _trim(direct, bars, columns)
 
     except Exception as e:
         print(f"Fetch Error {ticker}: {e}")
-        return _fetch_direct(ticker, period) # Fallback
+        return _trim(_fetch_direct(ticker, period), bars, columns) # Fallback
+    finally:
+        db.close_session()
+
+def latest_bar_date(ticker: str, period: str = "5y"):
+    """
+    Date of the newest stored bar after syncing (same rules as fetch_stock_data), without
+    loading any history. None if the DB is unavailable or the ticker has no data.
+    A caller that goes on to load the bars passes sync=False to fetch_stock_data.
+    """
+    ticker = _normalize(ticker)
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return None
+    try:
+        _sync(session, ticker, period)
+        return session.query(func.max(MarketData.date)).filter_by(ticker=ticker).scalar()
+    except Exception as e:
+        print(f"Latest Bar Error {ticker}: {e}")
+        return None
     finally:
         db.close_session()
 
+def _normalize(ticker):
+    ticker = ticker.strip().upper()
+    if not (ticker.endswith(".NS") or ticker.endswith(".BO") or ticker.startswith("^")):
+        ticker += ".NS"
+    return ticker
+
+# Per-process: when we last asked yfinance for new bars of a ticker. A bar that is due but
+# not published (exchange holiday, provider lag) is retried after SYNC_RETRY, not on every call.
+_LAST_SYNC = {}
+SYNC_RETRY = pd.Timedelta(minutes=15)
+
+def _sync(session, ticker, period):
+    """
+    Brings market_data up to date for ticker.
+    Returns (True, None) when the DB holds the history, or (False, df) when it had to be
+    fetched directly (no/insufficient stored history) - df is also saved.
+    """
+    # Check max AND min date to ensure history
+    last_date = session.query(func.max(MarketData.date)).filter_by(ticker=ticker).scalar()
+    
+    # Heuristic: If we need "5y" or "1y", we expect at least ~200 days for strategies.
+    # If min_date is too recent (e.g. < 1 year ago), we might need to backfill.
+    # Simple fix: If total count is small (< 260) and period is long, force refetch.
+    count = session.query(func.count(MarketData.date)).filter_by(ticker=ticker).scalar() or 0
+    
+    need_full_fetch = False
+    if period in ['1y', '2y', '5y', 'max'] and count < 260:
+        need_full_fetch = True
+        # A young listing has no more history to give: refetch at most every SYNC_RETRY,
+        # not on every call (a request would otherwise download it several times)
+        checked = _LAST_SYNC.get(ticker)
+        if count and checked is not None and now_ist() - checked < SYNC_RETRY:
+            return True, None
+        
+    if last_date and not need_full_fetch:
+        # Only after the next session's close - a mid-session download would store a partial bar
+        now = now_ist()
+        checked = _LAST_SYNC.get(ticker)
+        if bar_is_due(last_date, now) and (checked is None or now - checked >= SYNC_RETRY):
+            _LAST_SYNC[ticker] = now
+            # Fetch missing
+            new_data = _download(ticker, start=last_date + pd.Timedelta(days=1))
+            if new_data is not None and not new_data.empty:
+                if isinstance(new_data.columns, pd.MultiIndex):
+                    new_data.columns = new_data.columns.get_level_values(0)
+                _save_to_db(session, ticker, new_data)
+        
+        # Ensure StockDetails exist
+        try:
+            if not session.query(StockDetails.ticker).filter_by(ticker=ticker).scalar():
+                 _save_details(session, ticker)
+        except Exception:
+            pass
+        return True, None
+    
+    # Else fetch full (either no data or insufficient history)
+    _LAST_SYNC[ticker] = now_ist()
+    df = _fetch_direct(ticker, period)
+    if df is not None:
+         _save_to_db(session, ticker, df)
+         _save_details(session, ticker)
+    return False, df
+
+def _download(ticker, **kwargs):
+    """yf.download with provider metrics (latency, errors/empty results, returned size)."""
+    call = "history" if "period" in kwargs else "incremental"
+    try:
+        with metrics.PROVIDER_SECONDS.time(call=call):
+            df = yf.download(ticker, progress=False, auto_adjust=True, **kwargs)
+    except Exception:
+        metrics.PROVIDER_ERRORS.inc(call=call, kind="exception")
+        raise
+    if df is None or df.empty:
+        metrics.PROVIDER_ERRORS.inc(call=call, kind="empty")
+    else:
+        metrics.PROVIDER_BYTES.inc(int(df.memory_usage(deep=True).sum()), call=call)
+    return df
+
 def _fetch_direct(ticker, period):
     try:
         # yfinance might return MultiIndex columns keys: (Price, Ticker)
-        df = yf.download(ticker, period=period, progress=False, auto_adjust=True)
+        df = _download(ticker, period=period)
         
         if df is None or df.empty:
             return None
@@ -77,27 +162,31 @@ def _fetch_direct(ticker, period):
         return df
     except: return None
 
-def _load_from_db(session, ticker):
-    # Construct DF from query
-    data = session.query(MarketData).filter_by(ticker=ticker).order_by(MarketData.date.asc()).all()
+def _trim(df, bars=None, columns=None):
+    if df is None: return None
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    if bars:
+        df = df.iloc[-bars:]
+    return df
+
+def _load_from_db(session, ticker, bars=None, columns=None):
+    # Construct DF from query - only the requested columns / most recent bars
+    columns = [c for c in (columns or PANEL_FIELDS) if c in PANEL_FIELDS] or ['Close']
+    q = session.query(MarketData.date, *[getattr(MarketData, PANEL_FIELDS[c]) for c in columns]).filter_by(ticker=ticker)
+    if bars:
+        q = q.order_by(MarketData.date.desc()).limit(bars)
+    else:
+        q = q.order_by(MarketData.date.asc())
+    data = q.all()
     if not data: return None
     
-    records = []
-    for d in data:
-        records.append({
-            'date': d.date,
-            'Open': float(d.open_price),
-            'High': float(d.high_price),
-            'Low': float(d.low_price),
-            'Close': float(d.close_price),
-            'Volume': int(d.volume)
-        })
-        
-    df = pd.DataFrame(records)
-    if df.empty: return None
+    df = pd.DataFrame(data, columns=['date'] + columns)
+    for c in columns:
+        df[c] = df[c].fillna(0).astype('int64') if c == 'Volume' else df[c].astype(float)
     df['date'] = pd.to_datetime(df['date'])
     df.set_index('date', inplace=True)
-    return df
+    return df.sort_index()
 
 def _save_to_db(session, ticker, df):
     # Batch create objects
@@ -124,7 +213,12 @@ def _save_to_db(session, ticker, df):
 
 def _save_details(session, ticker):
     try:
-        info = yf.Ticker(ticker).info
+        try:
+            with metrics.PROVIDER_SECONDS.time(call="info"):
+                info = yf.Ticker(ticker).info
+        except Exception:
+            metrics.PROVIDER_ERRORS.inc(call="info", kind="exception")
+            raise
         d = StockDetails(
             ticker=ticker,
             company_name=info.get('longName', ''),
@@ -141,3 +235,44 @@ def _save_details(session, ticker):
 
 def fetch_benchmark_data(period: str = "5y") -> pd.DataFrame:
     return fetch_stock_data(BENCHMARK_TICKER, period)
+
+def load_price_panel(tickers: list = None, start=None, fields: list = None) -> dict:
+    """
+    Loads stored market_data as wide frames (dates x tickers), one per field.
+    Single query, no yfinance calls - this is the input for universe-wide (vectorized) work.
+    tickers=None loads every ticker we have history for.
+    Returns {} if the DB is unavailable or empty.
+    """
+    fields = fields or list(PANEL_FIELDS.keys())
+    db = get_db()
+    if not db or not db.get_db_session(): return {}
+
+    session = db.get_db_session()
+    try:
+        cols = [getattr(MarketData, PANEL_FIELDS[f]) for f in fields]
+        q = session.query(MarketData.ticker, MarketData.date, *cols)
+        if tickers:
+            q = q.filter(MarketData.ticker.in_(tickers))
+        if start is not None:
+            q = q.filter(MarketData.date >= pd.Timestamp(start).date())
+
+        long_df = pd.read_sql(q.statement, session.bind)
+        return panel_from_long(long_df, fields)
+    except Exception as e:
+        print(f"Panel Load Error: {e}")
+        return {}
+    finally:
+        db.close_session()
+
+def panel_from_long(long_df: pd.DataFrame, fields: list = None) -> dict:
+    """Pivot (ticker, date, <db columns>) rows into {field: dates x tickers frame}."""
+    fields = fields or list(PANEL_FIELDS.keys())
+    if long_df is None or long_df.empty: return {}
+
+    long_df = long_df.copy()
+    long_df['date'] = pd.to_datetime(long_df['date'])
+    panel = {}
+    for f in fields:
+        wide = long_df.pivot(index='date', columns='ticker', values=PANEL_FIELDS[f]).sort_index()
+        panel[f] = wide.astype(float)
+    return panel
@@ -0,0 +1,126 @@
+"""
+HTTP caching for analysis/chart responses.
+
+Validators come from what a response is a function of - ticker, last bar date, strategy
+versions and request variant - so they can be checked before any analysis runs:
+  - weak ETag (same for every content encoding), If-None-Match -> 304;
+  - Last-Modified = the last bar's close;
+  - Cache-Control max-age = until the next bar is due (trading calendar), no-cache once it is.
+Responses are compressed per Accept-Encoding (br when the brotli package is installed, else
+gzip), and recent encoded bodies are kept so a repeat request skips analysis and compression.
+"""
+import datetime
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response
+from utils.market_calendar import IST, MARKET_CLOSE, now_ist, next_bar_due
+from utils.metrics import CACHE_LOOKUPS
+
+try:
+    import brotli
+except ImportError: # optional - gzip only
+    brotli = None
+
+COMPRESSIBLE = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:24]
+
+def last_modified(bar_date) -> datetime.datetime:
+    return datetime.datetime.combine(bar_date, MARKET_CLOSE, tzinfo=IST)
+
+def max_age(bar_date, now: datetime.datetime = None) -> int:
+    """Seconds until a newer bar may exist (0 once it is due)."""
+    return max(0, int((next_bar_due(bar_date) - (now or now_ist())).total_seconds()))
+
+def set_validators(response, etag: str, bar_date, now: datetime.datetime = None):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified(bar_date)
+    age = max_age(bar_date, now)
+    response.headers['Cache-Control'] = f"public, max-age={age}" if age else "no-cache"
+    response.vary.add('Accept-Encoding')
+    return response
+
+def not_modified(request, etag: str, bar_date):
+    """304 response if the client already holds this representation (If-None-Match), else None."""
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        return set_validators(Response(status=304), etag, bar_date)
+    return None
+
+def negotiate(request):
+    """Best content encoding the client accepts: 'br', 'gzip' or None."""
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+def encode(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class BodyCache:
+    """LRU of encoded response bodies: (etag, encoding) -> (mimetype, bytes), bounded by total size."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding):
+        with self._lock:
+            hit = self._entries.get((etag, encoding))
+            if hit is not None:
+                self._entries.move_to_end((etag, encoding))
+        CACHE_LOOKUPS.inc(cache="http_body", result="miss" if hit is None else "hit")
+        return hit
+
+    def put(self, etag, encoding, mimetype, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((etag, encoding), None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[(etag, encoding)] = (mimetype, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+BODIES = BodyCache()
+
+def cached_response(request, etag: str, bar_date):
+    """Full response from a previously encoded body (no analysis, no compression), or None."""
+    encoding = negotiate(request)
+    hit = BODIES.get(etag, encoding) if encoding else None
+    if hit is None:
+        return None
+    mimetype, data = hit
+    resp = Response(data, mimetype=mimetype)
+    resp.headers['Content-Encoding'] = encoding
+    return set_validators(resp, etag, bar_date)
+
+def compress(request, response):
+    """after_request hook: encodes eligible responses and remembers bodies that carry an ETag."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = negotiate(request)
+    if not encoding or len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    data = encode(body, encoding)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and weak:
+        BODIES.put(etag, encoding, response.mimetype, data)
+    return response
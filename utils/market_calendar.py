@@ -0,0 +1,25 @@
+import datetime
+import pandas as pd
+
+# NSE closes 15:30 IST; give the data provider a few minutes to publish the bar
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+MARKET_CLOSE = datetime.time(15, 45)
+
+
+def now_ist() -> datetime.datetime:
+    return datetime.datetime.now(IST)
+
+
+def next_bar_due(as_of) -> datetime.datetime:
+    """When the bar after `as_of` should be available: next weekday's close (IST)."""
+    if as_of is None:
+        return datetime.datetime.min.replace(tzinfo=IST)
+    day = pd.Timestamp(as_of).date() + datetime.timedelta(days=1)
+    while day.weekday() >= 5:  # Sat/Sun - exchange holidays are absorbed by the callers' retry intervals
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, MARKET_CLOSE, tzinfo=IST)
+
+
+def bar_is_due(as_of, now: datetime.datetime = None) -> bool:
+    """True once a newer bar than `as_of` may exist."""
+    return (now or now_ist()) >= next_bar_due(as_of)
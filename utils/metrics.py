@@ -0,0 +1,275 @@
+"""
+Request-level metrics in Prometheus text format (served at /metrics).
+
+Counters and histograms live in a process-local registry - no client library needed.
+Multi-worker servers: with METRICS_DIR set (gunicorn.conf.py sets it), every process writes a
+snapshot of its values there (file per pid, every FLUSH_SECONDS and on scrape) and /metrics
+merges all snapshots, so scraping any worker reports the whole server. Without METRICS_DIR
+only the serving process is reported.
+
+What is recorded (all names prefixed wealthlab_):
+  - http_request_duration_seconds{endpoint,method,status}: Flask routes (until the response
+    object is ready - a streamed body's generation is not included);
+  - db_query_duration_seconds{operation}: every SQL statement, via engine events;
+  - provider_request_duration_seconds / provider_errors_total / provider_bytes_total{call}:
+    yfinance calls (bytes = size of the returned frame);
+  - strategy_duration_seconds{strategy,mode}: strategy analyze/screen;
+  - cache_lookups_total{cache,result}: hit/miss per cache (hit ratio in PromQL).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+FLUSH_SECONDS = 5.0
+PREFIX = "wealthlab_"
+
+# Seconds: 1ms .. 60s
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Registry:
+    """Metric families of this process, plus the snapshot files of its sibling workers."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def reset(self):
+        """Drops all values (a forked worker must not report its parent's counts again)."""
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        for m in self._metrics.values():
+            m._lock = threading.Lock()
+            m._values = {}
+
+    def state(self) -> dict:
+        return {name: m.state() for name, m in self._metrics.items()}
+
+    # --- Multi-process ---
+
+    def touch(self):
+        """Starts this process's snapshot thread on first use (cheap no-op afterwards)."""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Metrics flush failed: {e}")
+
+    def flush(self, name: str = None):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics_{name or os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, path)
+
+    def collect(self) -> dict:
+        """{metric name: {label values: value}} for this process, or merged across all snapshot files."""
+        if not self.directory:
+            return self.state()
+        self.flush()
+        merged = {}
+        for fname in os.listdir(self.directory):
+            if not (fname.startswith("metrics_") and fname.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, fname)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue # being replaced, or from an incompatible build
+            for name, values in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                into = merged.setdefault(name, {})
+                for key, value in values.items():
+                    into[key] = metric.merge(into.get(key), value)
+        return merged
+
+    def exposition(self) -> str:
+        state = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.extend(metric.render(state.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _num(value) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, doc: str, labels=(), registry: Registry = None):
+        self.name = PREFIX + name
+        self.doc = doc
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._registry = registry or REGISTRY
+        self._registry.register(self)
+
+    def _key(self, labels) -> str:
+        # JSON-encoded label values: usable as a dict key and in snapshot files alike
+        return json.dumps([str(labels.get(n, "")) for n in self.labelnames])
+
+    def state(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._registry.touch()
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    @staticmethod
+    def merge(a, b):
+        return (a or 0.0) + b
+
+    def render(self, values: dict) -> list:
+        lines = self._header()
+        for key in sorted(values):
+            lines.append(f"{self.name}{_labels(self.labelnames, json.loads(key))} {_num(values[key])}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels=(), buckets=LATENCY_BUCKETS, registry: Registry = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labels, registry)
+
+    def observe(self, value: float, **labels):
+        self._registry.touch()
+        key = self._key(labels)
+        # First bucket whose bound >= value ("le"); the last slot is +Inf
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def merge(a, b):
+        if a is None:
+            return [list(b[0]), b[1]]
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1]]
+
+    def render(self, values: dict) -> list:
+        lines = self._header()
+        bounds = list(self.buckets) + [float("inf")]
+        for key in sorted(values):
+            label_values = json.loads(key)
+            counts, total = values[key]
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, label_values, [('le', _num(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, label_values)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, label_values)} {cumulative}")
+        return lines
+
+
+REGISTRY = Registry(METRICS_DIR)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.reset)
+
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Flask request latency.", ("endpoint", "method", "status"))
+DB_SECONDS = Histogram("db_query_duration_seconds", "SQL statement latency.", ("operation",))
+PROVIDER_SECONDS = Histogram("provider_request_duration_seconds", "Market data provider (yfinance) call latency.", ("call",))
+PROVIDER_ERRORS = Counter("provider_errors_total", "Provider calls that raised or returned no data.", ("call", "kind"))
+PROVIDER_BYTES = Counter("provider_bytes_total", "Size of the data returned by the provider.", ("call",))
+STRATEGY_SECONDS = Histogram("strategy_duration_seconds", "Strategy analyze/screen time per ticker.", ("strategy", "mode"))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"))
+
+def exposition() -> str:
+    return REGISTRY.exposition()
+
+
+# --- Instrumentation hooks ---
+
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def instrument_engine(engine):
+    """Times every statement executed on a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        op = statement.lstrip()[:6].upper()
+        DB_SECONDS.observe(time.perf_counter() - start, operation=op if op in _SQL_OPERATIONS else "OTHER")
+
+def instrument_flask(app):
+    """Route latency; register before other after_request hooks so their time is included."""
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unmatched",
+                                 method=request.method, status=response.status_code)
+        return response
@@ -0,0 +1,191 @@
+"""
+Symbol master: the exchange equity lists, indexed for autocomplete and local validation.
+
+Sources (local files in SYMBOLS_DIR, default data/symbols/):
+  - EQUITY_L.csv  NSE equity list (SYMBOL, NAME OF COMPANY, SERIES, ISIN NUMBER, ...)
+  - Equity.csv    BSE scrip list (Security Id, Security Name / Issuer Name, ISIN No, Industry, Status)
+  - SME_EQUITY_L.csv (optional) NSE SME list, same columns as EQUITY_L.csv
+Both are the exchanges' own downloads. Without them the index falls back to nse_tickers.NSE_TICKERS.
+
+Lookups:
+  - prefix search over symbols, ISINs and company-name words: sorted key array + bisect;
+  - fuzzy name search (typos) from a trigram index, only when no prefix matches;
+  - exact ticker lookup (RELIANCE.NS / 500325.BO style) for validation.
+"""
+import bisect
+import csv
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+SYMBOLS_DIR = os.getenv('SYMBOLS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'symbols'))
+
+_WORD = re.compile(r"[a-z0-9&]+")
+
+
+class Symbol(NamedTuple):
+    ticker: str         # yfinance ticker, e.g. RELIANCE.NS
+    symbol: str         # exchange symbol, e.g. RELIANCE
+    name: str
+    isin: str
+    series: str
+    sector: str
+    exchange: str       # NSE | BSE
+
+
+def _norm(text) -> str:
+    return (text or "").strip().lower()
+
+def _trigrams(text: str) -> set:
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            yield {k.strip().upper(): (v or "").strip() for k, v in row.items() if k}
+
+def load_nse(path) -> list:
+    return [Symbol(f"{r['SYMBOL']}.NS", r['SYMBOL'], r.get('NAME OF COMPANY', ''), r.get('ISIN NUMBER', ''),
+                   r.get('SERIES', ''), '', 'NSE')
+            for r in _read_csv(path) if r.get('SYMBOL')]
+
+def load_bse(path) -> list:
+    out = []
+    for r in _read_csv(path):
+        sid = r.get('SECURITY ID')
+        if not sid or r.get('STATUS', 'Active') != 'Active' or r.get('INSTRUMENT', 'Equity') != 'Equity':
+            continue
+        out.append(Symbol(f"{sid}.BO", sid, r.get('ISSUER NAME') or r.get('SECURITY NAME', ''),
+                          r.get('ISIN NO', ''), r.get('GROUP', ''), r.get('INDUSTRY', ''), 'BSE'))
+    return out
+
+def load_symbols(directory: str = SYMBOLS_DIR) -> list:
+    """All symbols from the exchange files present in directory (fallback: the built-in NSE list)."""
+    symbols = []
+    for fname, loader in (("EQUITY_L.csv", load_nse), ("SME_EQUITY_L.csv", load_nse), ("Equity.csv", load_bse)):
+        path = os.path.join(directory, fname)
+        if os.path.exists(path):
+            try:
+                symbols.extend(loader(path))
+            except Exception as e:
+                print(f"Symbol list load failed for {path}: {e}")
+    if not symbols:
+        from nse_tickers import NSE_TICKERS
+        symbols = [Symbol(t, t.rsplit('.', 1)[0], '', '', '', '', 'NSE') for t in NSE_TICKERS]
+    return symbols
+
+
+class SymbolIndex:
+    """
+    Immutable prefix/fuzzy index over a symbol list; build once, query from any thread.
+    Two sorted key arrays - symbols, then names/words/ISINs - are scanned in that order from
+    the bisect point, so a query stops as soon as `limit` matches are found.
+    """
+
+    def __init__(self, symbols: list):
+        # One entry per ticker (the NSE main/SME lists can overlap); NSE listings first
+        self.symbols = list({s.ticker: s for s in sorted(symbols, key=lambda s: s.exchange != 'NSE')}.values())
+        self.by_ticker = {s.ticker: i for i, s in enumerate(self.symbols)}
+        self.by_isin = {}
+        sym_entries, name_entries = [], []
+        grams = defaultdict(list)
+        for i, s in enumerate(self.symbols):
+            nse = 0 if s.exchange == 'NSE' else 1
+            sym_entries.append((_norm(s.symbol), nse, i))
+            if s.isin:
+                self.by_isin.setdefault(s.isin.upper(), i)
+                name_entries.append((_norm(s.isin), nse, i))
+            name = _norm(s.name)
+            if name:
+                name_entries.append((name, nse, i))
+                for word in set(_WORD.findall(name)):
+                    name_entries.append((word, nse, i))
+                for g in _trigrams(name):
+                    grams[g].append(i)
+        self._tiers = []
+        for entries in (sym_entries, name_entries):
+            entries.sort()
+            self._tiers.append(([e[0] for e in entries], [e[2] for e in entries]))
+        self._grams = dict(grams)
+        # Trigrams in more than this many names ("lim", "ted") carry no signal for fuzzy search
+        self._common = max(50, len(self.symbols) // 20)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def get(self, ticker: str):
+        """Symbol for an exact ticker (RELIANCE.NS) or ISIN, else None."""
+        key = (ticker or "").strip().upper()
+        i = self.by_ticker.get(key)
+        if i is None:
+            i = self.by_isin.get(key)
+        return None if i is None else self.symbols[i]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Best matches for a partial symbol, company name or ISIN: symbol prefixes first (an exact
+        symbol sorts first), then name/ISIN prefixes, in key order; fuzzy on names if nothing prefixes.
+        """
+        q = _norm(query)
+        if q.endswith(('.ns', '.bo')):
+            q = q[:-3]
+        if not q:
+            return []
+
+        out, seen_ids, seen_isins = [], set(), set()
+        def take(i):
+            s = self.symbols[i]
+            # Same company listed on both exchanges: suggest it once (NSE sorts first)
+            if i in seen_ids or (s.isin and s.isin in seen_isins):
+                return
+            seen_ids.add(i)
+            seen_isins.add(s.isin)
+            out.append(s)
+
+        for keys, ids in self._tiers:
+            for pos in range(bisect.bisect_left(keys, q), len(keys)):
+                if len(out) >= limit or not keys[pos].startswith(q):
+                    break
+                take(ids[pos])
+        if not out and len(q) >= 3:
+            for i in self._fuzzy(q)[:limit * 2]:
+                take(i)
+        return out[:limit]
+
+    def _fuzzy(self, q: str, min_score: float = 0.3) -> list:
+        """Symbol ids ranked by shared trigrams with q (typo-tolerant name match)."""
+        qgrams = _trigrams(q)
+        counts = Counter()
+        for g in qgrams:
+            posting = self._grams.get(g, ())
+            if len(posting) <= self._common:
+                counts.update(posting)
+        ranked = []
+        for i, shared in counts.most_common(200):
+            score = shared / len(qgrams)
+            if score >= min_score:
+                ranked.append((-score, self.symbols[i].exchange != 'NSE', self.symbols[i].symbol, i))
+        return [r[-1] for r in sorted(ranked)]
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_symbol_index() -> SymbolIndex:
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = SymbolIndex(load_symbols())
+    return _INDEX
+
+def reload_symbol_index(directory: str = SYMBOLS_DIR) -> SymbolIndex:
+    """Rebuild from the files (e.g. after downloading fresh exchange lists); readers swap atomically."""
+    global _INDEX
+    index = SymbolIndex(load_symbols(directory))
+    with _INDEX_LOCK:
+        _INDEX = index
+    return index
@@ -0,0 +1,107 @@
+"""
+Ticker validation without a network round trip.
+
+User input (ticker, bare NSE symbol or ISIN) is resolved against the symbol master, then:
+  - rejected: malformed, or in the negative cache (a download found no data recently);
+  - ready: bars already stored in market_data;
+  - pending: everything else - accepted now, fetched/verified in the background
+    (strategies.watchlist.WatchlistVerifier).
+Only a symbol that is neither listed nor downloadable ends up in the negative cache.
+"""
+import datetime
+import re
+import threading
+from models import MarketData
+from utils.db import get_db
+from utils.symbol_master import get_symbol_index
+
+# How long a ticker that came back empty stays rejected (delisted symbols stay empty anyway)
+INVALID_TTL = datetime.timedelta(hours=12)
+
+_TICKER = re.compile(r"^\^?[A-Z0-9&_\-]+(\.[A-Z]{1,3})?$")
+MAX_TICKER_LEN = 20 # watchlist/market_data column width
+
+def resolve_ticker(raw: str) -> str:
+    """yfinance ticker for user input: RELIANCE.NS, RELIANCE (-> .NS), an ISIN or an index (^NSEI)."""
+    raw = (raw or "").strip().upper()
+    if not raw:
+        return ""
+    sym = get_symbol_index().get(raw)
+    if sym is not None:
+        return sym.ticker
+    if not (raw.endswith(".NS") or raw.endswith(".BO") or raw.startswith("^")):
+        raw += ".NS"
+    return raw
+
+def is_listed(ticker: str) -> bool:
+    """In the exchange lists (indices are never listed there, but are valid)."""
+    return ticker.startswith("^") or get_symbol_index().get(ticker) is not None
+
+
+class NegativeCache:
+    """Tickers known to have no data: ticker -> (reason, expires). Thread-safe."""
+
+    def __init__(self, ttl: datetime.timedelta = INVALID_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, ticker, reason, now: datetime.datetime = None):
+        now = now or datetime.datetime.now()
+        with self._lock:
+            self._entries[ticker] = (reason, now + self.ttl)
+
+    def get(self, ticker, now: datetime.datetime = None):
+        """Reason the ticker is invalid, or None (unknown or expired)."""
+        now = now or datetime.datetime.now()
+        with self._lock:
+            hit = self._entries.get(ticker)
+            if hit is None:
+                return None
+            if hit[1] <= now:
+                del self._entries[ticker]
+                return None
+            return hit[0]
+
+    def discard(self, ticker):
+        with self._lock:
+            self._entries.pop(ticker, None)
+
+INVALID = NegativeCache()
+
+
+def tickers_with_data(tickers: list) -> set:
+    """Subset of tickers with bars in market_data (one indexed query)."""
+    if not tickers:
+        return set()
+    db = get_db()
+    session = db.get_db_session() if db else None
+    if not session: return set()
+    try:
+        rows = session.query(MarketData.ticker).filter(MarketData.ticker.in_(list(tickers))).distinct().all()
+        return {t for (t,) in rows}
+    except Exception as e:
+        print(f"Ticker data lookup failed: {e}")
+        return set()
+    finally:
+        db.close_session()
+
+def classify(tickers: list, now: datetime.datetime = None):
+    """
+    Splits resolved tickers into (ready, pending, rejected) without any download.
+    ready/pending keep input order; rejected is {ticker: reason}.
+    """
+    rejected, candidates = {}, []
+    for t in tickers:
+        if len(t) > MAX_TICKER_LEN or not _TICKER.match(t):
+            rejected[t] = f"Invalid ticker format: {t}"
+            continue
+        reason = INVALID.get(t, now)
+        if reason:
+            rejected[t] = reason
+        else:
+            candidates.append(t)
+    with_data = tickers_with_data(candidates)
+    ready = [t for t in candidates if t in with_data]
+    pending = [t for t in candidates if t not in with_data]
+    return ready, pending, rejected
@@ -3,6 +3,7 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import os
 import datetime
+from utils.chart_encoding import slice_range, downsample, encode_values, encode_dates, DEFAULT_MAX_POINTS
 
 CHARTS_DIR = "static/charts"
 os.makedirs(CHARTS_DIR, exist_ok=True)
@@ -17,8 +18,11 @@ def save_chart(fig: go.Figure, filename: str) -> str:
     fig.write_html(path)
     return filename
 
-def create_minervini_figure(ticker: str, df: pd.DataFrame) -> go.Figure:
-    """Creates the Minervini Figure object."""
+def create_minervini_figure(ticker: str, df: pd.DataFrame, date_range=None, max_points: int = DEFAULT_MAX_POINTS) -> go.Figure:
+    """
+    Creates the Minervini Figure object.
+    date_range: `range=` window ('6mo', '2024-01-01:2024-06-30'); max_points: LTTB downsample target (0 = all bars).
+    """
     import utils.technical_indicators as ta
     if 'SMA_50' not in df.columns: df['SMA_50'] = ta.sma(df['Close'], length=50)
     if 'SMA_150' not in df.columns: df['SMA_150'] = ta.sma(df['Close'], length=150)
@@ -34,33 +38,38 @@ def create_minervini_figure(ticker: str, df: pd.DataFrame) -> go.Figure:
     fig = make_subplots(rows=3, cols=1, shared_xaxes=True, row_heights=[0.6, 0.2, 0.2],
                         subplot_titles=(f"{ticker} Analysis", "RSI", "MACD"))
     
-    # Pre-convert to list to ensure standard JSON serialization (avoid bdata)
-    dates = df.index.tolist()
+    # Indicators are computed on full history above; only now cut to the viewport
+    view = downsample(slice_range(df, date_range), max_points)
+
+    # Typed arrays -> Plotly emits base64 buffers (bdata) instead of number lists
+    dates = encode_dates(view.index)
     
     # Price
     fig.add_trace(go.Candlestick(x=dates, 
-                                 open=df['Open'].tolist(), 
-                                 high=df['High'].tolist(), 
-                                 low=df['Low'].tolist(), 
-                                 close=df['Close'].tolist(), 
+                                 open=encode_values(view['Open']), 
+                                 high=encode_values(view['High']), 
+                                 low=encode_values(view['Low']), 
+                                 close=encode_values(view['Close']), 
                                  name='Price'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=dates, y=df['SMA_50'].tolist(), line=dict(color='blue'), name='50 SMA'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=dates, y=df['SMA_150'].tolist(), line=dict(color='orange'), name='150 SMA'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=dates, y=df['SMA_200'].tolist(), line=dict(color='black'), name='200 SMA'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['SMA_50']), line=dict(color='blue'), name='50 SMA'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['SMA_150']), line=dict(color='orange'), name='150 SMA'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['SMA_200']), line=dict(color='black'), name='200 SMA'), row=1, col=1)
     
     # RSI
-    fig.add_trace(go.Scatter(x=dates, y=df['RSI'].tolist(), line=dict(color='purple'), name='RSI'), row=2, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['RSI']), line=dict(color='purple'), name='RSI'), row=2, col=1)
     fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
     fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
     
     # MACD
-    if 'MACD' in df.columns:
-        fig.add_trace(go.Scatter(x=dates, y=df['MACD'].tolist(), line=dict(color='blue'), name='MACD'), row=3, col=1)
-        fig.add_trace(go.Scatter(x=dates, y=df['MACD_Signal'].tolist(), line=dict(color='orange'), name='Signal'), row=3, col=1)
-        # For Bar, we calculate diff. Convert to list after.
-        hist = (df['MACD'] - df['MACD_Signal']).tolist()
+    if 'MACD' in view.columns:
+        fig.add_trace(go.Scatter(x=dates, y=encode_values(view['MACD']), line=dict(color='blue'), name='MACD'), row=3, col=1)
+        fig.add_trace(go.Scatter(x=dates, y=encode_values(view['MACD_Signal']), line=dict(color='orange'), name='Signal'), row=3, col=1)
+        hist = encode_values(view['MACD'] - view['MACD_Signal'])
         fig.add_trace(go.Bar(x=dates, y=hist, marker_color='gray', name='Hist'), row=3, col=1)
 
+    # x values are epoch ms, so the axes have to be told they are dates
+    fig.update_xaxes(type='date')
+
     # Dark Mode Default Template (can be overridden by JS)
     fig.update_layout(height=600, template="plotly_dark", xaxis_rangeslider_visible=False, paper_bgcolor='rgba(0,0,0,0)')
     return fig
@@ -71,26 +80,38 @@ def plot_minervini_chart(ticker: str, df: pd.DataFrame) -> str:
     filename = create_chart_filename(ticker, "minervini")
     return save_chart(fig, filename)
 
-def create_relative_strength_figure(ticker: str, df: pd.DataFrame, benchmark_df: pd.DataFrame) -> go.Figure:
-    """Creates the Dual Momentum Figure object."""
+# Window of the RS line's moving average on the Dual Momentum chart
+RS_SMA_WINDOW = 252
+
+def create_relative_strength_figure(ticker: str, df: pd.DataFrame, benchmark_df: pd.DataFrame,
+                                    date_range=None, max_points: int = DEFAULT_MAX_POINTS) -> go.Figure:
+    """
+    Creates the Dual Momentum Figure object. date_range / max_points as in create_minervini_figure.
+    benchmark_df may be a DataFrame or a BenchmarkSnapshot (pre-aligned, no intersection).
+    """
     # Align dates
-    common_idx = df.index.intersection(benchmark_df.index)
-    df_aligned = df.loc[common_idx]
-    bench_aligned = benchmark_df.loc[common_idx]
+    if hasattr(benchmark_df, 'aligned_close'):
+        stock_close, bench_close = benchmark_df.aligned_close(df)
+    else:
+        common_idx = df.index.intersection(benchmark_df.index)
+        stock_close = df.loc[common_idx]['Close']
+        bench_close = benchmark_df.loc[common_idx]['Close']
     
-    rs_line = df_aligned['Close'] / bench_aligned['Close']
+    rs_line = stock_close / bench_close
+    rs_sma = rs_line.rolling(window=RS_SMA_WINDOW).mean()
     
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.6, 0.4],
                         subplot_titles=(f"{ticker} vs Benchmark", "Relative Strength Ratio"))
     
-    dates = df_aligned.index.tolist()
-    
-    fig.add_trace(go.Scatter(x=dates, y=df_aligned['Close'].tolist(), name=ticker), row=1, col=1)
-    fig.add_trace(go.Scatter(x=dates, y=rs_line.tolist(), line=dict(color='green'), name='RS (Stock/Nifty)'), row=2, col=1)
+    view = pd.DataFrame({'Close': stock_close, 'RS': rs_line, 'RS_SMA': rs_sma})
+    view = downsample(slice_range(view, date_range), max_points, column='RS')
+    dates = encode_dates(view.index)
     
-    rs_sma = rs_line.rolling(window=252).mean()
-    fig.add_trace(go.Scatter(x=dates, y=rs_sma.tolist(), line=dict(color='white', dash='dot'), name='12-Mo RS SMA'), row=2, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['Close']), name=ticker), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['RS']), line=dict(color='green'), name='RS (Stock/Nifty)'), row=2, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=encode_values(view['RS_SMA']), line=dict(color='white', dash='dot'), name='12-Mo RS SMA'), row=2, col=1)
 
+    fig.update_xaxes(type='date')
     fig.update_layout(height=600, template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)')
     return fig
 
@@ -0,0 +1,19 @@
+"""
+Production entry point:  gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module builds the app and warms it (strategies/warmup.py) before returning.
+With preload_app (gunicorn.conf.py) that happens once in the gunicorn master, so workers are
+forked warm and share the preloaded state copy-on-write; /readyz is green from their first request.
+Set WARMUP=0 to skip warm-up (e.g. one-off tooling importing the app).
+"""
+import gc
+import os
+from app import app, warmup
+
+if os.getenv('WARMUP', '1') != '0':
+    status = warmup.run()
+    print(f"Warm-up finished ({status['total']} portfolio tickers, {len(status['errors'])} step errors)")
+
+# Everything allocated so far is long-lived: keep the collector from touching (and so copying)
+# those pages in forked workers
+gc.freeze()